@@ -1,37 +1,111 @@
+import csv
+import io
+import json
+import mimetypes
+import os
 import re
+import time
 from collections import defaultdict
+from functools import lru_cache
 from typing import Dict, List
 
-from flask import Flask, render_template, Blueprint, jsonify, request, send_from_directory
+from flask import (
+    Flask, Response, render_template, Blueprint, abort, jsonify, request, send_file, stream_with_context,
+)
 from flask_restx import Api, Resource, fields
+from werkzeug.security import safe_join
 
 from data_models import Entity
-from grapher import construct_subgraph, annotate_graph
+from grapher import (
+    DEFAULT_MAX_DEGREE, DEFAULT_MAX_FANOUT, EDGE_TYPES, GEPHI_RGB,
+    annotate_graph, construct_lineage_subgraph, construct_path_subgraph, construct_subgraph, entity_disciplines,
+    make_node_filter,
+)
+from utils.commentary_graph import LineageIndex
+from utils.compress import ENCODING_SUFFIXES, compressed_sibling
+from utils.connections import k_shortest_paths, neighbors_from_adjacency
+from utils.date_index import DateIntervalIndex
+from utils.graph_export import batch_chunks, iter_gexf, iter_graphml
 from utils.utils import (
-    custom_sort_key,
-    get_app_version, get_pandit_data_version, get_seti_data_version,
+    build_discipline_index, build_entity_indexes,
+    get_app_version, get_date_info, get_pandit_data_version, get_seti_data_version,
     load_config_dict_from_json_file,
     summarize_etext_links,
 )
-from utils.load import load_entities, load_link_data
-
-ENTITIES_BY_ID: Dict[str, Entity] = load_entities()
-VALID_WORK_IDS: List[str] = [k for k in ENTITIES_BY_ID if ENTITIES_BY_ID[k].type == 'work']
-VALID_AUTHOR_IDS: List[str] = [k for k in ENTITIES_BY_ID if ENTITIES_BY_ID[k].type == 'author']
-
-ETEXT_LINKS, ADDITIONAL_COLLECTION_COUNT_DATA = load_link_data()
-ETEXT_DATA_SUMMARY = summarize_etext_links(ETEXT_LINKS, ADDITIONAL_COLLECTION_COUNT_DATA)
-VALID_COLLECTIONS = list(ETEXT_DATA_SUMMARY.keys())
+from utils.load import (
+    load_community_graph, load_entities, load_entity_indexes, load_etext_summary, load_link_data, load_node_analytics,
+    load_version_diff,
+)
 
 APP_VERSION = get_app_version()
 PANDIT_DATA_VERSION = get_pandit_data_version()
 SETI_DATA_VERSION = get_seti_data_version()
 
+# Referential integrity is checked by the ETL `validate` stage; set PANDITYA_VALIDATE_ON_LOAD=1 to re-check at startup
+ENTITIES_BY_ID: Dict[str, Entity] = load_entities(validate=bool(os.environ.get("PANDITYA_VALIDATE_ON_LOAD")))
+
+# Derived indexes are precomputed by utils.transform; derive them here only if the artifact is missing
+ENTITY_INDEXES = load_entity_indexes() or build_entity_indexes(ENTITIES_BY_ID, PANDIT_DATA_VERSION)
+VALID_WORK_IDS: List[str] = ENTITY_INDEXES["type_index"]["works"]
+VALID_AUTHOR_IDS: List[str] = ENTITY_INDEXES["type_index"]["authors"]
+# Degree index for hub-aware expansion (counted here for entity-indexes artifacts written before it existed)
+ENTITY_DEGREES: Dict[str, int] = ENTITY_INDEXES.get("degrees") \
+    or {eid: len(neighbor_ids) for eid, neighbor_ids in ENTITY_INDEXES["adjacency"].items()}
+# Interval index over entity date ranges for time-sliced queries (undated entities are not in it)
+DATE_INDEX = DateIntervalIndex.from_entities(ENTITIES_BY_ID)
+# Discipline facet index (counted here for entity-indexes artifacts written before it existed), as sets for intersections
+DISCIPLINE_INDEX: Dict[str, Dict[str, List[str]]] = ENTITY_INDEXES.get("disciplines") \
+    or build_discipline_index(ENTITIES_BY_ID)
+DISCIPLINE_SETS = {
+    discipline: {key: frozenset(entity_ids) for key, entity_ids in members.items()}
+    for discipline, members in DISCIPLINE_INDEX.items()
+}
+# Reachability over base text -> commentary relations, for lineage queries independent of chain length
+LINEAGE_INDEX = LineageIndex.from_entities(ENTITIES_BY_ID)
+
+# Per-node analytics and community overview graph precomputed by utils.analyze
+# (None until it has been run for this data version)
+NODE_ANALYTICS = load_node_analytics()
+COMMUNITY_GRAPH = load_community_graph()
+
+# Changes since previous data versions precomputed by utils.version_diff (None until it has been run)
+VERSION_DIFF = load_version_diff()
+
+ETEXT_LINKS, ADDITIONAL_COLLECTION_COUNT_DATA = load_link_data()
+ETEXT_DATA_SUMMARY = load_etext_summary() or summarize_etext_links(ETEXT_LINKS, ADDITIONAL_COLLECTION_COUNT_DATA)
+VALID_COLLECTIONS = list(ETEXT_DATA_SUMMARY.keys())
+
 config_dict = load_config_dict_from_json_file()
 DEFAULT_HOPS = config_dict["hops"]
 
+# Optional anonymized query log (JSON lines), replayable with `python -m utils.load_test --replay`
+QUERY_LOG_PATH = os.environ.get("PANDITYA_QUERY_LOG")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
 app = Flask(__name__)
 
+
+@app.after_request
+def log_query(response):
+    """
+    Append the shape of each API/visualization request to the query log, if enabled.
+    Only the route, path, query args and JSON body are kept (no IPs, headers or cookies).
+    """
+    if QUERY_LOG_PATH and request.url_rule is not None and not request.path.startswith(('/static', '/data')):
+        entry = {
+            "ts": round(time.time(), 3),
+            "method": request.method,
+            "endpoint": request.url_rule.rule,
+            "path": request.path,
+            "args": request.args.to_dict(),
+            "json": request.get_json(silent=True) if request.method == 'POST' else None,
+            "status": response.status_code,
+        }
+        with open(QUERY_LOG_PATH, 'a', encoding='utf8') as log_file:
+            log_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return response
+
 # --- Blueprint setup ---
 api_bp = Blueprint('api', __name__, url_prefix='/api')  # API Blueprint
 api = Api(api_bp, version=APP_VERSION, title='Pāṇḍitya API',
@@ -43,34 +117,14 @@ api = Api(api_bp, version=APP_VERSION, title='Pāṇḍitya API',
 entities_ns = api.namespace('entities', description='Entity operations')
 graph_ns = api.namespace('graph', description='Graph operations')
 seti_ns = api.namespace('seti', description='SETI operations')
+analysis_ns = api.namespace('analysis', description='Precomputed network analysis results')
+diff_ns = api.namespace('diff', description='Changes between data versions')
 
 
-def get_date_info(entity: Entity):
-    lowest_year, highest_year = entity.lowest_year, entity.highest_year
-    caveat_str = ""
-    if entity.type == 'work' and not entity.lowest_year and entity.author_lowest_year:
-        lowest_year, highest_year = entity.author_lowest_year, entity.author_highest_year
-        caveat_str = " (author)"
-    if not lowest_year:
-        return ""
-    date_str = f"{lowest_year}" if lowest_year == highest_year else f"{lowest_year}–{highest_year}"
-    return date_str + caveat_str
-
-# --- Preprocess dropdown data ---
-entity_dropdown_options = defaultdict(list)
-for entity in ENTITIES_BY_ID.values():
-    entity_label = f"{entity.name} ({entity.id})"
-    date_info = get_date_info(entity)
-    if date_info:
-        entity_label += f" [{date_info}]"
-    if entity.aka:
-        entity_label += f" [{entity.aka}]"
-    option = {"id": entity.id, "label": entity_label}
-    entity_dropdown_options['all'].append(option)
-    entity_dropdown_options[entity.type+'s'].append(option)
-
-for key in ['works', 'authors', 'all']:
-    entity_dropdown_options[key] = sorted(entity_dropdown_options[key], key=lambda x: custom_sort_key(x['label']))
+# --- Preprocessed dropdown data ---
+entity_dropdown_options = ENTITY_INDEXES["dropdown_options"]
+
+ENTITY_TYPE_FILTERS = {'authors': 'author', 'works': 'work', 'all': None}
 
 
 # --- entities namespace routes ---
@@ -146,23 +200,197 @@ class Labels(Resource):
         return jsonify(label_data)
 
 
+MAX_DATE_QUERY_LIMIT = 1000
+
+
+def query_entities_by_date(year_from=None, year_to=None, type_filter=None, discipline=None):
+    """
+    IDs of the entities whose date range overlaps [year_from, year_to] (either end may be None),
+    by lowest year, optionally only one type ('author' or 'work') and/or one discipline (see grapher.entity_disciplines).
+    """
+    entity_ids = DATE_INDEX.overlapping(year_from, year_to)
+    if type_filter is None and discipline is None:
+        return entity_ids
+    return [
+        entity_id for entity_id in entity_ids
+        if (type_filter is None or ENTITIES_BY_ID[entity_id].type == type_filter)
+        and (discipline is None or discipline in entity_disciplines(ENTITIES_BY_ID[entity_id]))
+    ]
+
+
+@entities_ns.route('/by_date')
+class EntitiesByDate(Resource):
+    @api.doc(
+        params={
+            'from': 'First year of the time slice (default: open)',
+            'to': 'Last year of the time slice (default: open)',
+            'type': "Entity type to keep: 'authors', 'works', or 'all' (default)",
+            'discipline': 'Only works of this discipline and authors who wrote in it',
+            'limit': f'Number of entities to return (default: 100, max: {MAX_DATE_QUERY_LIMIT})',
+            'offset': 'Number of entities to skip (default: 0)',
+        },
+        responses={
+            200: 'Entities returned successfully',
+            400: 'Invalid years, type, limit or offset',
+        },
+    )
+    def get(self):
+        """
+        Fetch the dated entities active in a span of years (date range overlapping it), by lowest year.
+        Works without dates of their own count with their authors' dates; undated entities are left out.
+        Example: /api/entities/by_date?from=900&to=1100&type=works
+        """
+        year_from = request.args.get('from', type=int)
+        year_to = request.args.get('to', type=int)
+        if (year_from is None and request.args.get('from')) or (year_to is None and request.args.get('to')):
+            return {"error": "from and to must be integers"}, 400
+        if year_from is not None and year_to is not None and year_from > year_to:
+            return {"error": "from must not be after to"}, 400
+        entity_type = request.args.get('type', 'all')
+        if entity_type not in ENTITY_TYPE_FILTERS:
+            return {"error": "Invalid entity type. Choose from 'authors', 'works', or 'all'."}, 400
+        limit = request.args.get('limit', default=100, type=int)
+        if limit is None or not 1 <= limit <= MAX_DATE_QUERY_LIMIT:
+            return {"error": f"limit must be an integer between 1 and {MAX_DATE_QUERY_LIMIT}"}, 400
+        offset = request.args.get('offset', default=0, type=int)
+        if offset is None or offset < 0:
+            return {"error": "offset must be a non-negative integer"}, 400
+        discipline = request.args.get('discipline') or None
+
+        entity_ids = query_entities_by_date(year_from, year_to, ENTITY_TYPE_FILTERS[entity_type], discipline)
+        return jsonify({
+            "from": year_from,
+            "to": year_to,
+            "type": entity_type,
+            "discipline": discipline,
+            "count": len(entity_ids),
+            "entities": [
+                {
+                    "id": entity_id,
+                    "label": ENTITIES_BY_ID[entity_id].name,
+                    "type": ENTITIES_BY_ID[entity_id].type,
+                    "dates": get_date_info(ENTITIES_BY_ID[entity_id]),
+                }
+                for entity_id in entity_ids[offset:offset + limit]
+            ],
+        })
+
+
+def count_discipline_facets(entity_ids):
+    """
+    Works and authors per discipline within a result set, by set intersection with the discipline index.
+
+    Returns:
+        list: [{"discipline", "works", "authors"}] for the disciplines present, by descending total, then name
+    """
+    entity_ids = entity_ids if isinstance(entity_ids, (set, frozenset)) else set(entity_ids)
+    facets = []
+    for discipline, members in DISCIPLINE_SETS.items():
+        works, authors = len(members["works"] & entity_ids), len(members["authors"] & entity_ids)
+        if works or authors:
+            facets.append({"discipline": discipline, "works": works, "authors": authors})
+    facets.sort(key=lambda facet: (-facet["works"] - facet["authors"], facet["discipline"]))
+    return facets
+
+
+@entities_ns.route('/disciplines')
+class DisciplineFacets(Resource):
+    @api.doc(
+        params={
+            'ids': 'Comma-separated list of entity IDs to count (default: all entities)'
+        },
+        responses={
+            200: 'Discipline counts returned successfully',
+            400: 'Invalid ID list',
+        },
+    )
+    def get(self):
+        """
+        Fetch the number of works and authors per discipline, for all entities or for a list of IDs.
+        A work counts under its discipline and each part of a combined one ("A + B"); an author under
+        every discipline of their works.
+        Example: /api/entities/disciplines?ids=89000,12345
+        """
+        ids_param = request.args.get('ids')
+        err = validate_comma_separated_list_input(ids_param, allow_empty=True)
+        if err is not None:
+            return err, 400
+        if ids_param is None or not ids_param.strip():
+            return jsonify({
+                "count": len(ENTITIES_BY_ID),
+                "facets": [
+                    {"discipline": discipline, "works": len(members["works"]), "authors": len(members["authors"])}
+                    for discipline, members in DISCIPLINE_INDEX.items()
+                ],
+            })
+        entity_ids = {node_id for node_id in ids_param.strip().split(',') if node_id in ENTITIES_BY_ID}
+        return jsonify({"count": len(entity_ids), "facets": count_discipline_facets(entity_ids)})
+
+
 # register entities namespace
 api.add_namespace(entities_ns)
 
 # --- graph namespace routes ---
 
 # --- Define request model for primary Subgraph endpoint ---
+DEFAULT_SEEDS = 50
+MAX_SEEDS = 500
+
+seed_model = api.model('SubgraphSeeds', {
+    'year_from': fields.Integer(required=False, description='First year of the time slice', example=900),
+    'year_to': fields.Integer(required=False, description='Last year of the time slice', example=1100),
+    'type': fields.String(required=False, enum=list(ENTITY_TYPE_FILTERS), description='Entity type of the seeds (default: all)',
+                          example='all'),
+    'discipline': fields.String(required=False, description='Only works of this discipline and authors who wrote in it', example=None),
+    'limit': fields.Integer(required=False, description=f'At most this many seeds, earliest first (default: {DEFAULT_SEEDS}, max: {MAX_SEEDS})',
+                            example=50),
+})
+
 subgraph_model = api.model('SubgraphRequest', {
     'authors': fields.List(fields.String, required=False, description='List of author node IDs', example=[]),
     'works': fields.List(fields.String, required=False, description='List of work node IDs', example=["89000"]),
     'hops': fields.Integer(required=True, description='Number of hops outward from center', example=DEFAULT_HOPS),
-    'exclude_list': fields.List(fields.String, required=False, description='List of node IDs to exclude', example=[])
+    'exclude_list': fields.List(fields.String, required=False, description='List of node IDs to exclude', example=[]),
+    'include_analysis': fields.Boolean(required=False, description='Add precomputed analysis results to each node', example=False),
+    'edge_types': fields.List(fields.String(enum=EDGE_TYPES), required=False,
+                              description=f'Only follow these relations: {EDGE_TYPES} (default: all)', example=EDGE_TYPES),
+    'discipline': fields.String(required=False, description='Only expand to works of this discipline and authors who wrote in it',
+                                example=None),
+    'year_from': fields.Integer(required=False, description='Only expand to entities dated (partly) in or after this year; undated ones are kept',
+                                example=None),
+    'year_to': fields.Integer(required=False, description='Only expand to entities dated (partly) in or before this year; undated ones are kept',
+                              example=None),
+    'max_degree': fields.Integer(required=False, description='Include nodes with more neighbors than this (other than the center) '
+                                 'as boundary nodes, flagged is_boundary and not expanded (default: from config)', example=None),
+    'max_fanout': fields.Integer(required=False, description='Expand each node to at most this many neighbors, those with the most '
+                                 'connections first (default: from config)', example=None),
+    'seeds': fields.Nested(seed_model, required=False, allow_null=True,
+                           description='Add the entities dated in a span of years to the center (see /api/entities/by_date)'),
 })
 
 
-def validate_subgraph_inputs(authors, works, hops, exclude_list):
-    if not authors and not works:
-        return {"error": "require either one or both of authors or works"}
+subgraph_export_model = api.clone('SubgraphExportRequest', subgraph_model, {
+    'format': fields.String(required=True, description='Export format: gexf, graphml, csv (edge list) or ndjson',
+                            enum=['gexf', 'graphml', 'csv', 'ndjson'], example='gexf'),
+})
+
+# format: (MIME type, file extension)
+EXPORT_FORMATS = {
+    'gexf': ('application/gexf+xml', 'gexf'),
+    'graphml': ('application/graphml+xml', 'graphml'),
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+MAX_CONNECTION_PATHS = 10
+ENTITY_NEIGHBORS = neighbors_from_adjacency(ENTITY_INDEXES["adjacency"])
+
+CSV_EDGE_LIST_HEADER = ["source", "target", "source_label", "target_label", "relationship"]
+
+
+def validate_subgraph_inputs(authors, works, hops, exclude_list, seed_ids=()):
+    if not authors and not works and not seed_ids:
+        return {"error": "require either one or both of authors or works (or seeds matching some entities)"}
     if not isinstance(hops, int) or hops < 0:
         return {"error": "hops must be a non-negative integer"}
     if not isinstance(exclude_list, list):
@@ -170,14 +398,177 @@ def validate_subgraph_inputs(authors, works, hops, exclude_list):
     return None
 
 
-def get_edge_relationship(source_node_id, target_node_id):
-    if (ENTITIES_BY_ID[source_node_id].type, ENTITIES_BY_ID[target_node_id].type) == ('author', 'work'):
-        return 'source author wrote target work'
-    elif (ENTITIES_BY_ID[source_node_id].type, ENTITIES_BY_ID[target_node_id].type) == ('work', 'work'):
-        return 'source base text inspired target commentary'
-    else:
-        app.logger.error(f"Error: determine_relationship input should be one of ('author', 'work') or ('work', 'work'); "
-                         f"instead was: {(ENTITIES_BY_ID[source_node_id].type, ENTITIES_BY_ID[target_node_id].type)}")
+def parse_subgraph_seeds(seeds):
+    """
+    Seed IDs for a subgraph request's 'seeds' (year_from, year_to, type, discipline, limit).
+
+    Returns:
+        tuple: (list of IDs, earliest first, None) or (None, error dict)
+    """
+    if not isinstance(seeds, dict):
+        return None, {"error": "seeds must be an object"}
+    year_from, year_to = seeds.get('year_from'), seeds.get('year_to')
+    for key in ('year_from', 'year_to'):
+        if not isinstance(seeds.get(key, 0), (int, type(None))):
+            return None, {"error": f"seeds.{key} must be an integer"}
+    if year_from is None and year_to is None:
+        return None, {"error": "seeds require year_from and/or year_to"}
+    if year_from is not None and year_to is not None and year_from > year_to:
+        return None, {"error": "seeds.year_from must not be after seeds.year_to"}
+    entity_type = seeds.get('type') or 'all'
+    if entity_type not in ENTITY_TYPE_FILTERS:
+        return None, {"error": "Invalid seeds.type. Choose from 'authors', 'works', or 'all'."}
+    discipline = seeds.get('discipline')
+    if not isinstance(discipline, (str, type(None))):
+        return None, {"error": "seeds.discipline must be a string"}
+    limit = seeds.get('limit')
+    if limit is None:
+        limit = DEFAULT_SEEDS
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_SEEDS:
+        return None, {"error": f"seeds.limit must be an integer between 1 and {MAX_SEEDS}"}
+    entity_ids = query_entities_by_date(year_from, year_to, ENTITY_TYPE_FILTERS[entity_type], discipline or None)
+    return entity_ids[:limit], None
+
+
+def get_json_object():
+    """The request's JSON body if it is an object, else None (missing, malformed, or an array or scalar)."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+JSON_OBJECT_ERROR = {"error": "request body must be a JSON object"}
+
+
+def parse_subgraph_request(data):
+    """
+    Parse and validate a subgraph request body.
+
+    Returns:
+        tuple: (parameters dict, None) or (None, error dict)
+    """
+    authors = set(data.get('authors', []))
+    works = set(data.get('works', []))
+    parameters = {
+        "authors": authors,
+        "works": works,
+        "subgraph_center": list(authors | works),  # union
+        "hops": data.get('hops', DEFAULT_HOPS),
+        "exclude_list": list(set(data.get('exclude_list', []))),
+        "include_analysis": bool(data.get('include_analysis', False)),
+    }
+
+    # Seed generator: the entities dated in a span of years join the center
+    seed_ids = []
+    parameters["seeds"] = data.get('seeds')
+    if parameters["seeds"] is not None:
+        seed_ids, err = parse_subgraph_seeds(parameters["seeds"])
+        if err is not None:
+            return None, err
+        parameters["subgraph_center"] += [node_id for node_id in seed_ids if node_id not in authors and node_id not in works]
+        parameters["seeds"] = dict(parameters["seeds"], ids=seed_ids)
+
+    err = validate_subgraph_inputs(authors, works, parameters["hops"], parameters["exclude_list"], seed_ids)
+    if err is not None:
+        return None, err
+
+    # Traversal filters, applied during expansion (see grapher.construct_subgraph)
+    filters = {key: data[key] for key in ('edge_types', 'discipline', 'year_from', 'year_to') if data.get(key) is not None}
+    edge_types = filters.get('edge_types')
+    if edge_types is not None and (not isinstance(edge_types, list) or not set(edge_types) <= set(EDGE_TYPES)):
+        return None, {"error": f"edge_types must be a list of {EDGE_TYPES}"}
+    if not isinstance(filters.get('discipline', ""), str):
+        return None, {"error": "discipline must be a string"}
+    for key in ('year_from', 'year_to'):
+        if not isinstance(filters.get(key, 0), int):
+            return None, {"error": f"{key} must be an integer"}
+    parameters["filters"] = filters
+    parameters["edge_types"] = edge_types
+    year_range = (filters.get('year_from'), filters.get('year_to')) \
+        if 'year_from' in filters or 'year_to' in filters else None
+    parameters["node_filter"] = make_node_filter(filters.get('discipline'), year_range)
+
+    # Hub-aware expansion
+    for key, default in (('max_degree', DEFAULT_MAX_DEGREE), ('max_fanout', DEFAULT_MAX_FANOUT)):
+        value = data.get(key, default)
+        if value is not None and (not isinstance(value, int) or value < 1):
+            return None, {"error": f"{key} must be a positive integer"}
+        parameters[key] = value
+
+    # Only the requested IDs can be unknown; all IDs reachable from them exist (see utils.validate)
+    invalid_ids = [node_id for node_id in parameters["subgraph_center"] if node_id not in ENTITIES_BY_ID]
+    if invalid_ids:
+        return None, {"error": f"Invalid ID: {', '.join(repr(node_id) for node_id in invalid_ids)}"}
+
+    return parameters, None
+
+
+def construct_subgraph_from_parameters(parameters):
+    return construct_subgraph(
+        parameters["subgraph_center"], parameters["hops"], parameters["exclude_list"],
+        edge_types=parameters["edge_types"], node_filter=parameters["node_filter"],
+        max_degree=parameters["max_degree"], max_fanout=parameters["max_fanout"], degrees=ENTITY_DEGREES,
+    )
+
+
+# Edges always run author -> work or base text -> commentary (guaranteed by utils.validate),
+# so the source type alone determines the relationship
+EDGE_RELATIONSHIPS = {
+    'author': 'source author wrote target work',
+    'work': 'source base text inspired target commentary',
+}
+
+
+def get_edge_relationship(source_node_id):
+    return EDGE_RELATIONSHIPS[ENTITIES_BY_ID[source_node_id].type]
+
+
+@lru_cache(maxsize=None)
+def get_node_details(node_id):
+    """
+    Entity details of a node as sent in graph payloads; entities don't change while the server runs,
+    so these are built once per node. Callers must copy before adding to the dict.
+    """
+    entity = ENTITIES_BY_ID[node_id]
+    is_author = entity.type == 'author'
+    return {
+        "id": node_id,
+        "label": entity.name,
+        "type": entity.type,
+        "aka": entity.aka,
+        "social_ids": entity.social_identifiers if is_author else None,
+        "dates": get_date_info(entity),
+        "discipline": None if is_author else entity.discipline,
+        "disciplines": entity.disciplines if is_author else None,
+    }
+
+
+def serialize_node(node, node_attributes, include_analysis=False, include_boundary=False):
+    serialized_node = {
+        **get_node_details(node),
+        "is_central": node_attributes.get('is_central', False),
+        "is_excluded": node_attributes.get('is_excluded', False),
+        "etext_links": node_attributes.get('etext_links', False),
+    }
+    if include_boundary:
+        serialized_node["is_boundary"] = node_attributes.get('is_boundary', False)
+    if include_analysis:
+        serialized_node["analysis"] = get_node_analytics(node)
+    return serialized_node
+
+
+def serialize_edge(source, target):
+    return {"source": source, "target": target, "relationship": get_edge_relationship(source)}
+
+
+def serialize_graph(annotated_graph, include_analysis=False, include_boundary=False):
+    """
+    Nodes (with entity details and annotations) and edges (with relationships) of an annotated graph,
+    in the shape returned by the graph endpoints. include_boundary adds each node's is_boundary flag (hub-aware expansion).
+    """
+    nodes = [serialize_node(node, node_attributes, include_analysis, include_boundary)
+             for node, node_attributes in annotated_graph.nodes(data=True)]
+    edges = [serialize_edge(source, target) for source, target in annotated_graph.edges]
+    return {"nodes": nodes, "edges": edges}
 
 
 @graph_ns.route('/subgraph')
@@ -189,73 +580,619 @@ class Subgraph(Resource):
         """
         try:
             # Parse request data
-            data = request.json
-            authors = set(data.get('authors', []))
-            works = set(data.get('works', []))
-            subgraph_center = list(authors | works)  # union
-            hops = data.get('hops', DEFAULT_HOPS)
-            exclude_list = list(set(data.get('exclude_list', [])))
-
-            # validate_inputs
-            err = validate_subgraph_inputs(authors, works, hops, exclude_list)
+            data = get_json_object()
+            if data is None:
+                return JSON_OBJECT_ERROR, 400
+            parameters, err = parse_subgraph_request(data)
             if err is not None:
                 return err, 400
+            subgraph_center = parameters["subgraph_center"]
+            exclude_list = parameters["exclude_list"]
 
             # Call the actual construct_subgraph function
-            subgraph = construct_subgraph(subgraph_center, hops, exclude_list)
+            subgraph = construct_subgraph_from_parameters(parameters)
 
             # Annotate graph data for visual emphasis and e-text links
             annotated_subgraph = annotate_graph(subgraph, subgraph_center, exclude_list)
 
             # Extract nodes and edges
-            filtered_nodes = [
-                {
-                    "id": node,
-                    "label": ENTITIES_BY_ID[node].name,
-                    "type": ENTITIES_BY_ID[node].type,
-                    "aka": ENTITIES_BY_ID[node].aka,
-                    "social_ids": ENTITIES_BY_ID[node].social_identifiers if ENTITIES_BY_ID[node].type == 'author' else None,
-                    "dates": get_date_info(ENTITIES_BY_ID[node]),
-                    "discipline": ENTITIES_BY_ID[node].discipline if ENTITIES_BY_ID[node].type == 'work' else None,
-                    "disciplines": ENTITIES_BY_ID[node].disciplines if ENTITIES_BY_ID[node].type == 'author' else None,
-                    "is_central": annotated_subgraph.nodes[node].get('is_central', False),
-                    "is_excluded": annotated_subgraph.nodes[node].get('is_excluded', False),
-                    "etext_links": annotated_subgraph.nodes[node].get('etext_links', False),
-                }
-                for node in annotated_subgraph.nodes
-            ]
-            filtered_edges = [
-                {"source": edge[0], "target": edge[1], "relationship": get_edge_relationship(edge[0], edge[1])}
-                for edge in subgraph.edges
-            ]
+            graph_payload = serialize_graph(annotated_subgraph, parameters["include_analysis"],
+                                            include_boundary=parameters["max_degree"] is not None)
 
             # Construct the response
             response = {
                 "parameters": {
-                    "authors": list(authors),
-                    "works": list(works),
-                    "hops": hops,
+                    "authors": list(parameters["authors"]),
+                    "works": list(parameters["works"]),
+                    "hops": parameters["hops"],
                     "exclude_list": list(exclude_list),
                 },
-                "graph": {
-                    "nodes": filtered_nodes,
-                    "edges": filtered_edges,
-                }
+                "graph": graph_payload,
             }
+            if parameters["filters"]:
+                response["parameters"]["filters"] = parameters["filters"]
+            for key in ('max_degree', 'max_fanout', 'seeds'):
+                if parameters[key] is not None:
+                    response["parameters"][key] = parameters[key]
             return jsonify(response)
 
-        except KeyError as e:
-            app.logger.error('Error: %s', str(e))
-            return {"error": f"Invalid ID: {str(e)}"}, 400
         except Exception as e:
             app.logger.error('Error: %s', str(e))
             return {"error": str(e)}, 500
 
 
+def iter_csv_edge_list(subgraph):
+    """CSV edge list (with labels and relationships), one chunk per edge."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_EDGE_LIST_HEADER)
+    for source, target in subgraph.edges:
+        writer.writerow([source, target, get_node_details(source)["label"], get_node_details(target)["label"],
+                         get_edge_relationship(source)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(annotated_subgraph, include_analysis=False, include_boundary=False):
+    """One JSON line per node ({"node": ...}), then per edge ({"edge": ...}), as in /api/graph/subgraph."""
+    for node, node_attributes in annotated_subgraph.nodes(data=True):
+        node_payload = serialize_node(node, node_attributes, include_analysis, include_boundary)
+        yield json.dumps({"node": node_payload}, ensure_ascii=False) + "\n"
+    for source, target in annotated_subgraph.edges:
+        yield json.dumps({"edge": serialize_edge(source, target)}, ensure_ascii=False) + "\n"
+
+
+@graph_ns.route('/subgraph/facets')
+class SubgraphFacets(Resource):
+    @graph_ns.expect(subgraph_model)
+    @api.doc(
+        responses={
+            200: 'Discipline counts returned successfully',
+            400: 'Invalid input',
+        },
+    )
+    def post(self):
+        """
+        Generate a subgraph (same parameters as /api/graph/subgraph) and return the number of its works and authors
+        per discipline (see /api/entities/disciplines) instead of the graph.
+        """
+        data = get_json_object()
+        if data is None:
+            return JSON_OBJECT_ERROR, 400
+        parameters, err = parse_subgraph_request(data)
+        if err is not None:
+            return err, 400
+        subgraph = construct_subgraph_from_parameters(parameters)
+        return jsonify({"count": subgraph.number_of_nodes(), "facets": count_discipline_facets(set(subgraph.nodes))})
+
+
+@graph_ns.route('/subgraph/export')
+class SubgraphExport(Resource):
+    @graph_ns.expect(subgraph_export_model)
+    @api.doc(
+        responses={
+            200: 'Export streamed successfully',
+            400: 'Invalid input or format',
+        },
+    )
+    def post(self):
+        """
+        Generate a subgraph (same parameters as /api/graph/subgraph) and stream it as a file:
+        gexf or graphml (for Gephi; works red, authors green, excluded gray), csv (edge list) or ndjson.
+        """
+        data = get_json_object()
+        if data is None:
+            return JSON_OBJECT_ERROR, 400
+        export_format = data.get('format')
+        if export_format not in EXPORT_FORMATS:
+            return {"error": f"Invalid format: {export_format}. Valid options: {list(EXPORT_FORMATS)}"}, 400
+        parameters, err = parse_subgraph_request(data)
+        if err is not None:
+            return err, 400
+        subgraph_center = parameters["subgraph_center"]
+        exclude_list = parameters["exclude_list"]
+        subgraph = construct_subgraph_from_parameters(parameters)
+
+        if export_format in ('gexf', 'graphml'):
+            excluded = set(exclude_list)
+
+            def node_color(node_id):
+                if node_id in excluded:
+                    return GEPHI_RGB['gray']
+                return GEPHI_RGB['red' if ENTITIES_BY_ID[node_id].type == 'work' else 'green']
+
+            def node_label(node_id):
+                return get_node_details(node_id)["label"]
+
+            iter_document = iter_gexf if export_format == 'gexf' else iter_graphml
+            chunks = iter_document(subgraph, node_label, node_color)
+        elif export_format == 'csv':
+            chunks = iter_csv_edge_list(subgraph)
+        else:
+            chunks = iter_ndjson(annotate_graph(subgraph, subgraph_center, exclude_list), parameters["include_analysis"],
+                                 include_boundary=parameters["max_degree"] is not None)
+
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        # No Content-Length: the body is sent with chunked transfer encoding as it is generated
+        return Response(
+            stream_with_context(batch_chunks(chunks)),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="pandit-subgraph.{extension}"'},
+        )
+
+
+connection_model = api.model('ConnectionRequest', {
+    'source': fields.String(required=True, description='Author or work ID to start from', example="85303"),
+    'target': fields.String(required=True, description='Author or work ID to connect to', example="89002"),
+    'k': fields.Integer(required=False, description=f'Number of shortest paths (default: 1, max: {MAX_CONNECTION_PATHS})', example=1),
+    'exclude_list': fields.List(fields.String, required=False, description='Node IDs that paths may not pass through', example=[]),
+    'include_analysis': fields.Boolean(required=False, description='Add precomputed analysis results to each node', example=False),
+})
+
+
+@graph_ns.route('/connection')
+class Connection(Resource):
+    @graph_ns.expect(connection_model)
+    @api.doc(
+        responses={
+            200: 'Connection returned successfully (no paths if the entities are not connected)',
+            400: 'Invalid input',
+        },
+    )
+    def post(self):
+        """
+        Find how two entities are related: the k shortest paths between them (through authorship and
+        base-text/commentary relations, in either direction), as a minimal graph in the shape of /api/graph/subgraph.
+        Paths don't pass through nodes in exclude_list.
+        """
+        data = get_json_object()
+        if data is None:
+            return JSON_OBJECT_ERROR, 400
+        source, target = data.get('source'), data.get('target')
+        k = data.get('k', 1)
+        exclude_list = data.get('exclude_list', [])
+        include_analysis = bool(data.get('include_analysis', False))
+
+        if not isinstance(source, str) or not isinstance(target, str):
+            return {"error": "source and target must be entity IDs (strings)"}, 400
+        invalid_ids = [node_id for node_id in (source, target) if node_id not in ENTITIES_BY_ID]
+        if invalid_ids:
+            return {"error": f"Invalid ID: {', '.join(repr(node_id) for node_id in invalid_ids)}"}, 400
+        if not isinstance(k, int) or not 1 <= k <= MAX_CONNECTION_PATHS:
+            return {"error": f"k must be an integer between 1 and {MAX_CONNECTION_PATHS}"}, 400
+        if not isinstance(exclude_list, list) or not all(isinstance(node_id, str) for node_id in exclude_list):
+            return {"error": "exclude_list must be a list of entity IDs (strings)"}, 400
+        exclude_list = list(set(exclude_list))
+
+        # Entities in different connected components can't be connected; skip the search
+        component_ids = ENTITY_INDEXES["component_ids"]
+        if component_ids[source] != component_ids[target]:
+            paths = []
+        else:
+            paths = k_shortest_paths(ENTITY_NEIGHBORS, source, target, k, set(exclude_list))
+
+        connection_graph = annotate_graph(
+            construct_path_subgraph(paths) if paths else construct_path_subgraph([[source], [target]]),
+            [source, target], exclude_list,
+        )
+        return jsonify({
+            "parameters": {"source": source, "target": target, "k": k, "exclude_list": exclude_list},
+            "connected": bool(paths),
+            "paths": paths,
+            "graph": serialize_graph(connection_graph, include_analysis),
+        })
+
+
+LINEAGE_DIRECTIONS = ['descendants', 'ancestors']
+MAX_LINEAGE_LIMIT = 5000
+
+
+@graph_ns.route('/lineage/<string:work_id>')
+class Lineage(Resource):
+    @api.doc(
+        params={
+            'direction': "'descendants' (commentaries, sub-commentaries, ...; default) or 'ancestors' "
+                         "(base texts, their base texts, ...)",
+            'limit': f'Number of works to return (default: {MAX_LINEAGE_LIMIT}, max: {MAX_LINEAGE_LIMIT})',
+            'offset': 'Number of works to skip (default: 0)',
+            'include_graph': 'If true, also return the base text -> commentary relations among the work and '
+                             'the returned works, in the shape of /api/graph/subgraph (default: false)',
+        },
+        responses={
+            200: 'Lineage returned successfully',
+            400: 'Not a work ID, or invalid direction, limit or offset',
+        },
+    )
+    def get(self, work_id):
+        """
+        Fetch all works downstream (commentaries at any depth) or upstream (base texts at any depth) of a work,
+        nearer generations first (by the shortest chain of relations to the work). Works commenting on each other in a cycle are in each other's lineage.
+        Example: /api/graph/lineage/88037?direction=descendants
+        """
+        if work_id not in LINEAGE_INDEX:
+            return {"error": f"Invalid work ID: {work_id!r}"}, 400
+        direction = request.args.get('direction', 'descendants')
+        if direction not in LINEAGE_DIRECTIONS:
+            return {"error": f"direction must be one of {LINEAGE_DIRECTIONS}"}, 400
+        limit = request.args.get('limit', default=MAX_LINEAGE_LIMIT, type=int)
+        if limit is None or not 1 <= limit <= MAX_LINEAGE_LIMIT:
+            return {"error": f"limit must be an integer between 1 and {MAX_LINEAGE_LIMIT}"}, 400
+        offset = request.args.get('offset', default=0, type=int)
+        if offset is None or offset < 0:
+            return {"error": "offset must be a non-negative integer"}, 400
+        include_graph = request.args.get('include_graph', 'false').lower() == 'true'
+
+        lineage = LINEAGE_INDEX.lineage(work_id, direction)
+        work_ids = lineage[offset:offset + limit]
+        response = {
+            "id": work_id,
+            "label": ENTITIES_BY_ID[work_id].name,
+            "direction": direction,
+            "count": len(lineage),
+            "works": [{"id": node_id, "label": ENTITIES_BY_ID[node_id].name} for node_id in work_ids],
+        }
+        if include_graph:
+            lineage_graph = annotate_graph(construct_lineage_subgraph([work_id] + work_ids), [work_id], [])
+            response["graph"] = serialize_graph(lineage_graph)
+        return jsonify(response)
+
+
+@graph_ns.route('/lineage/check')
+class LineageCheck(Resource):
+    @api.doc(
+        params={
+            'base_text': 'Work ID of the presumed base text',
+            'work': 'Work ID of the presumed (direct or indirect) commentary',
+        },
+        responses={
+            200: 'Result returned successfully',
+            400: 'Missing or invalid work IDs',
+        },
+    )
+    def get(self):
+        """
+        Check whether a work is downstream of a base text (a commentary on it at any depth).
+        Example: /api/graph/lineage/check?base_text=88037&work=88120
+        """
+        base_text_id, work_id = request.args.get('base_text'), request.args.get('work')
+        invalid_ids = [node_id for node_id in (base_text_id, work_id) if node_id not in LINEAGE_INDEX]
+        if invalid_ids:
+            return {"error": f"Invalid work ID: {', '.join(repr(node_id) for node_id in invalid_ids)}"}, 400
+        return jsonify({
+            "base_text": base_text_id,
+            "work": work_id,
+            "is_descendant": LINEAGE_INDEX.is_descendant(work_id, base_text_id),
+        })
+
+
 # register graph namespace
 api.add_namespace(graph_ns)
 
 
+# --- analysis namespace routes ---
+
+if NODE_ANALYTICS is not None:
+    NODE_ANALYTICS_ROWS = {node_id: row for row, node_id in enumerate(NODE_ANALYTICS["node_ids"])}
+    # Rows of each ranked metric by descending value (nulls left out), so top-k only walks the head of a list
+    NODE_ANALYTICS_RANKINGS = {
+        metric: sorted(
+            (row for row, value in enumerate(NODE_ANALYTICS["metrics"][metric]) if value is not None),
+            key=lambda row, values=NODE_ANALYTICS["metrics"][metric]: -values[row],
+        )
+        for metric in NODE_ANALYTICS["ranked_metrics"]
+    }
+else:
+    NODE_ANALYTICS_ROWS, NODE_ANALYTICS_RANKINGS = {}, {}
+
+COMMUNITY_MEMBERS = defaultdict(list)
+if NODE_ANALYTICS is not None and COMMUNITY_GRAPH is not None:
+    for node_id, community_id in zip(NODE_ANALYTICS["node_ids"], NODE_ANALYTICS["metrics"]["community"]):
+        COMMUNITY_MEMBERS[community_id].append(node_id)
+    COMMUNITIES_BY_ID = {supernode["id"]: supernode for supernode in COMMUNITY_GRAPH["supernodes"]}
+else:
+    COMMUNITIES_BY_ID = {}
+
+ANALYSIS_UNAVAILABLE_ERROR = {
+    "error": f"Analysis results are not available for data version {PANDIT_DATA_VERSION} (run `python -m utils.analyze`)"
+}
+
+
+def get_node_analytics(node_id):
+    """
+    All precomputed metrics for one node, or None if there are none for it.
+    """
+    row = NODE_ANALYTICS_ROWS.get(node_id)
+    if row is None:
+        return None
+    return {metric: values[row] for metric, values in NODE_ANALYTICS["metrics"].items()}
+
+
+@analysis_ns.route('/metrics')
+class AnalysisMetrics(Resource):
+    def get(self):
+        """
+        List the available per-node metrics and those that can be ranked.
+        Example: /api/analysis/metrics
+        """
+        if NODE_ANALYTICS is None:
+            return ANALYSIS_UNAVAILABLE_ERROR, 503
+        return jsonify({
+            "pandit_data_version": NODE_ANALYTICS["pandit_data_version"],
+            "metrics": list(NODE_ANALYTICS["metrics"]),
+            "ranked_metrics": NODE_ANALYTICS["ranked_metrics"],
+        })
+
+
+@analysis_ns.route('/nodes')
+class AnalysisNodes(Resource):
+    @api.doc(
+        params={
+            'ids': 'Comma-separated list of entity IDs (e.g., 88037,85218)'
+        },
+        responses={
+            200: 'Analysis results returned successfully',
+            400: 'No (valid) IDs provided',
+            503: 'Analysis results not available for this data version',
+        },
+    )
+    def get(self):
+        """
+        Fetch all precomputed metrics for a list of node IDs.
+        Example: /api/analysis/nodes?ids=88037,85218
+        """
+        if NODE_ANALYTICS is None:
+            return ANALYSIS_UNAVAILABLE_ERROR, 503
+
+        ids_param = request.args.get('ids')
+        err = validate_comma_separated_list_input(ids_param)
+        if err is not None:
+            return err, 400
+
+        ids = [node_id for node_id in ids_param.strip().split(',') if node_id in NODE_ANALYTICS_ROWS]
+        if not ids:
+            return {"error": "No valid entity IDs provided"}, 400
+
+        return jsonify([
+            {
+                "id": node_id,
+                "label": ENTITIES_BY_ID[node_id].name,
+                "type": ENTITIES_BY_ID[node_id].type,
+                "analysis": get_node_analytics(node_id),
+            }
+            for node_id in ids
+        ])
+
+
+@analysis_ns.route('/top')
+class AnalysisTop(Resource):
+    @api.doc(
+        params={
+            'metric': 'Metric to rank by (see /api/analysis/metrics), e.g. betweenness',
+            'k': 'Number of nodes to return (default: 10, max: 1000)',
+            'type': "Entity type to keep: 'authors', 'works', or 'all' (default)",
+        },
+        responses={
+            200: 'Top nodes returned successfully',
+            400: 'Invalid metric, k or type',
+            503: 'Analysis results not available for this data version',
+        },
+    )
+    def get(self):
+        """
+        Fetch the top-k nodes by a metric, optionally only authors or only works.
+        Example: /api/analysis/top?metric=betweenness&k=10&type=works
+        """
+        if NODE_ANALYTICS is None:
+            return ANALYSIS_UNAVAILABLE_ERROR, 503
+
+        metric = request.args.get('metric')
+        if metric not in NODE_ANALYTICS_RANKINGS:
+            return {"error": f"Invalid metric: {metric}. Valid options: {list(NODE_ANALYTICS_RANKINGS)}"}, 400
+        k = request.args.get('k', default=10, type=int)
+        if k is None or not 1 <= k <= 1000:
+            return {"error": "k must be an integer between 1 and 1000"}, 400
+        entity_type = request.args.get('type', 'all')
+        if entity_type not in ENTITY_TYPE_FILTERS:
+            return {"error": "Invalid entity type. Choose from 'authors', 'works', or 'all'."}, 400
+        type_filter = ENTITY_TYPE_FILTERS[entity_type]
+
+        node_ids = NODE_ANALYTICS["node_ids"]
+        values = NODE_ANALYTICS["metrics"][metric]
+        top_nodes = []
+        for row in NODE_ANALYTICS_RANKINGS[metric]:
+            entity = ENTITIES_BY_ID[node_ids[row]]
+            if type_filter is not None and entity.type != type_filter:
+                continue
+            top_nodes.append({
+                "rank": len(top_nodes) + 1,
+                "id": entity.id,
+                "label": entity.name,
+                "type": entity.type,
+                "score": values[row],
+            })
+            if len(top_nodes) == k:
+                break
+
+        return jsonify({"metric": metric, "type": entity_type, "nodes": top_nodes})
+
+
+@analysis_ns.route('/communities')
+class CommunityOverview(Resource):
+    @api.doc(
+        params={
+            'limit': 'Maximum number of communities (largest first) to return (default: 100, max: 1000)',
+            'min_size': 'Only return communities with at least this many nodes (default: 2)',
+        },
+        responses={
+            200: 'Overview graph returned successfully',
+            400: 'Invalid limit or min_size',
+            503: 'Analysis results not available for this data version',
+        },
+    )
+    def get(self):
+        """
+        Fetch the whole-database overview: Louvain communities as supernodes (size, dominant discipline, date range)
+        with weighted edges between them. The payload size is bounded by limit, regardless of database size.
+        Example: /api/analysis/communities?limit=50
+        """
+        if not COMMUNITIES_BY_ID:
+            return ANALYSIS_UNAVAILABLE_ERROR, 503
+
+        limit = request.args.get('limit', default=100, type=int)
+        min_size = request.args.get('min_size', default=2, type=int)
+        if limit is None or not 1 <= limit <= 1000:
+            return {"error": "limit must be an integer between 1 and 1000"}, 400
+        if min_size is None or min_size < 1:
+            return {"error": "min_size must be a positive integer"}, 400
+
+        supernodes = [supernode for supernode in COMMUNITY_GRAPH["supernodes"] if supernode["size"] >= min_size][:limit]
+        selected_ids = {supernode["id"] for supernode in supernodes}
+        edges = [
+            {"source": source, "target": target, "weight": weight}
+            for source, target, weight in COMMUNITY_GRAPH["edges"]
+            if source in selected_ids and target in selected_ids
+        ]
+        return jsonify({
+            "parameters": {"limit": limit, "min_size": min_size},
+            "num_communities": len(COMMUNITY_GRAPH["supernodes"]),
+            "graph": {"nodes": supernodes, "edges": edges},
+        })
+
+
+@analysis_ns.route('/communities/<int:community_id>')
+class CommunityDrillDown(Resource):
+    @api.doc(
+        params={
+            'include_analysis': 'If true, also returns precomputed analysis results for each node (default: false)',
+        },
+        responses={
+            200: 'Community graph returned successfully',
+            404: 'Unknown community',
+            503: 'Analysis results not available for this data version',
+        },
+    )
+    def get(self, community_id):
+        """
+        Drill down into one community: its members and the edges between them, in the shape of /api/graph/subgraph.
+        Example: /api/analysis/communities/66
+        """
+        if not COMMUNITIES_BY_ID:
+            return ANALYSIS_UNAVAILABLE_ERROR, 503
+        if community_id not in COMMUNITIES_BY_ID:
+            return {"error": f"Unknown community: {community_id}"}, 404
+        include_analysis = request.args.get("include_analysis", "false").lower() == "true"
+
+        # Zero hops from every member gives the community's induced subgraph (members are never boundary nodes)
+        members = COMMUNITY_MEMBERS[community_id]
+        community_graph = annotate_graph(construct_subgraph(members, 0, [], max_degree=None, max_fanout=None), [], [])
+
+        return jsonify({
+            "parameters": {"community": community_id},
+            "community": COMMUNITIES_BY_ID[community_id],
+            "graph": serialize_graph(community_graph, include_analysis),
+        })
+
+
+# register analysis namespace
+api.add_namespace(analysis_ns)
+
+
+# --- diff namespace routes ---
+
+DIFF_UNAVAILABLE_ERROR = {
+    "error": f"No diff against a previous data version is available for {PANDIT_DATA_VERSION} "
+             f"(run `python -m utils.version_diff`)"
+}
+
+
+def scope_version_diff(node_ids):
+    """
+    The part of the version diff that concerns a set of entities (e.g. a subgraph): their own changes,
+    relations with one end among them (and entities removed from such relations), and their e-text link changes.
+    """
+    scoped = {key: VERSION_DIFF[key] for key in ("pandit_data_version", "seti_data_version")}
+    if "pandit" in VERSION_DIFF:
+        pandit = VERSION_DIFF["pandit"]
+        relations = {
+            kind: [relation for relation in relations if relation[0] in node_ids or relation[1] in node_ids]
+            for kind, relations in pandit["relations"].items()
+        }
+        removed_neighbor_ids = {node_id for relation in relations["removed"] for node_id in relation[:2]}
+        entities = {
+            kind: [entity for entity in entities if entity["id"] in node_ids]
+            for kind, entities in pandit["entities"].items() if kind != "removed"
+        }
+        entities["removed"] = [entity for entity in pandit["entities"]["removed"] if entity["id"] in removed_neighbor_ids]
+        scoped["pandit"] = {"from": pandit["from"], "to": pandit["to"], "entities": entities, "relations": relations}
+        scoped["pandit"]["counts"] = {
+            f"{section}_{kind}": len(items)
+            for section in ("entities", "relations") for kind, items in scoped["pandit"][section].items()
+        }
+    if "seti" in VERSION_DIFF:
+        collections = {}
+        for collection, changes in VERSION_DIFF["seti"]["collections"].items():
+            links = {kind: [link for link in links if link[0] in node_ids] for kind, links in changes["links"].items()}
+            if links["added"] or links["removed"]:
+                collections[collection] = {
+                    "links": links,
+                    "works": {kind: [wid for wid in works if wid in node_ids] for kind, works in changes["works"].items()},
+                }
+        scoped["seti"] = {"from": VERSION_DIFF["seti"]["from"], "to": VERSION_DIFF["seti"]["to"], "collections": collections}
+    return scoped
+
+
+@diff_ns.route('')
+class VersionDiff(Resource):
+    @api.doc(
+        responses={
+            200: 'Diff returned successfully',
+            503: 'No diff available for this data version',
+        },
+    )
+    def get(self):
+        """
+        Fetch what changed since the previous data versions: added, removed, renamed and otherwise changed entities,
+        added and removed relations, and added and removed e-text links per collection.
+        Example: /api/diff
+        """
+        if VERSION_DIFF is None:
+            return DIFF_UNAVAILABLE_ERROR, 503
+        return jsonify(VERSION_DIFF)
+
+
+@diff_ns.route('/subgraph')
+class SubgraphDiff(Resource):
+    @diff_ns.expect(subgraph_model)
+    @api.doc(
+        responses={
+            200: 'Diff returned successfully',
+            400: 'Invalid input',
+            503: 'No diff available for this data version',
+        },
+    )
+    def post(self):
+        """
+        Generate a subgraph (same parameters as /api/graph/subgraph) and return the part of /api/diff
+        that concerns its entities instead of the graph.
+        """
+        if VERSION_DIFF is None:
+            return DIFF_UNAVAILABLE_ERROR, 503
+        data = get_json_object()
+        if data is None:
+            return JSON_OBJECT_ERROR, 400
+        parameters, err = parse_subgraph_request(data)
+        if err is not None:
+            return err, 400
+        subgraph = construct_subgraph_from_parameters(parameters)
+        return jsonify(scope_version_diff(set(subgraph.nodes)))
+
+
+# register diff namespace
+api.add_namespace(diff_ns)
+
+
 # --- SETI namespace routes ---
 
 def get_works_by_collection(collection: str, include_other_collections: bool = False):
@@ -327,6 +1264,39 @@ class ByCollection(Resource):
             return jsonify(works_data)
 
 
+@seti_ns.route("/by_collection/facets")
+class CollectionFacets(Resource):
+    @api.doc(
+        params={
+            "collection": f"The name of the collection ({VALID_COLLECTIONS}), or 'all'",
+        },
+        responses={
+            200: "Discipline counts returned successfully",
+            400: "Invalid collection name or missing parameter",
+        }
+    )
+    def get(self):
+        """
+        Fetch the number of works with e-texts in a collection, and of their authors, per discipline
+        (see /api/entities/disciplines).
+        Example: /api/seti/by_collection/facets?collection=GRETIL
+        """
+        collection = request.args.get("collection")
+        if not collection:
+            return {"error": "Missing required parameter: collection"}, 400
+        works_data, error_response, status_code = get_works_by_collection(collection)
+        if error_response:
+            return error_response, status_code
+
+        work_ids = [work_id for work_id in works_data if work_id in ENTITIES_BY_ID]
+        entity_ids = set(work_ids) | set(get_author_ids_for_work_ids(work_ids))
+        return jsonify({
+            "collection": collection,
+            "count": len(entity_ids),
+            "facets": count_discipline_facets(entity_ids),
+        })
+
+
 
 @seti_ns.route("/by_collection/unique")
 class UniqueToCollection(Resource):
@@ -584,7 +1554,34 @@ def tutorials():
 
 @app.route('/data/<path:filepath>')
 def data(filepath):
-    return send_from_directory('data', filepath)
+    """
+    Serve a data file, preferring a precompressed .br/.gz sibling (see utils.compress) that the client accepts.
+    Range and conditional (If-None-Match / If-Modified-Since) requests are handled by send_file,
+    on the bytes actually sent; each encoding has its own ETag.
+    """
+    path = safe_join(DATA_DIR, filepath)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    served_path, content_encoding = path, None
+    for encoding in ENCODING_SUFFIXES:
+        if request.accept_encodings[encoding] > 0:
+            sibling = compressed_sibling(path, encoding)
+            if sibling is not None:
+                served_path, content_encoding = sibling, encoding
+                break
+
+    response = send_file(
+        served_path,
+        mimetype=mimetypes.guess_type(filepath)[0] or 'application/octet-stream',
+        download_name=os.path.basename(filepath),  # the requested name, not that of the .gz/.br sibling
+        conditional=True,
+    )
+    if content_encoding is not None:
+        response.headers['Content-Encoding'] = content_encoding
+    if any(compressed_sibling(path, encoding) for encoding in ENCODING_SUFFIXES):
+        response.vary.add('Accept-Encoding')
+    return response
 
 
 # Register the Blueprint
@@ -1,12 +1,14 @@
-from copy import deepcopy
-from typing import Dict
+from typing import Callable, Collection, Dict, List, Optional, Tuple
 
 import networkx as nx
 import matplotlib.pyplot as plt
 
 from data_models import Work, Author
+from utils.graph_export import iter_gexf, iter_graphml, write_chunks
 from utils.load import load_entities, load_link_data
-from utils.utils import load_config_dict_from_json_file, time_execution
+from utils.utils import (
+    entity_disciplines, get_neighbor_ids, get_year_range, load_config_dict_from_json_file, time_execution,
+)
 
 config_dict = load_config_dict_from_json_file()
 DEFAULT_AUTHORS = config_dict["authors"]
@@ -16,29 +18,86 @@ DEFAULT_EXCLUDE_LIST = config_dict["exclude_list"]
 draw_networkx_graph = config_dict["draw_networkx_graph"]
 networkx_figure_size = config_dict["networkx_figure_size"]
 output_gephi_file = config_dict["output_gephi_file"]
+DEFAULT_MAX_DEGREE = config_dict["max_degree"]  # None: no automatic boundary nodes
+DEFAULT_MAX_FANOUT = config_dict["max_fanout"]  # None: expand to all neighbors
 
 ENTITIES_BY_ID = load_entities()
 ETEXT_LINKS, _ = load_link_data()
 
 
+# relation kinds that a traversal can be restricted to
+EDGE_TYPES = ['authorship', 'commentary']
+
+
 @time_execution
 def construct_subgraph(
     subgraph_center: list = DEFAULT_AUTHORS+DEFAULT_WORKS,
     hops: int = DEFAULT_HOPS,
     exclude_list: list = DEFAULT_EXCLUDE_LIST,
     entities_by_id: Dict[str, Author | Work] = ENTITIES_BY_ID,
+    edge_types: Optional[Collection[str]] = None,
+    node_filter: Optional[Callable[[Author | Work], bool]] = None,
+    max_degree: Optional[int] = DEFAULT_MAX_DEGREE,
+    max_fanout: Optional[int] = DEFAULT_MAX_FANOUT,
+    degrees: Optional[Dict[str, int]] = None,
 ):
+    """
+    Breadth-first expansion from the center nodes.
+
+    edge_types (subset of EDGE_TYPES) and node_filter (see make_node_filter) restrict the expansion itself:
+    relations of other kinds aren't followed, and neighbors failing the filter are neither added nor expanded.
+    The center nodes are always included.
+
+    Hubs: nodes other than the center nodes with more than max_degree neighbors are boundary nodes, included
+    (with node attribute is_boundary=True) but not expanded, like nodes on the exclude_list. With max_fanout,
+    a node with more new neighbors (not yet visited or queued) only expands to the max_fanout of them with the
+    highest degree; its edges to nodes already visited or queued are kept regardless.
+    Degrees are looked up in `degrees` (e.g. the entity indexes' degree index), or counted from the entities.
+    """
 
     subgraph = nx.DiGraph()  # nx graph object; used are:
     # .nodes attribute
     # .add_edge and .remove_node methods (not .add_node)
 
+    follow_authorship = edge_types is None or 'authorship' in edge_types
+    follow_commentary = edge_types is None or 'commentary' in edge_types
+
+    def neighbor_ids(ids, follow):
+        if not follow:
+            return []
+        if node_filter is None:
+            return ids
+        return [neighbor_id for neighbor_id in ids if node_filter(entities_by_id[neighbor_id])]
+
+    if degrees is not None:
+        degree = degrees.__getitem__
+    else:
+        degree = lambda node_id: len(get_neighbor_ids(entities_by_id[node_id]))
+
+    def cap_fanout(*id_lists):
+        # only neighbors not yet visited or queued count against (and are ranked for) max_fanout;
+        # edges to those already in the subgraph or frontier are always kept
+        if max_fanout is None:
+            return id_lists
+        new_ids = list(dict.fromkeys(
+            neighbor_id for ids in id_lists for neighbor_id in ids if neighbor_id not in seen_node_ids
+        ))
+        if len(new_ids) <= max_fanout:
+            return id_lists
+        kept = set(sorted(new_ids, key=lambda n: -degree(n))[:max_fanout])
+        return [
+            [neighbor_id for neighbor_id in ids if neighbor_id in seen_node_ids or neighbor_id in kept]
+            for ids in id_lists
+        ]
+
     subgraph_node_ids = []  # Entity objects
     node_ids_to_append_this_time = subgraph_center  # list of 5-digit strings
+    seen_node_ids = set()  # visited, in the current frontier, or queued for the next one
 
     for i in range(hops + 1):
 
         node_ids_to_append_next_time = []
+        seen_node_ids.update(node_ids_to_append_this_time)
 
         for node_id in node_ids_to_append_this_time:
 
@@ -49,33 +108,45 @@ def construct_subgraph(
             if node_id in exclude_list:
                 continue
 
+            # keep hubs as boundary nodes, without expanding them
+            if max_degree is not None and node_id not in subgraph_center and degree(node_id) > max_degree:
+                subgraph.add_node(node_id, is_boundary=True)
+                continue
+
             # create edges and queue up connected nodes for next time
             entity: Work | Author = entities_by_id[node_id]
             if entity.type == 'work':
 
-                for author_id in entity.author_ids:
+                author_ids, base_text_ids, commentary_ids = cap_fanout(
+                    neighbor_ids(entity.author_ids, follow_authorship),
+                    neighbor_ids(entity.base_text_ids, follow_commentary),
+                    neighbor_ids(entity.commentary_ids, follow_commentary),
+                )
+
+                for author_id in author_ids:
                     node_ids_to_append_next_time.append(author_id)
                     subgraph.add_edge(author_id, entity.id, arrowstyle='-[')
 
-                for base_text_id in entity.base_text_ids:
+                for base_text_id in base_text_ids:
                     node_ids_to_append_next_time.append(base_text_id)
                     subgraph.add_edge(base_text_id, entity.id, arrowstyle='->')
 
-                for commentary_id in entity.commentary_ids:
+                for commentary_id in commentary_ids:
                     node_ids_to_append_next_time.append(commentary_id)
                     subgraph.add_edge(entity.id, commentary_id, arrowstyle='->')
 
-                if entity.author_ids == entity.base_text_ids == entity.commentary_ids == []:
-                    subgraph.add_node(entity.id)
-
             elif entity.type == 'author':
 
-                for work_id in entity.work_ids:
+                work_ids, = cap_fanout(neighbor_ids(entity.work_ids, follow_authorship))
+                for work_id in work_ids:
                     node_ids_to_append_next_time.append(work_id)
                     subgraph.add_edge(entity.id, work_id, arrowstyle='-[')
 
-                if not entity.work_ids:
-                    subgraph.add_node(entity.id)
+            seen_node_ids.update(node_ids_to_append_next_time)
+
+            # no (remaining) relations
+            if entity.id not in subgraph:
+                subgraph.add_node(entity.id)
 
         # de-dupe, first list-internally, then against previous
         node_ids_to_append_next_time = list(set(node_ids_to_append_next_time))
@@ -94,6 +165,128 @@ def construct_subgraph(
     return subgraph
 
 
+@time_execution
+def build_full_graph(entities_by_id: Dict[str, Author | Work] = ENTITIES_BY_ID) -> nx.DiGraph:
+    """
+    Build the complete graph in one linear pass over the entities.
+
+    Equivalent to construct_subgraph with every entity as a center (same nodes, edges, attributes and insertion order),
+    without the BFS bookkeeping and periphery trimming.
+    """
+    graph = nx.DiGraph()
+    for entity in entities_by_id.values():
+        if entity.type == 'work':
+            for author_id in entity.author_ids:
+                graph.add_edge(author_id, entity.id, arrowstyle='-[')
+            for base_text_id in entity.base_text_ids:
+                graph.add_edge(base_text_id, entity.id, arrowstyle='->')
+            for commentary_id in entity.commentary_ids:
+                graph.add_edge(entity.id, commentary_id, arrowstyle='->')
+            if entity.author_ids == entity.base_text_ids == entity.commentary_ids == []:
+                graph.add_node(entity.id)
+        elif entity.type == 'author':
+            for work_id in entity.work_ids:
+                graph.add_edge(entity.id, work_id, arrowstyle='-[')
+            if not entity.work_ids:
+                graph.add_node(entity.id)
+    return graph
+
+
+GEPHI_RGB = {
+    "red": {'r': 255, 'g': 0, 'b': 0},
+    "green": {'r': 6, 'g': 200, 'b': 50},
+    "gray": {'r': 128, 'g': 128, 'b': 128},
+}
+
+
+def node_label(node_id):
+    return ENTITIES_BY_ID[node_id].name
+
+
+def node_color(node_id):
+    if ENTITIES_BY_ID[node_id].id in DEFAULT_EXCLUDE_LIST:
+        return 'gray'
+    elif ENTITIES_BY_ID[node_id].type == 'work':
+        return 'red'
+    elif ENTITIES_BY_ID[node_id].type == 'author':
+        return 'green'
+
+
+def make_node_filter(
+    discipline: Optional[str] = None,
+    year_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+) -> Optional[Callable[[Author | Work], bool]]:
+    """
+    Predicate for construct_subgraph's node_filter, or None if no criteria are given.
+
+    Args:
+        discipline: Keep works of this discipline and authors who wrote in it
+        year_range: (from, to) years, either may be None; keep entities whose date range (see get_year_range,
+            with the author-date fallback for works) overlaps it. Undated entities are kept.
+    """
+    if discipline is None and year_range is None:
+        return None
+    year_from, year_to = year_range if year_range is not None else (None, None)
+
+    def node_filter(entity):
+        if discipline is not None and discipline not in entity_disciplines(entity):
+            return False
+        if year_range is not None:
+            years = get_year_range(entity)
+            if years is not None:
+                lowest_year, highest_year = years[0], years[1] if years[1] is not None else years[0]
+                if year_from is not None and highest_year < year_from:
+                    return False
+                if year_to is not None and lowest_year > year_to:
+                    return False
+        return True
+
+    return node_filter
+
+
+def add_entity_edge(graph: nx.DiGraph, node_id, other_id, entities_by_id: Dict[str, Author | Work] = ENTITIES_BY_ID):
+    """
+    Add the edge between two related entities in its usual direction and style
+    (author -> work '-[', base text -> commentary '->'), whichever order they are given in.
+    """
+    entity, other = entities_by_id[node_id], entities_by_id[other_id]
+    if entity.type == 'author':
+        graph.add_edge(node_id, other_id, arrowstyle='-[')
+    elif other.type == 'author':
+        graph.add_edge(other_id, node_id, arrowstyle='-[')
+    elif other_id in entity.commentary_ids:
+        graph.add_edge(node_id, other_id, arrowstyle='->')
+    else:
+        graph.add_edge(other_id, node_id, arrowstyle='->')
+
+
+def construct_path_subgraph(paths, entities_by_id: Dict[str, Author | Work] = ENTITIES_BY_ID) -> nx.DiGraph:
+    """
+    The minimal graph containing the given paths (lists of related entity IDs), edges directed as in construct_subgraph.
+    """
+    graph = nx.DiGraph()
+    for path in paths:
+        graph.add_nodes_from(path)
+        for node_id, next_id in zip(path, path[1:]):
+            add_entity_edge(graph, node_id, next_id, entities_by_id)
+    return graph
+
+
+def construct_lineage_subgraph(work_ids: Collection[str], entities_by_id: Dict[str, Author | Work] = ENTITIES_BY_ID) -> nx.DiGraph:
+    """
+    The base text -> commentary relations among a set of works (e.g. a work and its lineage), edges directed as in
+    construct_subgraph.
+    """
+    work_ids = set(work_ids)
+    graph = nx.DiGraph()
+    graph.add_nodes_from(work_ids)
+    for work_id in work_ids:
+        for commentary_id in entities_by_id[work_id].commentary_ids:
+            if commentary_id in work_ids:
+                graph.add_edge(work_id, commentary_id, arrowstyle='->')
+    return graph
+
+
 def assign_node_labels_and_colors(subgraph):
 
     node_ids = list(subgraph.nodes)
@@ -101,16 +294,11 @@ def assign_node_labels_and_colors(subgraph):
     color_map = []  # list
     for node_id in node_ids:
 
-        label_map[node_id] = ENTITIES_BY_ID[node_id].name
-
-        if ENTITIES_BY_ID[node_id].id in DEFAULT_EXCLUDE_LIST:
-            color_map.append('gray')
+        label_map[node_id] = node_label(node_id)
 
-        elif ENTITIES_BY_ID[node_id].type == 'work':
-            color_map.append('red')
-
-        elif ENTITIES_BY_ID[node_id].type == 'author':
-            color_map.append('green')
+        color = node_color(node_id)
+        if color is not None:
+            color_map.append(color)
 
     return label_map, color_map
 
@@ -137,30 +325,31 @@ def annotate_graph(graph: nx.DiGraph, selected_entities, exclude_list) -> nx.DiG
     return graph
 
 
-def export_to_gephi(subgraph, label_map, color_map, output_fn="pandit_grapher_output.gexf"):
-    """
-    Export a NetworkX graph to a GEXF file for Gephi with proper node labels and colors.
+def export_to_gephi(subgraph, label_map=None, color_map=None, output_fn="pandit_grapher_output.gexf"):
     """
-    rgb_map = {
-        "red": {'r': 255, 'g': 0, 'b': 0},
-        "green": {'r': 6, 'g': 200, 'b': 50},
-        "gray": {'r': 128, 'g': 128, 'b': 128},
-    }
-
-    # Create a deep copy of the graph to modify safely
-    gexf_graph = deepcopy(subgraph)
+    Export a NetworkX graph to a GEXF (or, for a .graphml output_fn, GraphML) file for Gephi with node labels and colors.
 
-    # Add labels and visualization attributes
-    for i, node_id in enumerate(gexf_graph.nodes):
-        gexf_graph.nodes[node_id]["label"] = label_map.get(node_id, f"Node {node_id}")
-        if color_map[i] in rgb_map:
-            gexf_graph.nodes[node_id]['viz'] = {
-                'color': rgb_map[color_map[i]]
-            }
-
-    # Write the graph to a GEXF file
-    nx.write_gexf(gexf_graph, output_fn, version="1.2draft")
-    print(f"GEXF file exported to {output_fn}")
+    The file is streamed node by node and edge by edge; the graph is not copied.
+    Without label_map / color_map, labels and colors are looked up lazily per node (node_label / node_color).
+    """
+    if label_map is None:
+        label_of = node_label
+    else:
+        label_of = lambda node_id: label_map.get(node_id, f"Node {node_id}")
+    if color_map is None:
+        color_name_of = node_color
+    else:
+        color_name_of = dict(zip(subgraph.nodes, color_map)).get
+
+    def color_of(node_id):
+        return GEPHI_RGB.get(color_name_of(node_id))
+
+    if output_fn.endswith(".graphml"):
+        write_chunks(iter_graphml(subgraph, label_of, color_of), output_fn)
+        print(f"GraphML file exported to {output_fn}")
+    else:
+        write_chunks(iter_gexf(subgraph, label_of, color_of), output_fn)
+        print(f"GEXF file exported to {output_fn}")
 
 
 def draw_nx_graph(subgraph, label_map, color_map):
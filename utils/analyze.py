@@ -1,28 +1,42 @@
+import argparse
 import networkx as nx
-from typing import Dict
-from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import community.community_louvain as community_louvain
 import numpy as np
 import matplotlib.pyplot as plt
+import json
 import os
+import random
+import time
 
-from utils.load import load_entities
+from utils.commentary_graph import compute_commentary_metrics
+from utils.components import SIZE_CATEGORIES
+from utils.load import load_entities, load_entity_indexes
 from data_models import Entity
-from grapher import construct_subgraph
-from utils.utils import time_execution
+from utils.construct_full_graph import get_full_graph
+from utils.utils import build_entity_indexes, time_execution, get_pandit_data_version
 
 
-SIZE_CATEGORIES = {
-    "isolated": (1, 1),
-    "extra_small": (2, 4),
-    "small": (5, 9),
-    "medium": (10, 25),
-    "large": (25, 100),
-    "extra_large": (101, 10_000),
-}
-
 DATA_ANALYSIS_RESULTS_DIR = "data/analysis_results"
 COMPONENT_INFO_DIR = "component_info"
+CENTRALITY_DIR = "centrality"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+
+# Approximate betweenness: pivots are added in doubling rounds until the estimated relative standard error
+# of the top-ranked scores is within the target (or every node has been used as a pivot, i.e. exact)
+BETWEENNESS_RELATIVE_ERROR = 0.05
+BETWEENNESS_TOP_N = 50
+BETWEENNESS_INITIAL_PIVOTS = 1000
+BETWEENNESS_SEED = 0
+
+LOUVAIN_SEED = 0
+
+EIGENVECTOR_MAX_ITER = 1000
+EIGENVECTOR_TOL = 1e-6
 
 @time_execution
 def analyze_components(G: nx.DiGraph) -> Dict:
@@ -125,8 +139,8 @@ def analyze_communities(G: nx.DiGraph) -> Dict:
     # Convert to undirected for community detection
     G_undirected = G.to_undirected()
 
-    # Detect communities using Louvain method
-    communities = community_louvain.best_partition(G_undirected)
+    # Detect communities using Louvain method (seeded, so that served community IDs are stable per data version)
+    communities = community_louvain.best_partition(G_undirected, random_state=LOUVAIN_SEED)
 
     # Analyze community sizes
     community_sizes = defaultdict(int)
@@ -153,9 +167,190 @@ def analyze_connection_patterns(G: nx.DiGraph, entities_by_id: Dict[str, Entity]
     return dict(patterns)
 
 
+# Adjacency of the graph being analyzed, set once per pool worker (see _init_betweenness_worker)
+_worker_successors: List[List[int]] = []
+
+
+def _init_betweenness_worker(successors: List[List[int]]):
+    global _worker_successors
+    _worker_successors = successors
+
+
+def _pivot_dependencies(pivots: List[int]) -> Tuple[Dict[int, float], Dict[int, float]]:
+    """
+    Brandes dependency accumulation from each pivot (unweighted, directed).
+    Per-pivot state is kept in dicts, so each pivot costs time proportional to what it reaches, not to the graph size.
+
+    Returns:
+        tuple: (sum of dependencies per node index, sum of squared dependencies per node index)
+    """
+    successors = _worker_successors
+    dependency_sums = defaultdict(float)
+    dependency_square_sums = defaultdict(float)
+    for s in pivots:
+        order = []
+        predecessors = defaultdict(list)
+        sigma = {s: 1.0}
+        distance = {s: 0}
+        queue = [s]
+        for v in queue:  # BFS; queue grows while iterating
+            order.append(v)
+            for w in successors[v]:
+                if w not in distance:
+                    distance[w] = distance[v] + 1
+                    sigma[w] = 0.0
+                    queue.append(w)
+                if distance[w] == distance[v] + 1:
+                    sigma[w] += sigma[v]
+                    predecessors[w].append(v)
+        delta = dict.fromkeys(order, 0.0)
+        for w in reversed(order):
+            coefficient = (1.0 + delta[w]) / sigma[w]
+            for v in predecessors[w]:
+                delta[v] += sigma[v] * coefficient
+            if w != s and delta[w]:
+                dependency_sums[w] += delta[w]
+                dependency_square_sums[w] += delta[w] * delta[w]
+    return dependency_sums, dependency_square_sums
+
+
+def sampled_betweenness_centrality(
+    G: nx.DiGraph,
+    relative_error: float = BETWEENNESS_RELATIVE_ERROR,
+    top_n: int = BETWEENNESS_TOP_N,
+    initial_pivots: int = BETWEENNESS_INITIAL_PIVOTS,
+    processes: Optional[int] = None,
+    seed: int = BETWEENNESS_SEED,
+) -> Tuple[Dict[str, float], Dict]:
+    """
+    Normalized betweenness centrality (same scale as nx.betweenness_centrality) estimated from k sampled pivots.
+
+    Pivots are drawn without replacement in doubling rounds, each round spread over a process pool.
+    Sampling stops once the estimated relative standard error of the top_n scores is at most relative_error;
+    if that never happens, every node ends up a pivot and the result is exact.
+
+    Returns:
+        tuple: (scores by node ID, sampling info: number of pivots, achieved relative error, exactness)
+    """
+    nodes = list(G.nodes)
+    n = len(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    successors = [[index[w] for w in G.successors(v)] for v in nodes]
+
+    pivot_order = list(range(n))
+    random.Random(seed).shuffle(pivot_order)
+
+    dependency_sums = np.zeros(n)
+    dependency_square_sums = np.zeros(n)
+    num_pivots = 0
+    achieved_error = float("inf")
+    round_size = min(n, initial_pivots)
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_betweenness_worker, initargs=(successors,)) as pool:
+        while num_pivots < n:
+            round_pivots = pivot_order[num_pivots:num_pivots + round_size]
+            num_chunks = max(1, min(len(round_pivots), 4 * processes))
+            chunks = [round_pivots[i::num_chunks] for i in range(num_chunks)]
+            for sums, square_sums in pool.map(_pivot_dependencies, chunks):
+                for i, value in sums.items():
+                    dependency_sums[i] += value
+                for i, value in square_sums.items():
+                    dependency_square_sums[i] += value
+            num_pivots += len(round_pivots)
+            round_size = num_pivots  # double the sample
+
+            # Standard error of the per-pivot mean, with finite-population correction (zero once exact)
+            mean = dependency_sums / num_pivots
+            variance = np.maximum(dependency_square_sums / num_pivots - mean ** 2, 0.0)
+            correction = (n - num_pivots) / (n - 1) if n > 1 else 0.0
+            standard_error = np.sqrt(variance / num_pivots * correction)
+            top = np.argsort(mean)[::-1][:top_n]
+            top = top[mean[top] > 0]
+            achieved_error = float(np.max(standard_error[top] / mean[top])) if len(top) else 0.0
+            if achieved_error <= relative_error:
+                break
+
+    # Estimate of the sum over all sources, rescaled like networkx (directed, normalized)
+    scale = n / num_pivots / ((n - 1) * (n - 2)) if n > 2 else 0.0
+    scores = {node: float(dependency_sums[i] * scale) for i, node in enumerate(nodes)}
+    info = {
+        "num_pivots": num_pivots,
+        "num_nodes": n,
+        "relative_error_target": relative_error,
+        "achieved_relative_error": achieved_error,
+        "top_n": top_n,
+        "seed": seed,
+        "exact": num_pivots == n,
+    }
+    return scores, info
+
+
+def sparse_eigenvector_centrality(
+    G: nx.DiGraph,
+    max_iter: int = EIGENVECTOR_MAX_ITER,
+    tol: float = EIGENVECTOR_TOL,
+) -> Optional[Dict[str, float]]:
+    """
+    Eigenvector centrality (in-edges, as nx.eigenvector_centrality) by power iteration on a sparse adjacency matrix.
+    Iterates with A^T + I, like networkx, so that it also converges on (nearly) acyclic graphs.
+
+    Returns:
+        dict: Scores by node ID (unit L2 norm), or None if the iteration does not converge
+    """
+    nodes = list(G.nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    A_T = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format="csr").T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_last = x
+        x = x_last + A_T @ x_last
+        norm = np.linalg.norm(x)
+        x = x / norm if norm else x
+        if np.abs(x - x_last).sum() < n * tol:
+            return {node: float(value) for node, value in zip(nodes, x)}
+    return None
+
+
+def centrality_cache_path(approximate: bool) -> str:
+    mode = "approximate" if approximate else "exact"
+    return os.path.join(DATA_ANALYSIS_RESULTS_DIR, CENTRALITY_DIR, f"{PANDIT_DATA_VERSION}-centrality-{mode}.json")
+
+
 @time_execution
-def analyze_centrality(G: nx.DiGraph) -> Dict:
-    """Calculate various centrality metrics"""
+def analyze_centrality(
+    G: nx.DiGraph,
+    approximate: bool = True,
+    relative_error: float = BETWEENNESS_RELATIVE_ERROR,
+    processes: Optional[int] = None,
+    use_cache: bool = True,
+) -> Dict:
+    """
+    Calculate various centrality metrics
+
+    Results are cached per Pandit data version (and betweenness settings)
+    in data/analysis_results/centrality/, so each data release computes them once.
+
+    Args:
+        G: NetworkX directed graph
+        approximate: Estimate betweenness from sampled pivots instead of using every node as a pivot
+        relative_error: Error target for approximate betweenness (relative standard error of the top scores)
+        processes: Size of the process pool for approximate betweenness (default: CPU count)
+        use_cache: Reuse a cached result for this data version and these settings, if present
+
+    Returns:
+        dict: Metric name -> scores by node ID (eigenvector is None if it does not converge)
+    """
+    cache_path = centrality_cache_path(approximate)
+    settings = {"approximate": approximate, "relative_error": relative_error if approximate else None,
+                "num_nodes": G.number_of_nodes(), "num_edges": G.number_of_edges()}
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf8') as f:
+            cached = json.load(f)
+        if cached.get("pandit_data_version") == PANDIT_DATA_VERSION and cached.get("settings") == settings:
+            return cached["centrality"]
+
     centrality_metrics = {}
 
     # Degree centrality
@@ -163,13 +358,24 @@ def analyze_centrality(G: nx.DiGraph) -> Dict:
     centrality_metrics['out_degree'] = nx.out_degree_centrality(G)
 
     # Betweenness centrality
-    centrality_metrics['betweenness'] = nx.betweenness_centrality(G)
+    centrality_metrics['betweenness'], betweenness_info = sampled_betweenness_centrality(
+        G,
+        relative_error=relative_error,
+        initial_pivots=BETWEENNESS_INITIAL_PIVOTS if approximate else G.number_of_nodes(),
+        processes=processes,
+    )
 
-    # Eigenvector centrality (try/except because it might not converge)
-    try:
-        centrality_metrics['eigenvector'] = nx.eigenvector_centrality(G)
-    except:
-        centrality_metrics['eigenvector'] = None
+    # Eigenvector centrality (None if it does not converge)
+    centrality_metrics['eigenvector'] = sparse_eigenvector_centrality(G)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf8') as f:
+        json.dump({
+            "pandit_data_version": PANDIT_DATA_VERSION,
+            "settings": settings,
+            "betweenness_sampling": betweenness_info,
+            "centrality": centrality_metrics,
+        }, f, ensure_ascii=False)
 
     return centrality_metrics
 
@@ -223,46 +429,29 @@ def analyze_temporal_patterns(G: nx.DiGraph, entities_by_id: Dict[str, Entity])
         'branching_factors': []
     }
 
-    def get_commentary_chain_length(work_id: str, visited: set) -> int:
-        """Recursively measure commentary chain length"""
-        if work_id in visited:
-            return 0
-
-        visited.add(work_id)
-        entity = entities_by_id[work_id]
-
-        if entity.type != 'work' or not entity.commentary_ids:
-            return 1
-
-        max_subchain = 0
-        for commentary_id in entity.commentary_ids:
-            subchain_length = get_commentary_chain_length(commentary_id, visited)
-            max_subchain = max(max_subchain, subchain_length)
+    # Per-work chain lengths etc. from one pass over the condensed commentary graph
+    commentary_metrics = compute_commentary_metrics(entities_by_id)
 
-        return 1 + max_subchain
-
-    # Analyze commentary chains
     for node in G.nodes():
         entity = entities_by_id[node]
-        if entity.type == 'work' and not entity.base_text_ids:  # Root works
-            chain_length = get_commentary_chain_length(node, set())
-            patterns['commentary_chain_lengths'].append(chain_length)
-            patterns['max_commentary_chain'] = max(
-                patterns['max_commentary_chain'],
-                chain_length
-            )
+        if entity.type != 'work':
+            continue
+        work_metrics = commentary_metrics[node]
 
-    # Calculate branching factors
-    for node in G.nodes():
-        entity = entities_by_id[node]
-        if entity.type == 'work':
-            num_commentaries = len(entity.commentary_ids)
-            if num_commentaries > 0:
-                patterns['branching_factors'].append(num_commentaries)
+        # Analyze commentary chains from root works
+        if not entity.base_text_ids:
+            patterns['commentary_chain_lengths'].append(work_metrics['chain_length'])
+            patterns['max_commentary_chain'] = max(patterns['max_commentary_chain'], work_metrics['chain_length'])
+
+        # Calculate branching factors
+        if work_metrics['num_commentaries'] > 0:
+            patterns['branching_factors'].append(work_metrics['num_commentaries'])
 
     if patterns['branching_factors']:
         patterns['avg_branching_factor'] = np.mean(patterns['branching_factors'])
 
+    patterns['works_in_commentary_cycles'] = sum(m['in_cycle'] for m in commentary_metrics.values())
+
     return patterns
 
 
@@ -473,46 +662,299 @@ def write_all_metrics(metrics: Dict):
         f.write(f"Maximum commentary chain length: {metrics['temporal_patterns']['max_commentary_chain']}\n")
         if metrics['temporal_patterns'].get('avg_branching_factor'):
             f.write(f"Average branching factor: {metrics['temporal_patterns']['avg_branching_factor']:.2f}\n")
+        f.write(f"Works in commentary cycles: {metrics['temporal_patterns']['works_in_commentary_cycles']}\n")
         f.write("\n")
 
         # Centrality and influential nodes (if available)
         if 'centrality' in metrics and 'influential_nodes' in metrics:
-            f.write("Most Influential Nodes:\n")
-            for metric_type, nodes in metrics['influential_nodes'].items():
-                f.write(f"\nTop nodes by {metric_type}:\n")
-                for node in nodes:
-                    f.write(f"  {node['name']} ({node['id']}) ({node['type']}): {node['score']:.4f}\n")
+            write_influential_nodes(f, metrics['influential_nodes'])
 
 
-if __name__ == "__main__":
-    entities_by_id = load_entities()
+def write_influential_nodes(f, influential_nodes: Dict):
+    """
+    Write the top nodes for each centrality metric to an open text file.
+    """
+    f.write("Most Influential Nodes:\n")
+    for metric_type, nodes in influential_nodes.items():
+        f.write(f"\nTop nodes by {metric_type}:\n")
+        for node in nodes:
+            f.write(f"  {node['name']} ({node['id']}) ({node['type']}): {node['score']:.4g}\n")
 
-    # Create full graph (center on all entities, use large number of hops)
-    G = construct_subgraph(
-        subgraph_center=list(entities_by_id.keys()),
-        entities_by_id=entities_by_id,
-        hops=25,
-    )
 
-    # Compute component metrics
-    metrics = {}
-    metrics['components'] = analyze_components(G)
+def write_centrality_summary(influential_nodes: Dict):
+    """
+    Write the most influential nodes (refreshed on every data release) to the centrality results directory.
+    """
+    full_output_dir = os.path.join(DATA_ANALYSIS_RESULTS_DIR, CENTRALITY_DIR)
+    os.makedirs(full_output_dir, exist_ok=True)
+    with open(os.path.join(full_output_dir, 'influential_nodes.txt'), 'w') as f:
+        f.write(f"Pandit data version: {PANDIT_DATA_VERSION}\n\n")
+        write_influential_nodes(f, influential_nodes)
 
-    # Output component analysis results to file
-    component_info = metrics['components']
+
+# --- parallel runner: workers inherit the graph and entities by fork, metrics fan out over a process pool ---
+
+# Graph and entities of a metric worker, set once per process by _init_metric_worker
+_worker_graph: Optional[nx.DiGraph] = None
+_worker_entities: Dict[str, Entity] = {}
+
+# Forked workers get the parent's graph and entities as copy-on-write pages, without pickling, re-reading or
+# rebuilding them; where fork is unavailable, they are pickled to each worker once instead
+METRIC_POOL_CONTEXT = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+
+def _init_metric_worker(G: nx.DiGraph, entities_by_id: Dict[str, Entity]):
+    global _worker_graph, _worker_entities
+    _worker_graph = G
+    _worker_entities = entities_by_id
+
+
+def _components_task(G, entities_by_id, options):
+    component_info = analyze_components(G)
     write_component_summary(component_info, len(entities_by_id))
     write_component_names(component_info, entities_by_id)
     plot_component_histograms(component_info)
     plot_complete_histogram(component_info, 'complete_component_distribution_3-23.png', include_small=False)
     plot_complete_histogram(component_info, 'complete_component_distribution.png', include_small=True)
+    return {'components': component_info}
+
+
+def _centrality_task(G, entities_by_id, options):
+    centrality = analyze_centrality(
+        G, approximate=options['approximate_centrality'], processes=options['centrality_processes'],
+    )
+    influential_nodes = find_influential_nodes(centrality, entities_by_id, top_n=10)
+    write_centrality_summary(influential_nodes)
+    return {'centrality': centrality, 'influential_nodes': influential_nodes}
+
+
+def _misc_task(G, entities_by_id, options):
+    return misc_metrics(G, entities_by_id)
+
+
+def _communities_task(G, entities_by_id, options):
+    return {'communities': analyze_communities(G)}
+
+
+def _connection_patterns_task(G, entities_by_id, options):
+    return {'connection_patterns': analyze_connection_patterns(G, entities_by_id)}
+
+
+def _temporal_patterns_task(G, entities_by_id, options):
+    return {'temporal_patterns': analyze_temporal_patterns(G, entities_by_id)}
+
+
+def _commentary_chains_task(G, entities_by_id, options):
+    return {'commentary_chains': compute_commentary_metrics(entities_by_id)}
+
+
+METRIC_TASKS = {
+    # name: (function(G, entities_by_id, options) -> dict of metrics, part of every run rather than only --more-metrics)
+    'components': (_components_task, True),
+    'centrality': (_centrality_task, True),
+    'communities': (_communities_task, True),
+    'commentary_chains': (_commentary_chains_task, True),
+    'misc': (_misc_task, False),
+    'connection_patterns': (_connection_patterns_task, False),
+    'temporal_patterns': (_temporal_patterns_task, False),
+}
+
+
+def _run_metric_task(name: str, options: Dict) -> Tuple[str, Dict, float]:
+    """Run one metric task on the worker's graph; returns its name, metrics and wall time."""
+    start = time.perf_counter()
+    result = METRIC_TASKS[name][0](_worker_graph, _worker_entities, options)
+    return name, result, time.perf_counter() - start
+
+
+def write_metrics_json(metrics: Dict, output_fn: str = 'network_metrics.json'):
+    """
+    Write the JSON-serializable summary of the metrics (no per-node scores or component members) next to network_metrics.txt.
+    """
+    summary = {'pandit_data_version': PANDIT_DATA_VERSION}
+    for key in ['num_nodes', 'num_edges', 'density', 'node_type_distribution', 'degree_stats',
+                'connection_patterns', 'influential_nodes', 'timings']:
+        if key in metrics:
+            summary[key] = metrics[key]
+    if 'components' in metrics:
+        summary['components'] = {
+            'total_components': metrics['components']['total_components'],
+            **{category: {k: metrics['components'][category][k] for k in ['node_count', 'component_count', 'size_histogram']}
+               for category in SIZE_CATEGORIES},
+        }
+    if 'communities' in metrics:
+        summary['communities'] = {k: metrics['communities'][k] for k in ['num_communities', 'community_sizes']}
+    if 'temporal_patterns' in metrics:
+        summary['temporal_patterns'] = {k: v for k, v in metrics['temporal_patterns'].items() if not isinstance(v, list)}
+
+    os.makedirs(DATA_ANALYSIS_RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(DATA_ANALYSIS_RESULTS_DIR, output_fn), 'w', encoding='utf8') as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False, default=float)
+
+
+# Per-node columns of the node analytics artifact; the integer-valued ones are IDs or counts
+NODE_ANALYTICS_METRICS = [
+    'in_degree', 'out_degree', 'betweenness', 'eigenvector',
+    'community', 'community_size', 'component', 'component_size',
+    'chain_length', 'depth', 'num_descendants',
+]
+UNRANKED_NODE_ANALYTICS_METRICS = ['community', 'component']  # labels, not scores
+
+
+def write_node_analytics(metrics: Dict, G: nx.DiGraph, entity_indexes: Dict):
+    """
+    Save per-node centrality scores, community and component IDs/sizes and commentary-chain metrics
+    as data/<pandit version>-node-analytics.json, in columnar form (one array per metric, aligned with node_ids;
+    null where a metric does not apply), for serving by the /api/analysis namespace.
+    Component IDs and sizes are those of the entity indexes (see build_entity_indexes), so they match the API's.
+    """
+    nodes = list(G.nodes)
+    columns = {}
+
+    for name in ['in_degree', 'out_degree', 'betweenness', 'eigenvector']:
+        scores = metrics['centrality'].get(name) or {}
+        columns[name] = [float(f"{scores[node]:.6g}") if node in scores else None for node in nodes]
+
+    partition = metrics['communities']['node_communities']
+    community_sizes = metrics['communities']['community_sizes']
+    columns['community'] = [partition.get(node) for node in nodes]
+    columns['community_size'] = [community_sizes[partition[node]] if node in partition else None for node in nodes]
+
+    component_of, component_sizes = entity_indexes["component_ids"], entity_indexes["component_sizes"]
+    columns['component'] = [component_of[node] for node in nodes]
+    columns['component_size'] = [component_sizes[component_of[node]] for node in nodes]
+
+    chains = metrics['commentary_chains']
+    for name in ['chain_length', 'depth', 'num_descendants']:
+        columns[name] = [chains[node][name] if node in chains else None for node in nodes]
+
+    output_filename = f"{PANDIT_DATA_VERSION}-node-analytics.json"
+    with open(os.path.join("data", output_filename), 'w', encoding='utf8') as f:
+        json.dump({
+            "pandit_data_version": PANDIT_DATA_VERSION,
+            "node_ids": nodes,
+            "ranked_metrics": [m for m in NODE_ANALYTICS_METRICS if m not in UNRANKED_NODE_ANALYTICS_METRICS],
+            "metrics": {name: columns[name] for name in NODE_ANALYTICS_METRICS},
+        }, f, ensure_ascii=False)
+
+
+def coarsen_by_community(G: nx.DiGraph, partition: Dict[str, int], entities_by_id: Dict[str, Entity]) -> Dict:
+    """
+    Collapse each Louvain community into a supernode, with weighted edges between communities.
+
+    Supernodes carry their size, work/author counts, the name of their best-connected member,
+    the dominant work discipline (with its share of the community's works) and the range of known years.
+
+    Returns:
+        dict: 'supernodes' (largest first) and 'edges' as [source community, target community, number of edges]
+    """
+    members = defaultdict(list)
+    for node in G.nodes:
+        members[partition[node]].append(node)
+
+    supernodes = []
+    for community_id, nodes in members.items():
+        entities = [entities_by_id[node] for node in nodes]
+        works = [e for e in entities if e.type == 'work']
+        disciplines = Counter(w.discipline for w in works if w.discipline)
+        dominant_discipline, dominant_count = disciplines.most_common(1)[0] if disciplines else (None, 0)
+        years = [
+            year
+            for e in entities
+            for year in (
+                (e.lowest_year, e.highest_year) if e.highest_year is not None
+                else (getattr(e, 'author_lowest_year', None), getattr(e, 'author_highest_year', None))
+            )
+            if year is not None
+        ]
+        hub = max(nodes, key=G.degree)
+        supernodes.append({
+            "id": community_id,
+            "size": len(nodes),
+            "num_works": len(works),
+            "num_authors": len(entities) - len(works),
+            "label": entities_by_id[hub].name,
+            "hub_id": hub,
+            "dominant_discipline": dominant_discipline,
+            "dominant_discipline_share":
+                round(dominant_count / len(works), 3) if dominant_discipline is not None else None,
+            "date_range": [min(years), max(years)] if years else None,
+        })
+    supernodes.sort(key=lambda supernode: (-supernode["size"], supernode["id"]))
+
+    edge_weights = Counter(
+        (partition[source], partition[target]) for source, target in G.edges if partition[source] != partition[target]
+    )
+    return {
+        "supernodes": supernodes,
+        "edges": [[source, target, weight] for (source, target), weight in sorted(edge_weights.items())],
+    }
+
+
+def write_community_graph(metrics: Dict, G: nx.DiGraph, entities_by_id: Dict[str, Entity]):
+    """
+    Save the community-coarsened overview graph as data/<pandit version>-community-graph.json
+    (community IDs match those in node-analytics.json).
+    """
+    output_filename = f"{PANDIT_DATA_VERSION}-community-graph.json"
+    with open(os.path.join("data", output_filename), 'w', encoding='utf8') as f:
+        json.dump({
+            "pandit_data_version": PANDIT_DATA_VERSION,
+            **coarsen_by_community(G, metrics['communities']['node_communities'], entities_by_id),
+        }, f, ensure_ascii=False)
+
+
+def run_analysis(compute_more_metrics: bool = False, approximate_centrality: bool = True, processes: Optional[int] = None):
+    """
+    Write component analysis, centrality and per-node analytics outputs, and (optionally) the remaining network metrics.
+    Centrality is computed on every run (cached per data version), so it is refreshed with each data release.
+
+    The independent metric tasks run concurrently in a process pool whose workers inherit the full graph and the entities
+    by fork, so a run takes about as long as its slowest task. Per-task wall times are recorded under metrics['timings'].
+
+    Args:
+        processes: Total number of processes (default: CPU count). Each task gets one; betweenness centrality,
+            by far the slowest, spreads over those left over, so the CPUs are not oversubscribed.
+    """
+    start = time.perf_counter()
+    entities_by_id = load_entities()
+
+    # Load the full graph snapshot (built directly from the entities if missing or stale)
+    G = get_full_graph(entities_by_id)
+
+    task_names = [name for name, (_, default) in METRIC_TASKS.items() if default or compute_more_metrics]
+    processes = processes or os.cpu_count() or 1
+    options = {
+        'approximate_centrality': approximate_centrality,
+        # the centrality task's own process waits on its betweenness pool, which takes its place
+        'centrality_processes': max(1, processes - (len(task_names) - 1)),
+    }
+    metrics = {'timings': {}}
+    with ProcessPoolExecutor(max_workers=min(processes, len(task_names)), mp_context=METRIC_POOL_CONTEXT,
+                             initializer=_init_metric_worker, initargs=(G, entities_by_id)) as pool:
+        futures = [pool.submit(_run_metric_task, name, options) for name in task_names]
+        for future in as_completed(futures):
+            name, result, seconds = future.result()
+            metrics.update(result)
+            metrics['timings'][name] = seconds
+    metrics['timings'] = {name: metrics['timings'][name] for name in task_names}
+    metrics['timings']['total'] = time.perf_counter() - start
 
-    compute_more_metrics = False
     if compute_more_metrics:
-        metrics.update(misc_metrics(G, entities_by_id))
-        metrics['communities'] = analyze_communities(G)
-        metrics['connection_patterns'] = analyze_connection_patterns(G, entities_by_id)
-        metrics['centrality'] = analyze_centrality(G)
-        metrics['influential_nodes'] = find_influential_nodes(metrics['centrality'], entities_by_id, top_n=10)
-        metrics['temporal_patterns'] = analyze_temporal_patterns(G, entities_by_id)
         write_all_metrics(metrics)
+    write_metrics_json(metrics)
+    write_node_analytics(metrics, G, load_entity_indexes() or build_entity_indexes(entities_by_id, PANDIT_DATA_VERSION))
+    write_community_graph(metrics, G, entities_by_id)
 
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze the full Pandit graph.")
+    parser.add_argument("--more-metrics", action="store_true", help="Also compute misc, connection and temporal pattern metrics")
+    parser.add_argument("--exact-centrality", action="store_true", help="Use every node as a betweenness pivot")
+    parser.add_argument("--processes", type=int, help="Total number of processes to use (default: CPU count)")
+    args = parser.parse_args()
+    metrics = run_analysis(args.more_metrics, not args.exact_centrality, args.processes)
+    for name, seconds in metrics['timings'].items():
+        print(f"{name:<20} {seconds:.2f} s")
@@ -0,0 +1,266 @@
+# commentary graph engine: base text -> commentary relations among works, condensed into a DAG of SCCs
+
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+from data_models import Entity
+from utils.utils import time_execution
+
+
+def get_commentary_successors(entities_by_id: Dict[str, Entity]) -> Dict[str, List[str]]:
+    """
+    Commentary IDs of every work (base text -> commentary edges), including works without any.
+    """
+    return {eid: entity.commentary_ids for eid, entity in entities_by_id.items() if entity.type == 'work'}
+
+
+def strongly_connected_components(successors: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Tarjan's algorithm with an explicit stack (no recursion limit).
+
+    Returns:
+        list: Components as lists of node IDs, in reverse topological order (a component comes after all it points to)
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in successors:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work_stack = [(root, iter(successors[root]))]
+        while work_stack:
+            v, neighbors = work_stack[-1]
+            for w in neighbors:
+                if w not in index:
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack.add(w)
+                    work_stack.append((w, iter(successors[w])))
+                    break
+                elif w in on_stack:
+                    lowlink[v] = min(lowlink[v], index[w])
+            else:  # all neighbors of v done
+                work_stack.pop()
+                if work_stack:
+                    parent = work_stack[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[v])
+                if lowlink[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def condense(successors: Dict[str, List[str]]) -> Tuple[List[List[str]], Dict[str, int], List[List[int]]]:
+    """
+    Condensation of a graph: its SCCs (in reverse topological order), the component of every node,
+    and the successor components of every component (sorted, without self-loops).
+    """
+    components = strongly_connected_components(successors)
+    component_of = {node: c for c, component in enumerate(components) for node in component}
+    component_successors = [
+        sorted({component_of[w] for v in component for w in successors[v]} - {c})
+        for c, component in enumerate(components)
+    ]
+    return components, component_of, component_successors
+
+
+def interval_labels(successors: List[List[int]]) -> Tuple[List[int], List[int], List[List[Tuple[int, int]]]]:
+    """
+    Interval labeling of a DAG (Agrawal et al.'s compressed transitive closure).
+
+    A DFS spanning forest numbers the nodes in postorder, so every subtree is a contiguous range of numbers.
+    Each node is labeled with its subtree range merged with its successors' labels, which are complete first
+    because in a DAG all successors finish before a node. A node reaches another exactly if the other's number
+    lies in one of its intervals; most nodes need a single interval.
+
+    Args:
+        successors: Successor node numbers of every node (0..n-1) of a DAG
+
+    Returns:
+        tuple: (postorder number of every node, node of every postorder number, sorted disjoint intervals of every node)
+    """
+    n = len(successors)
+    has_predecessor = [False] * n
+    for node_successors in successors:
+        for w in node_successors:
+            has_predecessor[w] = True
+
+    post = [-1] * n
+    low = [0] * n
+    order = []
+    visited = [False] * n
+    for root in (v for v in range(n) if not has_predecessor[v]):
+        visited[root] = True
+        low[root] = len(order)
+        work_stack = [(root, iter(successors[root]))]
+        while work_stack:
+            v, children = work_stack[-1]
+            for w in children:
+                if not visited[w]:
+                    visited[w] = True
+                    low[w] = len(order)
+                    work_stack.append((w, iter(successors[w])))
+                    break
+            else:  # all children of v done
+                work_stack.pop()
+                post[v] = len(order)
+                order.append(v)
+
+    intervals: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+    for v in order:
+        ranges = sorted([(low[v], post[v])] + [interval for w in successors[v] for interval in intervals[w]])
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            if start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        intervals[v] = merged
+    return post, order, intervals
+
+
+class LineageIndex:
+    """
+    Reachability over the base text -> commentary graph of works, after condensing commentary cycles.
+
+    Interval labels in both directions give ancestor / descendant tests in O(log k) for a work with k intervals
+    (almost always 1), independent of the length of the chains. They also give the components of a lineage up front
+    (slices of a postorder array), so the breadth-first search that puts them in generation order stops as soon as
+    the last one is reached.
+    """
+
+    def __init__(self, successors: Dict[str, List[str]]):
+        """
+        Args:
+            successors: Commentary IDs of every work (see get_commentary_successors)
+        """
+        self.components, self.component_of, component_successors = condense(successors)
+        component_predecessors = [[] for _ in self.components]
+        for c, children in enumerate(component_successors):
+            for child in children:
+                component_predecessors[child].append(c)
+        # descendants along commentaries, ancestors along base texts
+        self.adjacency = {"descendants": component_successors, "ancestors": component_predecessors}
+        self.labels = {
+            "descendants": interval_labels(component_successors),
+            "ancestors": interval_labels(component_predecessors),
+        }
+
+    @classmethod
+    @time_execution
+    def from_entities(cls, entities_by_id: Dict[str, Entity]) -> "LineageIndex":
+        return cls(get_commentary_successors(entities_by_id))
+
+    def __contains__(self, work_id: str) -> bool:
+        return work_id in self.component_of
+
+    def num_intervals(self) -> Dict[str, int]:
+        return {direction: sum(map(len, intervals)) for direction, (_, _, intervals) in self.labels.items()}
+
+    def is_descendant(self, work_id: str, base_text_id: str) -> bool:
+        """
+        Whether a work is a (direct or indirect) commentary on a base text. Works in one commentary cycle
+        are descendants of each other; a work is not its own.
+        """
+        if work_id == base_text_id:
+            return False
+        c, base_c = self.component_of[work_id], self.component_of[base_text_id]
+        if c == base_c:
+            return True
+        post, _, intervals = self.labels["descendants"]
+        base_intervals = intervals[base_c]
+        i = bisect_right(base_intervals, (post[c], float("inf"))) - 1
+        return i >= 0 and base_intervals[i][0] <= post[c] <= base_intervals[i][1]
+
+    def lineage(self, work_id: str, direction: str = "descendants") -> List[str]:
+        """
+        Descendants (commentaries, sub-commentaries, ...) or ancestors (base texts, their base texts, ...) of a work,
+        without the work itself, by generation: works in a commentary cycle with it first, then those one relation
+        away, then two, ... (the shortest chain counts; ties in the order of the work's relations).
+        """
+        c = self.component_of[work_id]
+        _, order, intervals = self.labels[direction]
+        remaining = {order[post_number] for start, end in intervals[c] for post_number in range(start, end + 1)}
+        remaining.discard(c)
+        lineage = [node for node in self.components[c] if node != work_id]
+        generation = [c]
+        while remaining:
+            next_generation = []
+            for v in generation:
+                for w in self.adjacency[direction][v]:
+                    if w in remaining:
+                        remaining.discard(w)
+                        next_generation.append(w)
+                        lineage.extend(self.components[w])
+            generation = next_generation
+        return lineage
+
+
+@time_execution
+def compute_commentary_metrics(entities_by_id: Dict[str, Entity]) -> Dict[str, Dict]:
+    """
+    Longest commentary chain, depth and descendant count for every work, in linear passes over the condensation
+    of the commentary graph (cycles of works commenting on each other are collapsed into one node).
+
+    Per work:
+      - chain_length: number of works on the longest commentary chain starting at this work (itself included)
+      - depth: number of works on the longest base-text chain above this work (0 for root works)
+      - num_descendants: number of distinct works reachable through commentaries (direct or indirect)
+      - num_commentaries: number of direct commentaries
+      - in_cycle: whether the work is part of a commentary cycle (all cycle members count towards chains)
+
+    Returns:
+        dict: Metrics by work ID
+    """
+    successors = get_commentary_successors(entities_by_id)
+    components, component_of, component_successors = condense(successors)
+
+    # Bottom-up (components come sinks first): chain lengths, and descendant sets as bitsets over works
+    component_bits = [0] * len(components)
+    for node_index, node in enumerate(component_of):
+        component_bits[component_of[node]] |= 1 << node_index
+    chain_length = [0] * len(components)
+    descendants = [0] * len(components)
+    for c, component in enumerate(components):
+        longest_below = 0
+        reachable = 0
+        for child in component_successors[c]:
+            longest_below = max(longest_below, chain_length[child])
+            reachable |= descendants[child] | component_bits[child]
+        chain_length[c] = len(component) + longest_below
+        descendants[c] = reachable
+
+    # Top-down: depth below the longest chain of base texts
+    depth = [0] * len(components)
+    for c in reversed(range(len(components))):
+        for child in component_successors[c]:
+            depth[child] = max(depth[child], depth[c] + len(components[c]))
+
+    return {
+        node: {
+            "chain_length": chain_length[c],
+            "depth": depth[c],
+            "num_descendants": descendants[c].bit_count() + len(components[c]) - 1,
+            "num_commentaries": len(successors[node]),
+            "in_cycle": len(components[c]) > 1,
+        }
+        for node, c in component_of.items()
+    }
+
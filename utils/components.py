@@ -0,0 +1,318 @@
+# persistent union-find (disjoint-set) index of connected components, updated incrementally when a data delta arrives
+
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from data_models import Entity
+from utils.utils import get_neighbor_ids, get_pandit_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+
+SIZE_CATEGORIES = {
+    "isolated": (1, 1),
+    "extra_small": (2, 4),
+    "small": (5, 9),
+    "medium": (10, 25),
+    "large": (25, 100),
+    "extra_large": (101, 10_000),
+}
+
+
+class ComponentIndex:
+    """
+    Connected components of the (undirected) entity graph as a disjoint-set forest over entity indices.
+
+    Added edges are unions (near-constant time each). Removed edges and entities mark their component dirty;
+    dirty components are then recomputed locally by a traversal of just their members.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.parent: List[int] = []
+        self.members: Dict[int, List[int]] = {}  # root -> member indices
+        self.adjacency: Dict[int, Set[int]] = defaultdict(set)
+        self.alive: List[bool] = []
+
+    @classmethod
+    def from_adjacency(cls, adjacency: Dict[str, Iterable[str]]) -> "ComponentIndex":
+        component_index = cls()
+        for node_id in adjacency:
+            component_index.add_node(node_id)
+        for node_id, neighbor_ids in adjacency.items():
+            for neighbor_id in neighbor_ids:
+                component_index.add_edge(node_id, neighbor_id)
+        return component_index
+
+    # --- core operations ---
+
+    def add_node(self, node_id: str) -> int:
+        if node_id in self.index:
+            i = self.index[node_id]
+            if not self.alive[i]:
+                self.alive[i] = True
+                self.parent[i] = i
+                self.members[i] = [i]
+            return i
+        i = len(self.ids)
+        self.ids.append(node_id)
+        self.index[node_id] = i
+        self.parent.append(i)
+        self.members[i] = [i]
+        self.alive.append(True)
+        return i
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # path halving
+            i = parent[i]
+        return i
+
+    def add_edge(self, source_id: str, target_id: str):
+        a, b = self.add_node(source_id), self.add_node(target_id)
+        if a == b:
+            return
+        self.adjacency[a].add(b)
+        self.adjacency[b].add(a)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if len(self.members[root_a]) < len(self.members[root_b]):  # union by size
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.members[root_a].extend(self.members.pop(root_b))
+
+    def remove_edge(self, source_id: str, target_id: str) -> Optional[int]:
+        """
+        Remove an edge; returns the root of the component that may now be split (or None if the edge was absent).
+        """
+        a, b = self.index.get(source_id), self.index.get(target_id)
+        if a is None or b is None or b not in self.adjacency[a]:
+            return None
+        self.adjacency[a].discard(b)
+        self.adjacency[b].discard(a)
+        return self.find(a)
+
+    def remove_node(self, node_id: str) -> Optional[int]:
+        """
+        Remove an entity and its edges; returns the root of the component that may now be split.
+        """
+        i = self.index.get(node_id)
+        if i is None or not self.alive[i]:
+            return None
+        root = self.find(i)
+        for j in self.adjacency.pop(i, set()):
+            self.adjacency[j].discard(i)
+        self.alive[i] = False
+        return root
+
+    def recompute(self, roots: Iterable[int]):
+        """
+        Re-split the given (dirty) components by traversing only their live members.
+        """
+        for root in set(roots):
+            members = [i for i in self.members.pop(root) if self.alive[i]]
+            seen = set()
+            for start in members:
+                if start in seen:
+                    continue
+                seen.add(start)
+                part = [start]
+                for i in part:  # BFS; part grows while iterating
+                    for j in self.adjacency.get(i, ()):
+                        if j not in seen:
+                            seen.add(j)
+                            part.append(j)
+                for i in part:
+                    self.parent[i] = start
+                self.members[start] = part
+
+    # --- views ---
+
+    def live_ids(self) -> List[str]:
+        return [node_id for node_id, alive in zip(self.ids, self.alive) if alive]
+
+    def component_of(self, node_id: str) -> int:
+        """Root index of an entity's component (stable until the next update)."""
+        return self.find(self.index[node_id])
+
+    def component_numbering(self, ordered_ids: Iterable[str]) -> Tuple[Dict[str, int], List[int]]:
+        """
+        Number components in order of their first entity in ordered_ids (as utils.utils.build_entity_indexes does).
+
+        Returns:
+            tuple: (component number by entity ID, component sizes by number)
+        """
+        numbers = {}
+        component_ids = {}
+        component_sizes = []
+        for node_id in ordered_ids:
+            root = self.component_of(node_id)
+            if root not in numbers:
+                numbers[root] = len(component_sizes)
+                component_sizes.append(len(self.members[root]))
+            component_ids[node_id] = numbers[root]
+        return component_ids, component_sizes
+
+    def size_stats(self, ordered_ids: Iterable[str]) -> Dict:
+        """
+        Component and node counts, size histogram and members per size category, in the shape of
+        utils.analyze.analyze_components (so its summary and component name files can be written from it):
+        components by size, then in order of their first entity in ordered_ids, as sets of entity IDs.
+        """
+        components_by_size = defaultdict(list)
+        for root in dict.fromkeys(self.component_of(node_id) for node_id in ordered_ids):
+            members = self.members[root]
+            components_by_size[len(members)].append({self.ids[i] for i in members})
+        stats = {"total_components": len(self.members)}
+        for category, (lower_bound, upper_bound) in SIZE_CATEGORIES.items():
+            sizes = [size for size in sorted(components_by_size) if lower_bound <= size <= upper_bound]
+            components = [component for size in sizes for component in components_by_size[size]]
+            stats[category] = {
+                "components": components,
+                "node_count": sum(len(component) for component in components),
+                "component_count": len(components),
+                "size_histogram": {size: len(components_by_size[size]) for size in sizes},
+            }
+        return stats
+
+    # --- incremental updates ---
+
+    def apply_edge_delta(self, added_ids: Iterable[str], removed_ids: Iterable[str],
+                         added_edges: Iterable[Tuple[str, str]], removed_edges: Iterable[Tuple[str, str]]) -> Dict:
+        """
+        Apply added/removed entities and edges, and report which components merged or split.
+
+        Components are described by their sizes and their smallest member ID.
+
+        Returns:
+            dict: 'merges' (components combined into one), 'splits' (a component that fell apart),
+                  and component counts before/after
+        """
+        added_ids, removed_ids = list(added_ids), list(removed_ids)
+        added_edges, removed_edges = list(added_edges), list(removed_edges)
+        num_components_before = len(self.members)
+
+        # Members of every component the delta touches, with their component before the update
+        touched_ids = set(removed_ids) | {node_id for edge in added_edges + removed_edges for node_id in edge}
+        before = {}
+        for root in {self.component_of(node_id) for node_id in touched_ids if node_id in self.index and self.alive[self.index[node_id]]}:
+            for i in self.members[root]:
+                before[i] = root
+
+        dirty = [self.remove_edge(*edge) for edge in removed_edges] + [self.remove_node(node_id) for node_id in removed_ids]
+        self.recompute(root for root in dirty if root is not None)
+        for node_id in added_ids:
+            self.add_node(node_id)
+        for edge in added_edges:
+            self.add_edge(*edge)
+
+        # Compare the partitions of the touched members (plus new entities) before and after
+        after = {i: self.find(i) for i in before if self.alive[i]}
+        after.update({self.index[node_id]: self.find(self.index[node_id]) for node_id in added_ids})
+        before_groups, after_groups = defaultdict(set), defaultdict(set)
+        for i, root in before.items():
+            before_groups[root].add(i)
+        for i, root in after.items():
+            after_groups[root].add(i)
+
+        def describe(member_indices):
+            member_ids = [self.ids[i] for i in member_indices]
+            return {"size": len(member_ids), "representative": min(member_ids)}
+
+        merges, splits = [], []
+        for root, members in after_groups.items():
+            sources = {before[i] for i in members if i in before}
+            if len(sources) > 1:
+                merges.append({
+                    "from": sorted((describe(before_groups[s]) for s in sources), key=lambda d: -d["size"]),
+                    "into": describe(self.members[root]),
+                })
+        for root, members in before_groups.items():
+            targets = {after[i] for i in members if i in after}
+            if len(targets) > 1:
+                splits.append({
+                    "from": describe(members),
+                    "into": sorted((describe(self.members[t]) for t in targets), key=lambda d: -d["size"]),
+                })
+
+        return {
+            "num_components_before": num_components_before,
+            "num_components_after": len(self.members),
+            "merges": merges,
+            "splits": splits,
+        }
+
+    def apply_entity_delta(self, prev_entities: Dict[str, Dict], new_entities: Dict[str, Dict], entity_changes: Dict) -> Dict:
+        """
+        Apply the edge changes implied by a change set of entity dicts (as produced by utils.delta).
+        Only the added, changed and removed entities are inspected.
+        """
+        def edges_of(entity_dicts, entity_ids):
+            return {
+                tuple(sorted((eid, neighbor_id)))
+                for eid in entity_ids if eid in entity_dicts
+                for neighbor_id in get_neighbor_ids(Entity.create_from_dict(entity_dicts[eid]))
+            }
+
+        old_edges = edges_of(prev_entities, entity_changes["changed"] + entity_changes["removed"])
+        new_edges = edges_of(new_entities, entity_changes["changed"] + entity_changes["added"])
+        return self.apply_edge_delta(
+            entity_changes["added"], entity_changes["removed"],
+            sorted(new_edges - old_edges), sorted(old_edges - new_edges),
+        )
+
+    # --- persistence ---
+
+    def to_dict(self, pandit_data_version: str) -> Dict:
+        live = [i for i, alive in enumerate(self.alive) if alive]
+        position = {i: p for p, i in enumerate(live)}
+        return {
+            "pandit_data_version": pandit_data_version,
+            "ids": [self.ids[i] for i in live],
+            "roots": [position[self.find(i)] for i in live],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, adjacency: Dict[str, Iterable[str]]) -> "ComponentIndex":
+        """
+        Restore a saved index; the adjacency (e.g. from the entity indexes of the same version) is needed for removals.
+        """
+        component_index = cls()
+        for node_id in data["ids"]:
+            component_index.add_node(node_id)
+        component_index.members = defaultdict(list)
+        for i, root in enumerate(data["roots"]):
+            component_index.parent[i] = root
+            component_index.members[root].append(i)
+        component_index.members = dict(component_index.members)
+        index = component_index.index
+        for node_id, neighbor_ids in adjacency.items():
+            component_index.adjacency[index[node_id]].update(index[neighbor_id] for neighbor_id in neighbor_ids)
+        return component_index
+
+
+def save_component_index(component_index: ComponentIndex, pandit_data_version: str = PANDIT_DATA_VERSION):
+    output_filename = f"{pandit_data_version}-component-index.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(component_index.to_dict(pandit_data_version), jsonfile)
+
+
+def load_component_index(pandit_data_version: str, adjacency: Dict[str, Iterable[str]]) -> Optional[ComponentIndex]:
+    """
+    Load a saved component index, or None if there is none for that version.
+    """
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, f"{pandit_data_version}-component-index.json")
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, 'r') as jsonfile:
+        data = json.load(jsonfile)
+    if data.get("pandit_data_version") != pandit_data_version or set(data["ids"]) != adjacency.keys():
+        return None
+    return ComponentIndex.from_dict(data, adjacency)
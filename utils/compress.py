@@ -0,0 +1,98 @@
+# precompressed (.gz / .br) siblings of the large data artifacts served under /data, for content negotiation
+
+import argparse
+import gzip
+import os
+from typing import Dict, List, Optional
+
+from utils.utils import time_execution
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+
+COMPRESSIBLE_EXTENSIONS = (".gexf", ".graphml", ".json", ".csv", ".txt")
+MIN_COMPRESS_SIZE = 64 * 1024  # bytes; smaller files are served as they are
+SKIPPED_DIRS = ("archive",)
+
+# Content-Encoding: file suffix, in order of preference when the client accepts both
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0: same input, same bytes
+    return brotli.compress(data, quality=11)
+
+
+def available_encodings() -> List[str]:
+    return [encoding for encoding in ENCODING_SUFFIXES if encoding != "br" or brotli is not None]
+
+
+def find_compressible_artifacts(data_dir: str) -> List[str]:
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(data_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if filename.endswith(COMPRESSIBLE_EXTENSIONS) and os.path.getsize(path) >= MIN_COMPRESS_SIZE:
+                paths.append(path)
+    return paths
+
+
+def compressed_sibling(path: str, encoding: str) -> Optional[str]:
+    """
+    The precompressed variant of a file for an encoding, if it exists and is at least as new as the file.
+    """
+    sibling = path + ENCODING_SUFFIXES[encoding]
+    if os.path.isfile(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+        return sibling
+    return None
+
+
+@time_execution
+def compress_data_artifacts(paths: Optional[List[str]] = None, force: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Write .gz (and, if the brotli package is installed, .br) siblings next to large text artifacts in data/.
+    Up-to-date siblings are kept.
+
+    Args:
+        paths: Files to compress (default: every compressible file of at least MIN_COMPRESS_SIZE bytes in data/)
+        force: Recompress even if the siblings are up to date
+
+    Returns:
+        dict: path -> {"identity": size, "gzip": compressed size, "br": compressed size}
+    """
+    if paths is None:
+        paths = find_compressible_artifacts(os.path.join(current_file_dir, relative_data_dir))
+    sizes = {}
+    for path in paths:
+        data = None
+        sizes[path] = {"identity": os.path.getsize(path)}
+        for encoding in available_encodings():
+            sibling = path + ENCODING_SUFFIXES[encoding]
+            if force or compressed_sibling(path, encoding) is None:
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                with open(sibling, 'wb') as f:
+                    f.write(compress_bytes(data, encoding))
+            sizes[path][encoding] = os.path.getsize(sibling)
+    return sizes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress large data artifacts (.gz, and .br if brotli is installed).")
+    parser.add_argument("paths", nargs="*", help="Files to compress (default: large text artifacts in data/)")
+    parser.add_argument("--force", action="store_true", help="Recompress even if up to date")
+    args = parser.parse_args()
+    if brotli is None:
+        print("brotli is not installed; writing .gz files only")
+    for path, path_sizes in compress_data_artifacts(args.paths or None, args.force).items():
+        ratios = ", ".join(f"{encoding} {path_sizes['identity'] / size:.1f}x"
+                           for encoding, size in path_sizes.items() if encoding != "identity")
+        print(f"{os.path.relpath(path)}: {ratios}")
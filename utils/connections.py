@@ -0,0 +1,120 @@
+# shortest connections between two entities: bidirectional BFS over the undirected entity adjacency, Yen's k shortest
+
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Neighbors = Callable[[str], Iterable[str]]
+
+
+def bidirectional_shortest_path(
+    neighbors: Neighbors,
+    source: str,
+    target: str,
+    blocked_nodes: Set[str] = frozenset(),
+    blocked_edges: Set[Tuple[str, str]] = frozenset(),
+) -> Optional[List[str]]:
+    """
+    One shortest path from source to target, growing the smaller of the two BFS frontiers one level at a time
+    and stopping as soon as they meet.
+
+    Args:
+        neighbors: Neighbor IDs of a node ID
+        blocked_nodes: Nodes that may not be on the path, except as source or target
+        blocked_edges: (u, v) pairs that may not be traversed (in that direction)
+
+    Returns:
+        list: Node IDs from source to target, or None if there is no such path
+    """
+    if source == target:
+        return [source]
+    pred = {source: None}
+    succ = {target: None}
+    forward_fringe, backward_fringe = [source], [target]
+
+    def expand(fringe, visited, other_visited, forward):
+        next_fringe = []
+        for v in fringe:
+            for w in neighbors(v):
+                if ((v, w) if forward else (w, v)) in blocked_edges:
+                    continue
+                if w in blocked_nodes and w not in (source, target):
+                    continue
+                if w not in visited:
+                    visited[w] = v
+                    next_fringe.append(w)
+                if w in other_visited:
+                    return next_fringe, w
+        return next_fringe, None
+
+    while forward_fringe and backward_fringe:
+        if len(forward_fringe) <= len(backward_fringe):
+            forward_fringe, meeting = expand(forward_fringe, pred, succ, True)
+        else:
+            backward_fringe, meeting = expand(backward_fringe, succ, pred, False)
+        if meeting is not None:
+            path = []
+            node = meeting
+            while node is not None:
+                path.append(node)
+                node = pred[node]
+            path.reverse()
+            node = succ[meeting]
+            while node is not None:
+                path.append(node)
+                node = succ[node]
+            return path
+    return None
+
+
+def k_shortest_paths(
+    neighbors: Neighbors,
+    source: str,
+    target: str,
+    k: int = 1,
+    blocked_nodes: Set[str] = frozenset(),
+) -> List[List[str]]:
+    """
+    Up to k shortest simple paths from source to target, shortest first (Yen's algorithm, with
+    bidirectional_shortest_path for every spur path). The edges of the graph count in both directions.
+
+    Args:
+        neighbors: Neighbor IDs of a node ID
+        blocked_nodes: Nodes that may not be on any path, except as source or target
+
+    Returns:
+        list: Paths as lists of node IDs (fewer than k if there aren't that many)
+    """
+    first = bidirectional_shortest_path(neighbors, source, target, blocked_nodes)
+    if first is None:
+        return []
+    paths = [first]
+    seen = {tuple(first)}
+    candidates: List[Tuple[int, int, List[str]]] = []
+    counter = 0  # tie-breaker: among equally long candidates, first found first
+    while len(paths) < k:
+        last = paths[-1]
+        for i in range(len(last) - 1):
+            root = last[:i + 1]
+            spur_node = last[i]
+            blocked_edges = set()
+            for path in paths:
+                if path[:i + 1] == root:
+                    blocked_edges.add((path[i], path[i + 1]))
+            spur = bidirectional_shortest_path(
+                neighbors, spur_node, target, set(blocked_nodes) | set(root[:-1]), blocked_edges,
+            )
+            if spur is None:
+                continue
+            candidate = root[:-1] + spur
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heapq.heappush(candidates, (len(candidate), counter, candidate))
+                counter += 1
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates)[2])
+    return paths
+
+
+def neighbors_from_adjacency(adjacency: Dict[str, List[str]]) -> Neighbors:
+    return lambda node_id: adjacency.get(node_id, ())
@@ -1,5 +1,55 @@
+# build the complete graph directly from the entities, snapshot it per data version, and export it for Gephi
+
+import json
+import os
+from typing import Dict, Optional
+
+import networkx as nx
+
 import grapher
+from data_models import Entity
+from utils.load import entities_file_digest, load_full_graph_snapshot
+from utils.utils import time_execution, get_pandit_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+
+
+@time_execution
+def create_full_graph_snapshot(entities_by_id: Optional[Dict[str, Entity]] = None) -> nx.DiGraph:
+    """
+    Build the complete graph and save it as data/<pandit version>-full-graph.json
+    (nodes and edges in graph order, plus the digest of the entities JSON it was built from).
+    """
+    graph = grapher.build_full_graph(entities_by_id or grapher.ENTITIES_BY_ID)
+    snapshot = {
+        "pandit_data_version": PANDIT_DATA_VERSION,
+        "entities_digest": entities_file_digest(),
+        "nodes": list(graph.nodes),
+        "edges": [[source, target, arrowstyle] for source, target, arrowstyle in graph.edges(data='arrowstyle')],
+    }
+    output_filename = f"{PANDIT_DATA_VERSION}-full-graph.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(snapshot, jsonfile, ensure_ascii=False)
+    return graph
+
+
+def get_full_graph(entities_by_id: Optional[Dict[str, Entity]] = None) -> nx.DiGraph:
+    """
+    The complete graph from the snapshot, (re)building the snapshot if it is missing or stale.
+    """
+    graph = load_full_graph_snapshot()
+    if graph is None:
+        graph = create_full_graph_snapshot(entities_by_id)
+    return graph
+
+
+def construct_full_graph(output_fn="data/complete_graph.gexf"):
+    subgraph = get_full_graph()
+    grapher.export_to_gephi(subgraph, output_fn=output_fn)
+
 
-subgraph = grapher.construct_subgraph((grapher.ENTITIES_BY_ID.keys()), 1)
-label_map, color_map = grapher.assign_node_labels_and_colors(subgraph)
-grapher.export_to_gephi(subgraph, label_map, color_map, "data/complete_graph.gexf")
+if __name__ == "__main__":
+    construct_full_graph()
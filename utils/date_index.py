@@ -0,0 +1,81 @@
+# interval index over entity date ranges: which entities were active in a span of years, without a full scan
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_models import Entity
+from utils.utils import get_year_range
+
+
+class DateIntervalIndex:
+    """
+    Sorted endpoint arrays over (lowest year, highest year) intervals, bucketed by interval length.
+
+    Within a bucket all intervals are at most max_length long, so those overlapping [year_from, year_to] have their
+    lowest year in [year_from - max_length, year_to]: one bisect per bucket, then only a short scan that checks
+    the highest year. Bucket k holds lengths below 2**k, so a long interval never widens the scan for short ones.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[str, int, int]]):
+        """
+        Args:
+            intervals: (ID, lowest year, highest year) triples; their order breaks ties in query results
+        """
+        buckets = defaultdict(list)
+        self.positions: Dict[str, int] = {}
+        for position, (entity_id, lowest_year, highest_year) in enumerate(intervals):
+            lowest_year, highest_year = min(lowest_year, highest_year), max(lowest_year, highest_year)
+            self.positions[entity_id] = position
+            buckets[(highest_year - lowest_year).bit_length()].append((lowest_year, highest_year, position, entity_id))
+
+        # per bucket: max length, and lowest years / highest years / IDs sorted by lowest year
+        self.buckets: List[Tuple[int, List[int], List[int], List[str]]] = []
+        for k in sorted(buckets):
+            entries = sorted(buckets[k])
+            self.buckets.append((
+                max(high - low for low, high, _, _ in entries),
+                [low for low, _, _, _ in entries],
+                [high for _, high, _, _ in entries],
+                [entity_id for _, _, _, entity_id in entries],
+            ))
+        self.intervals: Dict[str, Tuple[int, int]] = {
+            entity_id: (lows[i], highs[i])
+            for _, lows, highs, ids in self.buckets for i, entity_id in enumerate(ids)
+        }
+
+    @classmethod
+    def from_entities(cls, entities_by_id: Dict[str, Entity]) -> "DateIntervalIndex":
+        """
+        Index every dated entity by get_year_range (works without dates use their authors' dates);
+        a single year counts as a one-year interval.
+        """
+        intervals = []
+        for entity_id, entity in entities_by_id.items():
+            year_range = get_year_range(entity)
+            if year_range is None:
+                continue
+            lowest_year, highest_year, _ = year_range
+            intervals.append((entity_id, lowest_year, highest_year if highest_year is not None else lowest_year))
+        return cls(intervals)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self.intervals
+
+    def overlapping(self, year_from: Optional[int] = None, year_to: Optional[int] = None) -> List[str]:
+        """
+        IDs of the entities whose date range overlaps [year_from, year_to] (either end may be open),
+        ordered by lowest year, then highest year, then index order.
+        """
+        matches = []
+        for max_length, lows, highs, ids in self.buckets:
+            start = 0 if year_from is None else bisect_left(lows, year_from - max_length)
+            end = len(lows) if year_to is None else bisect_right(lows, year_to)
+            for i in range(start, end):
+                if year_from is None or highs[i] >= year_from:
+                    matches.append((lows[i], highs[i], self.positions[ids[i]], ids[i]))
+        matches.sort()
+        return [entity_id for _, _, _, entity_id in matches]
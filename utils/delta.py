@@ -0,0 +1,336 @@
+# incremental ETL: patch previous entities / e-text link JSON using only rows that changed between exports
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from data_models import Entity
+from utils.components import ComponentIndex, load_component_index
+from utils.transform import (
+    COLLECTION_SUBTYPE_LABELS, ETEXT_LINK_TYPES,
+    build_entities, build_etext_links, create_entity_indexes, create_etext_summary,
+)
+from utils.utils import dump_json_items, get_neighbor_ids, time_execution, get_pandit_data_version, get_seti_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+archive_dir = "archive"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+SETI_DATA_VERSION = get_seti_data_version()
+
+
+def find_data_file(filename: str) -> str:
+    """
+    Locate a versioned data file in data/ or data/archive/.
+    """
+    for candidate in [
+        os.path.join(current_file_dir, relative_data_dir, filename),
+        os.path.join(current_file_dir, relative_data_dir, archive_dir, filename),
+    ]:
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"{filename} not found in data/ or data/{archive_dir}/")
+
+
+def split_field(field: str) -> List[str]:
+    return [item.strip() for item in field.split(",") if item.strip()]
+
+
+def row_entity_ids(row: Dict[str, str]) -> List[str]:
+    """
+    IDs of all entities a cleaned-CSV row creates or updates in build_entities, in creation order.
+    """
+    content_type = row.get("Content type", "").strip().lower()
+    entity_id = row["ID"].strip()
+    if content_type == "work":
+        author_ids = split_field(row.get("Authors (IDs)", ""))
+        author_names = split_field(row.get("Authors (names)", ""))
+        base_text_ids = split_field(row.get("Base texts (IDs)", ""))
+        base_text_names = split_field(row.get("Base texts (names)", ""))
+        return (
+            [entity_id]
+            + [aid for aid, _ in zip(author_ids, author_names)]
+            + [btid for btid, _ in zip(base_text_ids, base_text_names)]
+        )
+    elif content_type == "person":
+        return [entity_id]
+    return []
+
+
+def hash_entity_rows(rows: List[Dict[str, str]]) -> Dict[str, str]:
+    """
+    Map each row ID to a digest of all rows carrying that ID.
+    """
+    hashers = defaultdict(hashlib.sha1)
+    for row in rows:
+        hashers[row["ID"].strip()].update("\x1f".join(str(v or "") for v in row.values()).encode("utf8") + b"\x1e")
+    return {row_id: h.hexdigest() for row_id, h in hashers.items()}
+
+
+@time_execution
+def compute_entity_delta(prev_rows: List[Dict[str, str]], new_rows: List[Dict[str, str]], prev_entities: Dict[str, Dict]):
+    """
+    Rebuild only the entities touched by added, changed or removed rows and patch them into the previous entities.
+
+    An entity is affected if a changed row (old or new version) mentions it,
+    or if an unchanged row mentioning a changed row ID belongs to it (e.g. a work whose author's dates changed).
+    Affected entities are rebuilt from every new row mentioning them, plus the person rows of their co-mentioned
+    authors (needed for date backfill), which reproduces exactly what a full rebuild would give them.
+
+    Returns:
+        tuple: (patched entities dict in full-rebuild order, change set dict)
+    """
+    prev_hashes = hash_entity_rows(prev_rows)
+    new_hashes = hash_entity_rows(new_rows)
+    changed_row_ids = {
+        row_id for row_id in prev_hashes.keys() | new_hashes.keys()
+        if prev_hashes.get(row_id) != new_hashes.get(row_id)
+    }
+
+    new_row_ids = [row_entity_ids(row) for row in new_rows]
+    rows_mentioning = defaultdict(list)  # entity ID -> indices of new rows mentioning it
+    rows_owned_by = defaultdict(list)  # row ID -> indices of new rows with that ID
+    for i, (row, ids) in enumerate(zip(new_rows, new_row_ids)):
+        rows_owned_by[row["ID"].strip()].append(i)
+        for eid in ids:
+            rows_mentioning[eid].append(i)
+
+    affected = set(changed_row_ids)
+    for row in prev_rows:
+        if row["ID"].strip() in changed_row_ids:
+            affected.update(row_entity_ids(row))
+    for i, ids in enumerate(new_row_ids):
+        if new_rows[i]["ID"].strip() in changed_row_ids:
+            affected.update(ids)
+    for changed_id in changed_row_ids:
+        for i in rows_mentioning.get(changed_id, []):
+            affected.add(new_rows[i]["ID"].strip())
+
+    selected = {i for eid in affected for i in rows_mentioning.get(eid, [])}
+    co_mentioned = {eid for i in selected for eid in new_row_ids[i]}
+    selected.update(i for eid in co_mentioned for i in rows_owned_by.get(eid, []))
+    rebuilt = build_entities(new_rows[i] for i in sorted(selected))
+
+    patched = dict(prev_entities)
+    for eid in affected:
+        if eid in rebuilt:
+            patched[eid] = rebuilt[eid].to_dict()
+        else:
+            patched.pop(eid, None)
+
+    # Restore the order of a full rebuild (first mention in the new CSV)
+    order = dict.fromkeys(eid for ids in new_row_ids for eid in ids)
+    patched = {eid: patched[eid] for eid in order if eid in patched}
+
+    change_set = {
+        "rows": {
+            "added": sorted(new_hashes.keys() - prev_hashes.keys()),
+            "changed": sorted(row_id for row_id in changed_row_ids if row_id in prev_hashes and row_id in new_hashes),
+            "removed": sorted(prev_hashes.keys() - new_hashes.keys()),
+        },
+        "entities": {
+            "added": sorted(patched.keys() - prev_entities.keys()),
+            "changed": sorted(
+                eid for eid in affected
+                if eid in patched and eid in prev_entities and patched[eid] != prev_entities[eid]
+            ),
+            "removed": sorted(prev_entities.keys() - patched.keys()),
+        },
+    }
+    return patched, change_set
+
+
+def split_work_ids(work_id_cell) -> List[str]:
+    if pd.isna(work_id_cell) or work_id_cell == "":
+        return []
+    return [wid.strip() for wid in re.split(r'[,\r\n]+', str(work_id_cell))]
+
+
+def select_rows_by_hash(df: pd.DataFrame, row_hashes: pd.Series, wanted: Counter) -> pd.DataFrame:
+    """
+    Select rows whose hashes are in `wanted`, honoring multiplicities, in original order.
+    """
+    remaining = Counter(wanted)
+    mask = []
+    for h in row_hashes:
+        take = remaining[h] > 0
+        if take:
+            remaining[h] -= 1
+        mask.append(take)
+    return df[mask]
+
+
+@time_execution
+def compute_etext_link_delta(prev_df: pd.DataFrame, new_df: pd.DataFrame, prev_link_data: Dict):
+    """
+    Patch the previous e-text link data using only SETI rows that were added or removed (changed rows are both).
+
+    Mappings are rebuilt for every work ID mentioned by such a row, from all new rows mentioning it.
+    Collection counts are adjusted by the counts of added minus removed rows.
+
+    Returns:
+        tuple: (patched link data dict, change set dict)
+    """
+    if list(prev_df.columns) != list(new_df.columns):
+        prev_df = prev_df.iloc[0:0]  # incompatible layouts: treat everything as added
+        prev_link_data = {
+            "work_id_to_link_mapping": {},
+            "collection_total_link_counts": {},
+            "collection_missing_work_id_counts": {},
+        }
+
+    prev_hashes = pd.util.hash_pandas_object(prev_df.astype(str), index=False)
+    new_hashes = pd.util.hash_pandas_object(new_df.astype(str), index=False)
+    prev_counter, new_counter = Counter(prev_hashes), Counter(new_hashes)
+    added_rows = select_rows_by_hash(new_df, new_hashes, new_counter - prev_counter)
+    removed_rows = select_rows_by_hash(prev_df, prev_hashes, prev_counter - new_counter)
+
+    affected_work_ids = {
+        wid for cell in pd.concat([added_rows['Work ID'], removed_rows['Work ID']]) for wid in split_work_ids(cell)
+    }
+    mentions_affected = new_df['Work ID'].map(lambda cell: any(wid in affected_work_ids for wid in split_work_ids(cell)))
+    rebuilt_mapping = build_etext_links(new_df[mentions_affected])["work_id_to_link_mapping"]
+
+    prev_mapping = prev_link_data["work_id_to_link_mapping"]
+    patched_mapping = dict(prev_mapping)
+    for wid in affected_work_ids:
+        if wid in rebuilt_mapping:
+            patched_mapping[wid] = rebuilt_mapping[wid]
+        else:
+            patched_mapping.pop(wid, None)
+
+    # Restore the order of a full rebuild (first row with a non-empty link)
+    link_cols = [col for col in ETEXT_LINK_TYPES.values() if col in new_df.columns]
+    has_link = new_df[link_cols].apply(lambda col: col.notna() & col.astype(str).str.strip().ne("")).any(axis=1)
+    order = dict.fromkeys(wid for cell in new_df.loc[has_link, 'Work ID'] for wid in split_work_ids(cell))
+    patched_mapping = {wid: patched_mapping[wid] for wid in order if wid in patched_mapping}
+
+    added_counts = build_etext_links(added_rows)
+    removed_counts = build_etext_links(removed_rows)
+    patched_link_data = {"work_id_to_link_mapping": patched_mapping}
+    for count_key in ["collection_total_link_counts", "collection_missing_work_id_counts"]:
+        counts = dict(prev_link_data[count_key])
+        for collection, n in added_counts[count_key].items():
+            counts[collection] = counts.get(collection, 0) + n
+        for collection, n in removed_counts[count_key].items():
+            counts[collection] = counts.get(collection, 0) - n
+        patched_link_data[count_key] = {
+            collection: n for collection, n in counts.items() if n or collection in COLLECTION_SUBTYPE_LABELS
+        }
+
+    change_set = {
+        "rows": {"added": len(added_rows), "removed": len(removed_rows)},
+        "work_ids": {
+            "added": sorted(patched_mapping.keys() - prev_mapping.keys()),
+            "changed": sorted(
+                wid for wid in affected_work_ids
+                if wid in patched_mapping and wid in prev_mapping and patched_mapping[wid] != prev_mapping[wid]
+            ),
+            "removed": sorted(prev_mapping.keys() - patched_mapping.keys()),
+        },
+    }
+    return patched_link_data, change_set
+
+
+def load_previous_adjacency(previous_version: str, prev_entities: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """
+    The previous version's adjacency, from its entity indexes (data/ or data/archive/);
+    derived from its entities only if those are missing or from another version.
+    """
+    try:
+        with open(find_data_file(f"{previous_version}-entity-indexes.json"), 'r') as jsonfile:
+            indexes = json.load(jsonfile)
+        if indexes.get("pandit_data_version") == previous_version:
+            return indexes["adjacency"]
+    except FileNotFoundError:
+        pass
+    return {eid: get_neighbor_ids(Entity.create_from_dict(edict)) for eid, edict in prev_entities.items()}
+
+
+def apply_pandit_delta(previous_version: str) -> Dict:
+    with open(find_data_file(f"{previous_version}-extracted-entities-cleaned.csv"), 'r') as csvfile:
+        prev_rows = list(csv.DictReader(csvfile))
+    with open(find_data_file(f"{PANDIT_DATA_VERSION}-extracted-entities-cleaned.csv"), 'r') as csvfile:
+        new_rows = list(csv.DictReader(csvfile))
+    with open(find_data_file(f"{previous_version}-entities.json"), 'r') as jsonfile:
+        prev_entities = json.load(jsonfile)
+
+    patched_entities, change_set = compute_entity_delta(prev_rows, new_rows, prev_entities)
+
+    output_filename = f"{PANDIT_DATA_VERSION}-entities.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        dump_json_items(patched_entities.items(), jsonfile)
+
+    # Components: apply only the edges of added/changed/removed entities to the previous version's union-find index
+    prev_adjacency = load_previous_adjacency(previous_version, prev_entities)
+    component_index = load_component_index(previous_version, prev_adjacency) \
+        or ComponentIndex.from_adjacency(prev_adjacency)
+    change_set["components"] = component_index.apply_entity_delta(prev_entities, patched_entities, change_set["entities"])
+    entities_by_id = {eid: Entity.create_from_dict(edict) for eid, edict in patched_entities.items()}
+    create_entity_indexes(entities_by_id, component_index)
+
+    # Component summary and per-size-category name files, from the updated index rather than a graph traversal
+    # (imported here: utils.analyze loads the current entities on import, which only exist from this point on)
+    from utils.analyze import write_component_names, write_component_summary
+    component_info = component_index.size_stats(entities_by_id)
+    write_component_summary(component_info, len(entities_by_id))
+    write_component_names(component_info, entities_by_id)
+
+    return {"from": previous_version, "to": PANDIT_DATA_VERSION, **change_set}
+
+
+def apply_seti_delta(previous_version: str) -> Dict:
+    prev_df = pd.read_csv(find_data_file(f"{previous_version}-seti-master.csv"))
+    new_df = pd.read_csv(find_data_file(f"{SETI_DATA_VERSION}-seti-master.csv"))
+    with open(find_data_file(f"{previous_version}-etext-link-data.json"), 'r') as jsonfile:
+        prev_link_data = json.load(jsonfile)
+
+    patched_link_data, change_set = compute_etext_link_delta(prev_df, new_df, prev_link_data)
+
+    output_filename = f"{SETI_DATA_VERSION}-etext-link-data.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(patched_link_data, jsonfile, indent=4, ensure_ascii=False)
+    create_etext_summary(patched_link_data)
+
+    return {"from": previous_version, "to": SETI_DATA_VERSION, **change_set}
+
+
+def apply_delta(previous_pandit_version: Optional[str] = None, previous_seti_version: Optional[str] = None) -> Dict:
+    """
+    Patch the current version's entities and/or e-text link JSON from the given previous versions,
+    regenerate their derived index artifacts and component summary files, and write a machine-readable change set to data/<pandit version>-delta.json.
+    """
+    change_set = {}
+    if previous_pandit_version:
+        change_set["pandit"] = apply_pandit_delta(previous_pandit_version)
+    if previous_seti_version:
+        change_set["seti"] = apply_seti_delta(previous_seti_version)
+
+    output_filename = f"{PANDIT_DATA_VERSION}-delta.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(change_set, jsonfile, indent=4, ensure_ascii=False)
+
+    return change_set
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally update ETL outputs from a previous data version.")
+    parser.add_argument("--previous-pandit-version", help="e.g. 2025-06-26 (needs its cleaned CSV and entities JSON)")
+    parser.add_argument("--previous-seti-version", help="e.g. 2025-06-27 (needs its SETI CSV and e-text link JSON)")
+    args = parser.parse_args()
+    if not (args.previous_pandit_version or args.previous_seti_version):
+        parser.error("give --previous-pandit-version and/or --previous-seti-version")
+
+    change_set = apply_delta(args.previous_pandit_version, args.previous_seti_version)
+    for part, changes in change_set.items():
+        counts = {k: {kk: len(vv) if isinstance(vv, list) else vv for kk, vv in v.items()}
+                  for k, v in changes.items() if isinstance(v, dict)}
+        print(f"{part} {changes['from']} -> {changes['to']}: {counts}")
@@ -1,24 +1,26 @@
 # extract from big CSV to small CSV
 
+import argparse
 import os
+from typing import Iterator, Optional
+
 import pandas as pd
 
-from utils.utils import get_pandit_data_version
+from utils.utils import time_execution, get_pandit_data_version
 
-PANDIT_DATA_VERSION = get_pandit_data_version()
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
-# Load the input CSV file
+PANDIT_DATA_VERSION = get_pandit_data_version()
 
 current_file_dir = os.path.dirname(os.path.abspath(__file__))
 relative_data_dir = "../data"
-input_filename = f"{PANDIT_DATA_VERSION}-pandit-entities-export.csv"
-df = pd.read_csv(
-    os.path.join(current_file_dir, relative_data_dir, input_filename),
-    dtype=str,
-)
 
 # Specify the desired columns
-columns_to_keep = [
+COLUMNS_TO_KEEP = [
     "Content type",
     "ID",
     "Title",
@@ -35,43 +37,135 @@ columns_to_keep = [
     "Lowest Year",
 ]
 
-# Filter the DataFrame to keep only the specified columns
-df_filtered = df[columns_to_keep]
-
-# Further filter: Only keep rows where "Content type" is "Work" or "Person"
-df_filtered = df_filtered[df_filtered["Content type"].isin(["Work", "Person"])]
-
-# Merge "Attributed author" into "Author"
-# If "Author" is empty, fill it with "Attributed author"
-# In rare cases where work has both, discard Attributed Author
-# TODO: eventually maintain this distinction
-
-df_filtered["Author (person IDs)"] = df_filtered["Author (person IDs)"].fillna("").astype(str)
-df_filtered.loc[df_filtered["Author (person IDs)"].str.strip() == "", "Author (person IDs)"] = df_filtered["Attributed author (person ID)"]
-df_filtered["Authors (person)"] = df_filtered["Authors (person)"].fillna("").astype(str)
-df_filtered.loc[df_filtered["Authors (person)"].str.strip() == "", "Authors (person)"] = df_filtered["Attributed author (person)"]
+CONTENT_TYPES_TO_KEEP = ["Work", "Person"]
 
-# Clean up double separators and trailing separators
-df_filtered["Author (person IDs)"] = df_filtered["Author (person IDs)"].str.replace(r";\s*;", ";", regex=True).str.strip("; ")
-df_filtered["Authors (person)"] = df_filtered["Authors (person)"].str.replace(r";\s*;", ";", regex=True).str.strip("; ")
-
-# Drop the two "Attributed author" columns
-df_filtered = df_filtered.drop(columns=["Attributed author (person ID)", "Attributed author (person)"], errors="ignore")
-
-# Rename columns
-df_filtered.rename(columns={
-    "Title": "Name",
-    "Author (person IDs)": "Authors (IDs)",
-    "Authors (person)": "Authors (names)",
-    "Commentary on (work ID)": "Base texts (IDs)",
-    "Commentary on (work)": "Base texts (names)"
-}, inplace=True)
-
-# Replace NaN with empty strings to avoid 'nan' in output
-df_filtered.fillna("", inplace=True)
-
-# Save the output to a new CSV file
-output_filename = f"{PANDIT_DATA_VERSION}-extracted-entities-raw.csv"
-df_filtered.to_csv(os.path.join(current_file_dir, relative_data_dir, output_filename), index=False)
+# pandas' default na_values, so that both readers agree on which cells are empty
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
 
-print(f"Filtered CSV saved as {output_filename}")
+# Rough in-memory size of a parsed pandas string cell relative to its size on disk
+IN_MEMORY_EXPANSION_FACTOR = 8
+
+
+def estimate_chunk_rows(input_csv_path: str, max_memory_mb: float, sample_bytes: int = 1 << 20) -> int:
+    """
+    Estimate how many rows fit under the memory ceiling, from the average row length of the file's first MB
+    and the share of columns kept.
+    """
+    with open(input_csv_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    num_lines = max(1, sample.count(b"\n"))
+    num_columns = max(1, sample.split(b"\n", 1)[0].count(b",") + 1)
+    bytes_per_kept_row = len(sample) / num_lines * min(1.0, len(COLUMNS_TO_KEEP) / num_columns)
+    return max(1000, int(max_memory_mb * (1 << 20) / (bytes_per_kept_row * IN_MEMORY_EXPANSION_FACTOR)))
+
+
+def read_export_chunks(input_csv_path: str, max_memory_mb: Optional[float] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read only the needed columns of the Pandit export as a stream of DataFrames.
+
+    With pyarrow, record batches are streamed (block size bounded by max_memory_mb, if given);
+    otherwise pandas reads the file in one go, or in row chunks sized to stay under max_memory_mb.
+    """
+    if pa_csv is not None:
+        read_options = pa_csv.ReadOptions()
+        if max_memory_mb is not None:
+            read_options.block_size = max(1 << 20, int(max_memory_mb * (1 << 20) / IN_MEMORY_EXPANSION_FACTOR))
+        parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=COLUMNS_TO_KEEP,
+            column_types={col: pa.string() for col in COLUMNS_TO_KEEP},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        )
+        with pa_csv.open_csv(input_csv_path, read_options, parse_options, convert_options) as reader:
+            for batch in reader:
+                yield batch.to_pandas()
+    elif max_memory_mb is None:
+        yield pd.read_csv(input_csv_path, usecols=COLUMNS_TO_KEEP, dtype=str, na_values=NA_VALUES, keep_default_na=False)
+    else:
+        yield from pd.read_csv(
+            input_csv_path,
+            usecols=COLUMNS_TO_KEEP,
+            dtype=str,
+            na_values=NA_VALUES,
+            keep_default_na=False,
+            chunksize=estimate_chunk_rows(input_csv_path, max_memory_mb),
+        )
+
+
+def transform_export_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filter one chunk of the export to Work/Person rows and reshape it into the extracted-entities layout.
+    """
+    # Keep the specified columns in the specified order (usecols returns them in file order)
+    df_filtered = df[COLUMNS_TO_KEEP]
+
+    # Further filter: Only keep rows where "Content type" is "Work" or "Person"
+    df_filtered = df_filtered[df_filtered["Content type"].isin(CONTENT_TYPES_TO_KEEP)].copy()
+
+    # Merge "Attributed author" into "Author"
+    # If "Author" is empty, fill it with "Attributed author"
+    # In rare cases where work has both, discard Attributed Author
+    # TODO: eventually maintain this distinction
+
+    df_filtered["Author (person IDs)"] = df_filtered["Author (person IDs)"].fillna("").astype(str)
+    df_filtered.loc[df_filtered["Author (person IDs)"].str.strip() == "", "Author (person IDs)"] = df_filtered["Attributed author (person ID)"]
+    df_filtered["Authors (person)"] = df_filtered["Authors (person)"].fillna("").astype(str)
+    df_filtered.loc[df_filtered["Authors (person)"].str.strip() == "", "Authors (person)"] = df_filtered["Attributed author (person)"]
+
+    # Clean up double separators and trailing separators
+    df_filtered["Author (person IDs)"] = df_filtered["Author (person IDs)"].str.replace(r";\s*;", ";", regex=True).str.strip("; ")
+    df_filtered["Authors (person)"] = df_filtered["Authors (person)"].str.replace(r";\s*;", ";", regex=True).str.strip("; ")
+
+    # Drop the two "Attributed author" columns
+    df_filtered = df_filtered.drop(columns=["Attributed author (person ID)", "Attributed author (person)"], errors="ignore")
+
+    # Rename columns
+    df_filtered.rename(columns={
+        "Title": "Name",
+        "Author (person IDs)": "Authors (IDs)",
+        "Authors (person)": "Authors (names)",
+        "Commentary on (work ID)": "Base texts (IDs)",
+        "Commentary on (work)": "Base texts (names)"
+    }, inplace=True)
+
+    # Replace NaN with empty strings to avoid 'nan' in output
+    df_filtered.fillna("", inplace=True)
+
+    return df_filtered
+
+
+@time_execution
+def extract_entities(max_memory_mb: Optional[float] = None):
+    """
+    Extract Work and Person rows and the needed columns from the full Pandit export into a small CSV,
+    reading only the needed columns and appending each filtered chunk to the output as it is processed.
+
+    Args:
+        max_memory_mb: Optional ceiling for the parsed data held in memory at once (switches to chunked reading)
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-pandit-entities-export.csv"
+    input_csv_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    output_filename = f"{PANDIT_DATA_VERSION}-extracted-entities-raw.csv"
+    output_csv_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
+
+    # Save the output to a new CSV file, one chunk at a time
+    with open(output_csv_path, 'w', newline='') as csvfile:
+        num_chunks = 0
+        for chunk in read_export_chunks(input_csv_path, max_memory_mb):
+            transform_export_chunk(chunk).to_csv(csvfile, header=(num_chunks == 0), index=False)
+            num_chunks += 1
+        if num_chunks == 0:  # empty export: header only
+            transform_export_chunk(pd.DataFrame(columns=COLUMNS_TO_KEEP)).to_csv(csvfile, index=False)
+
+    print(f"Filtered CSV saved as {output_filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract Work/Person rows from the full Pandit export.")
+    parser.add_argument("--max-memory-mb", type=float, help="Read the export in chunks that stay under this size")
+    args = parser.parse_args()
+    extract_entities(args.max_memory_mb)
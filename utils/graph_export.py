@@ -0,0 +1,217 @@
+# streaming GEXF / GraphML writers: one node or edge at a time, without copying the graph or building an XML tree
+
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import networkx as nx
+
+GEXF_VERSION = "1.2draft"
+GEXF_HEADER = (
+    '<gexf{viz}xmlns="http://www.gexf.net/1.2draft" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'xsi:schemaLocation="http://www.gexf.net/1.2draft http://www.gexf.net/1.2draft/gexf.xsd" version="1.2">\n'
+)
+GEXF_VIZ_NAMESPACE = ' xmlns:viz="http://www.gexf.net/1.2draft/viz" '
+GRAPHML_HEADER = (
+    '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+    'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n'
+)
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+# attribute type names, as networkx writes them
+XML_TYPES = {bool: "boolean", int: "long", float: "double", str: "string"}
+
+# approximate size of the pieces a streamed export is sent in
+STREAM_CHUNK_SIZE = 1 << 16
+
+# edge data keys that GEXF stores on the <edge> element itself, in networkx's order
+GEXF_EDGE_XML_ATTRIBUTES = ["label", "weight", "type"]
+
+
+def escape_attribute(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;") \
+        .replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+
+
+def escape_text(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def xml_type(value) -> str:
+    if type(value) not in XML_TYPES:
+        raise TypeError(f"attribute value type is not allowed: {type(value)}")
+    return XML_TYPES[type(value)]
+
+
+def gexf_value(value) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    return {"inf": "INF", "nan": "NaN", "-inf": "-INF"}.get(str(value), str(value)) if isinstance(value, float) \
+        else str(value)
+
+
+def collect_attribute_keys(items, skip=()) -> Dict[str, str]:
+    """First-seen attribute names and their types across node or edge data dicts (one pass, nothing copied)."""
+    keys = {}
+    for data in items:
+        for key, value in data.items():
+            if key not in keys and key not in skip:
+                keys[key] = xml_type(value)
+    return keys
+
+
+def iter_gexf(
+    graph: nx.DiGraph,
+    node_label: Callable[[str], str] = str,
+    node_color: Callable[[str], Optional[Dict]] = lambda node_id: None,
+) -> Iterator[str]:
+    """
+    GEXF 1.2draft document for a graph, yielded in chunks (the header, then one chunk per node and per edge).
+
+    Same bytes as nx.write_gexf(graph, version="1.2draft") on a copy of the graph whose nodes have
+    'label' and 'viz': {'color': ...} set, for graphs with static scalar attributes.
+
+    Args:
+        graph: networkx graph
+        node_label: Label of a node ID, called once per node while writing
+        node_color: RGB dict ({'r', 'g', 'b'}, optional 'a') of a node ID, or None for no viz color
+    """
+    node_keys = collect_attribute_keys((data for _, data in graph.nodes(data=True)), skip=("label", "viz"))
+    edge_keys = collect_attribute_keys((data for _, _, data in graph.edges(data=True)), skip=GEXF_EDGE_XML_ATTRIBUTES)
+    node_key_ids = {key: str(i) for i, key in enumerate(node_keys)}
+    edge_key_ids = {key: str(i) for i, key in enumerate(edge_keys, start=len(node_keys))}
+    has_viz = any(node_color(node_id) is not None for node_id in graph.nodes)
+
+    yield XML_DECLARATION + GEXF_HEADER.format(viz=GEXF_VIZ_NAMESPACE if has_viz else " ")
+    yield (
+        f'  <meta lastmodifieddate="{time.strftime("%Y-%m-%d")}">\n'
+        f'    <creator>NetworkX {nx.__version__}</creator>\n'
+        f'  </meta>\n'
+        f'  <graph defaultedgetype="{"directed" if graph.is_directed() else "undirected"}" mode="static" '
+        f'name="{escape_attribute(str(graph.graph.get("name", "")))}">\n'
+    )
+    # networkx inserts each class's attribute declarations at the front, so the edge class comes first
+    for class_name, keys, key_ids in (("edge", edge_keys, edge_key_ids), ("node", node_keys, node_key_ids)):
+        if keys:
+            yield f'    <attributes mode="static" class="{class_name}">\n' + "".join(
+                f'      <attribute id="{key_ids[key]}" title="{escape_attribute(key)}" type="{attr_type}" />\n'
+                for key, attr_type in keys.items()
+            ) + "    </attributes>\n"
+
+    def attvalues(data, key_ids, indent, skip):
+        values = [(key_ids[key], value) for key, value in data.items() if key not in skip]
+        if not values:
+            return ""
+        return f"{indent}<attvalues>\n" + "".join(
+            f'{indent}  <attvalue for="{key_id}" value="{escape_attribute(gexf_value(value))}" />\n'
+            for key_id, value in values
+        ) + f"{indent}</attvalues>\n"
+
+    if len(graph) == 0:
+        yield "    <nodes />\n"
+    else:
+        yield "    <nodes>\n"
+        for node_id, data in graph.nodes(data=True):
+            head = f'      <node id="{escape_attribute(str(node_id))}" label="{escape_attribute(str(node_label(node_id)))}"'
+            color = node_color(node_id)
+            body = ""
+            if color is not None:
+                body += (f'        <viz:color r="{color.get("r")}" g="{color.get("g")}" b="{color.get("b")}" '
+                         f'a="{color.get("a", 1.0)}" />\n')
+            body += attvalues(data, node_key_ids, "        ", ("label", "viz"))
+            yield f"{head}>\n{body}      </node>\n" if body else f"{head} />\n"
+        yield "    </nodes>\n"
+
+    if graph.number_of_edges() == 0:
+        yield "    <edges />\n"
+    else:
+        yield "    <edges>\n"
+        for edge_id, (source, target, data) in enumerate(graph.edges(data=True)):
+            head = f'      <edge source="{escape_attribute(str(source))}" target="{escape_attribute(str(target))}" id="{edge_id}"'
+            for key in GEXF_EDGE_XML_ATTRIBUTES:
+                if key in data:
+                    head += f' {key}="{escape_attribute(str(data[key]))}"'
+            body = attvalues(data, edge_key_ids, "        ", GEXF_EDGE_XML_ATTRIBUTES)
+            yield f"{head}>\n{body}      </edge>\n" if body else f"{head} />\n"
+        yield "    </edges>\n"
+
+    yield "  </graph>\n</gexf>\n"
+
+
+def iter_graphml(
+    graph: nx.DiGraph,
+    node_label: Optional[Callable[[str], str]] = None,
+    node_color: Callable[[str], Optional[Dict]] = lambda node_id: None,
+) -> Iterator[str]:
+    """
+    GraphML document for a graph, yielded in chunks (the header, then one chunk per node and per edge).
+
+    Labels and colors are written as the 'label' and 'r'/'g'/'b' node attributes that Gephi's GraphML importer reads;
+    same bytes as nx.write_graphml on a copy of the graph with those attributes set (without lxml).
+
+    Args:
+        graph: networkx graph
+        node_label: Label of a node ID, called once per node while writing (None for no labels)
+        node_color: RGB dict ({'r', 'g', 'b'}) of a node ID, or None for no color
+    """
+    def node_items(node_id, data):
+        items = dict(data)
+        if node_label is not None:
+            items["label"] = str(node_label(node_id))
+        color = node_color(node_id)
+        if color is not None:
+            items.update(r=color["r"], g=color["g"], b=color["b"])
+        return items.items()
+
+    # Key IDs in order of first use (graph, nodes, edges); networkx declares them in reverse order of creation
+    keys = {}
+    for name, value in graph.graph.items():
+        keys.setdefault(("graph", name), (f"d{len(keys)}", xml_type(value)))
+    for node_id, data in graph.nodes(data=True):
+        for name, value in node_items(node_id, data):
+            keys.setdefault(("node", name), (f"d{len(keys)}", xml_type(value)))
+    for _, _, data in graph.edges(data=True):
+        for name, value in data.items():
+            keys.setdefault(("edge", name), (f"d{len(keys)}", xml_type(value)))
+
+    yield XML_DECLARATION + GRAPHML_HEADER + "".join(
+        f'  <key id="{key_id}" for="{for_}" attr.name="{escape_attribute(name)}" attr.type="{attr_type}" />\n'
+        for (for_, name), (key_id, attr_type) in reversed(keys.items())
+    )
+
+    def data_elements(for_, items, indent="      "):
+        return "".join(
+            f'{indent}<data key="{keys[(for_, name)][0]}">{escape_text(str(value))}</data>\n' for name, value in items
+        )
+
+    if len(graph) == 0 and not graph.graph:
+        yield f'  <graph edgedefault="{"directed" if graph.is_directed() else "undirected"}" />\n</graphml>\n'
+        return
+    yield f'  <graph edgedefault="{"directed" if graph.is_directed() else "undirected"}">\n'
+    for node_id, data in graph.nodes(data=True):
+        body = data_elements("node", node_items(node_id, data))
+        head = f'    <node id="{escape_attribute(str(node_id))}"'
+        yield f"{head}>\n{body}    </node>\n" if body else f"{head} />\n"
+    for source, target, data in graph.edges(data=True):
+        body = data_elements("edge", data.items())
+        head = f'    <edge source="{escape_attribute(str(source))}" target="{escape_attribute(str(target))}"'
+        yield f"{head}>\n{body}    </edge>\n" if body else f"{head} />\n"
+    yield data_elements("graph", graph.graph.items(), "    ") + "  </graph>\n</graphml>\n"
+
+
+def write_chunks(chunks: Iterator[str], output_fn: str):
+    with open(output_fn, "w", encoding="utf-8") as f:
+        f.writelines(chunks)
+
+
+def batch_chunks(chunks: Iterator[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Join small chunks into pieces of about `size` characters (e.g. for a streamed HTTP response)."""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
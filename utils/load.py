@@ -1,6 +1,9 @@
+import hashlib
 import json
 import os
 
+import networkx as nx
+
 from data_models import Entity
 from utils.utils import time_execution, get_pandit_data_version, get_seti_data_version
 
@@ -12,14 +15,79 @@ SETI_DATA_VERSION = get_seti_data_version()
 
 
 @time_execution
-def load_entities():
+def load_entities(validate: bool = False):
+    """
+    Load the entities JSON as Entity objects, optionally checking its referential integrity first
+    (raises utils.validate.IntegrityError on violations).
+    """
     input_filename = f"{PANDIT_DATA_VERSION}-entities.json"
     input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
     with open(input_json_path, "r") as jsonfile:
         data = json.load(jsonfile)
+    if validate:
+        from utils.validate import raise_on_integrity_violations  # imports pandas, which the server doesn't need
+
+        raise_on_integrity_violations(data)
     entities_by_id = {eid: Entity.create_from_dict(edict) for eid, edict in data.items()}
     return entities_by_id
 
+
+def entities_file_digest():
+    """
+    SHA-1 of the current entities JSON, to tie derived snapshots to the exact data they were built from.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-entities.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, input_filename), "rb") as jsonfile:
+        return hashlib.sha1(jsonfile.read()).hexdigest()
+
+
+@time_execution
+def load_full_graph_snapshot():
+    """
+    Load the complete graph saved by utils.construct_full_graph, or None if it is missing or stale.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-full-graph.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    if data.get("pandit_data_version") != PANDIT_DATA_VERSION or data.get("entities_digest") != entities_file_digest():
+        return None
+    graph = nx.DiGraph()
+    graph.add_nodes_from(data["nodes"])
+    graph.add_edges_from((source, target, {"arrowstyle": arrowstyle}) for source, target, arrowstyle in data["edges"])
+    return graph
+
+
+@time_execution
+def load_node_analytics():
+    """
+    Load the per-node analytics written by utils.analyze, or None if they are missing or from another version.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-node-analytics.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    return data if data.get("pandit_data_version") == PANDIT_DATA_VERSION else None
+
+
+@time_execution
+def load_community_graph():
+    """
+    Load the community-coarsened overview graph written by utils.analyze, or None if it is missing or from another version.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-community-graph.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    return data if data.get("pandit_data_version") == PANDIT_DATA_VERSION else None
+
+
 @time_execution
 def load_link_data():
     input_filename = f"{SETI_DATA_VERSION}-etext-link-data.json"
@@ -29,4 +97,48 @@ def load_link_data():
 
     (count_data := data.copy()).pop('work_id_to_link_mapping')
 
-    return data["work_id_to_link_mapping"], count_data
\ No newline at end of file
+    return data["work_id_to_link_mapping"], count_data
+
+
+@time_execution
+def load_entity_indexes():
+    """
+    Load the derived entity indexes written by utils.transform, or None if they are missing or from another version.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-entity-indexes.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    return data if data.get("pandit_data_version") == PANDIT_DATA_VERSION else None
+
+
+@time_execution
+def load_etext_summary():
+    """
+    Load the e-text collection summary written by utils.transform, or None if it is missing or from another version.
+    """
+    input_filename = f"{SETI_DATA_VERSION}-etext-summary.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    return data["summary"] if data.get("seti_data_version") == SETI_DATA_VERSION else None
+
+@time_execution
+def load_version_diff():
+    """
+    Load the diff against previous data versions written by utils.version_diff,
+    or None if it is missing or not for the current versions.
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-version-diff.json"
+    input_json_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
+    if not os.path.exists(input_json_path):
+        return None
+    with open(input_json_path, "r") as jsonfile:
+        data = json.load(jsonfile)
+    if data.get("pandit_data_version") != PANDIT_DATA_VERSION or data.get("seti_data_version") != SETI_DATA_VERSION:
+        return None
+    return data
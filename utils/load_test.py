@@ -0,0 +1,313 @@
+"""
+Local load-test harness for the Pāṇḍitya web app.
+
+Starts the app (Flask dev server in a thread, or gunicorn) unless --url is given,
+then fires either a weighted synthetic mix of typical request shapes
+or a replayed query log captured with PANDITYA_QUERY_LOG, and reports
+throughput and p50/p95/p99 latency per endpoint.
+
+Examples:
+    python -m utils.load_test --requests 2000 --concurrency 8
+    python -m utils.load_test --server gunicorn --workers 4 --duration 60
+    python -m utils.load_test --url https://panditya.info --replay query_log.jsonl
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from utils.load import load_entities, load_link_data
+from utils.utils import summarize_etext_links
+
+# (name, weight, hops) of typical request shapes, roughly in proportion to production use
+DEFAULT_MIX = [
+    ("dropdown_authors", 10, None),
+    ("dropdown_works", 10, None),
+    ("labels", 10, None),
+    ("subgraph", 20, 0),
+    ("subgraph", 25, 1),
+    ("subgraph", 10, 2),
+    ("subgraph", 3, 3),
+    ("seti_by_collection", 5, None),
+    ("seti_overlap", 3, None),
+    ("seti_by_work", 4, None),
+    ("visualize_collection", 2, None),
+]
+
+QUERY_LOG_FIELDS_TO_REPLAY = ("method", "endpoint", "path", "args", "json")
+
+
+def build_request_pools() -> Dict[str, List[str]]:
+    """
+    Collect real IDs and collection names from the local data files to parameterize synthetic requests.
+    """
+    entities_by_id = load_entities()
+    etext_links, additional_collection_count_data = load_link_data()
+    return {
+        "works": [eid for eid, e in entities_by_id.items() if e.type == 'work'],
+        "authors": [eid for eid, e in entities_by_id.items() if e.type == 'author'],
+        "etext_works": [wid for wid in etext_links if wid != '...'],
+        "collections": list(summarize_etext_links(etext_links, additional_collection_count_data).keys()),
+    }
+
+
+def make_synthetic_request(shape: str, hops: Optional[int], pools: Dict[str, List[str]], rng: random.Random) -> Dict:
+    """
+    Build one request dict (same fields as a query log entry) for a named request shape.
+    """
+    if shape == "dropdown_authors":
+        return {"method": "GET", "endpoint": "/api/entities/authors", "path": "/api/entities/authors"}
+    if shape == "dropdown_works":
+        return {"method": "GET", "endpoint": "/api/entities/works", "path": "/api/entities/works"}
+    if shape == "labels":
+        ids = rng.sample(pools["works"] + pools["authors"], rng.randint(1, 5))
+        return {"method": "GET", "endpoint": "/api/entities/labels", "path": "/api/entities/labels",
+                "args": {"ids": ",".join(ids)}}
+    if shape == "subgraph":
+        authors = rng.sample(pools["authors"], rng.randint(0, 1))
+        works = rng.sample(pools["works"], 1 if not authors else rng.randint(0, 1))
+        return {"method": "POST", "endpoint": f"/api/graph/subgraph (hops={hops})", "path": "/api/graph/subgraph",
+                "json": {"authors": authors, "works": works, "hops": hops, "exclude_list": []}}
+    if shape == "seti_by_collection":
+        return {"method": "GET", "endpoint": "/api/seti/by_collection", "path": "/api/seti/by_collection",
+                "args": {"collection": rng.choice(pools["collections"])}}
+    if shape == "seti_overlap":
+        collection1, collection2 = rng.sample(pools["collections"], 2)
+        return {"method": "GET", "endpoint": "/api/seti/by_collection/overlap", "path": "/api/seti/by_collection/overlap",
+                "args": {"collection1": collection1, "collection2": collection2}}
+    if shape == "seti_by_work":
+        ids = rng.sample(pools["etext_works"], rng.randint(1, 5))
+        return {"method": "GET", "endpoint": "/api/seti/by_work", "path": "/api/seti/by_work",
+                "args": {"ids": ",".join(ids)}}
+    if shape == "visualize_collection":
+        collection = rng.choice(pools["collections"])
+        return {"method": "GET", "endpoint": "/seti/by_collection/<string:collection>/visualize",
+                "path": f"/seti/by_collection/{collection}/visualize"}
+    raise ValueError(f"Unknown request shape: {shape}")
+
+
+def generate_synthetic_requests(num_requests: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    pools = build_request_pools()
+    shapes = [(shape, hops) for shape, _, hops in DEFAULT_MIX]
+    weights = [weight for _, weight, _ in DEFAULT_MIX]
+    return [
+        make_synthetic_request(shape, hops, pools, rng)
+        for shape, hops in rng.choices(shapes, weights=weights, k=num_requests)
+    ]
+
+
+def read_query_log(log_path: str) -> List[Dict]:
+    """
+    Read a query log written by flask_app (PANDITYA_QUERY_LOG), keeping only replayable fields.
+    """
+    requests_to_replay = []
+    with open(log_path, 'r', encoding='utf8') as log_file:
+        for line in log_file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            requests_to_replay.append({k: entry.get(k) for k in QUERY_LOG_FIELDS_TO_REPLAY})
+    return requests_to_replay
+
+
+def send_request(base_url: str, req: Dict, timeout: float) -> Dict:
+    url = base_url + quote(req["path"])
+    if req.get("args"):
+        url += "?" + urlencode(req["args"])
+    body, headers = None, {}
+    if req.get("json") is not None:
+        body = json.dumps(req["json"]).encode("utf8")
+        headers["Content-Type"] = "application/json"
+
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, data=body, headers=headers, method=req.get("method", "GET")), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as e:
+        status = e.code
+    except (URLError, OSError, ValueError):
+        status = None
+    return {"endpoint": req.get("endpoint") or req["path"], "status": status, "latency": time.perf_counter() - start}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_load(base_url: str, requests_to_send: List[Dict], concurrency: int,
+             duration: Optional[float] = None, timeout: float = 60.0) -> Dict:
+    """
+    Send requests with a fixed number of concurrent clients.
+    With a duration, the request list is cycled until time runs out; otherwise each request is sent once.
+    """
+    results = []
+    results_lock = threading.Lock()
+    next_index = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        while True:
+            with results_lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+                req = requests_to_send[i % len(requests_to_send)]
+            elif i < len(requests_to_send):
+                req = requests_to_send[i]
+            else:
+                return
+            result = send_request(base_url, req, timeout)
+            with results_lock:
+                results.append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        clients = [executor.submit(client) for _ in range(concurrency)]
+    for c in clients:
+        c.result()  # re-raise any unexpected client error
+    elapsed = time.perf_counter() - start
+
+    return summarize_results(results, elapsed, concurrency)
+
+
+def summarize_results(results: List[Dict], elapsed: float, concurrency: int) -> Dict:
+    latencies_by_endpoint = defaultdict(list)
+    errors_by_endpoint = defaultdict(int)
+    for result in results:
+        latencies_by_endpoint[result["endpoint"]].append(result["latency"])
+        if result["status"] is None or result["status"] >= 500:
+            errors_by_endpoint[result["endpoint"]] += 1
+
+    def stats(latencies, errors):
+        latencies = sorted(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        }
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "overall": stats([r["latency"] for r in results], sum(errors_by_endpoint.values())),
+        "endpoints": {
+            endpoint: stats(latencies, errors_by_endpoint[endpoint])
+            for endpoint, latencies in sorted(latencies_by_endpoint.items())
+        },
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n{report['overall']['requests']} requests in {report['elapsed_s']} s "
+          f"with concurrency {report['concurrency']}\n")
+    header = f"{'endpoint':<55} {'n':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for endpoint, s in rows:
+        print(f"{endpoint[:55]:<55} {s['requests']:>6} {s['errors']:>5} {s['throughput_rps']:>8} "
+              f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url: str, timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urlopen(base_url + "/about", timeout=5):
+                return
+        except (URLError, OSError):
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout} s")
+
+
+def start_flask_server(port: int):
+    from werkzeug.serving import make_server
+    from flask_app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_gunicorn_server(port: int, workers: int):
+    process = subprocess.Popen([
+        sys.executable, "-m", "gunicorn", "--workers", str(workers),
+        "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "flask_app:app",
+    ])
+    return process.terminate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Pāṇḍitya app with a weighted or replayed query mix.")
+    parser.add_argument("--url", help="Base URL of an already running server (default: start one locally)")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask", help="Local server to start")
+    parser.add_argument("--workers", type=int, default=4, help="Number of gunicorn workers")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of synthetic requests to generate")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds, cycling through the requests")
+    parser.add_argument("--replay", help="Query log (JSON lines) to replay instead of the synthetic mix")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic mix")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json-output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    requests_to_send = read_query_log(args.replay) if args.replay else generate_synthetic_requests(args.requests, args.seed)
+    if not requests_to_send:
+        sys.exit("No requests to send")
+
+    stop_server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if base_url is None:
+        port = get_free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        if args.server == "gunicorn":
+            stop_server = start_gunicorn_server(port, args.workers)
+        else:
+            stop_server = start_flask_server(port)
+        wait_until_up(base_url)
+
+    try:
+        report = run_load(base_url, requests_to_send, args.concurrency, args.duration, args.timeout)
+    finally:
+        if stop_server is not None:
+            stop_server()
+
+    print_report(report)
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
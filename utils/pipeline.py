@@ -0,0 +1,271 @@
+"""
+Content-hash-cached, parallel runner for the ETL / analysis stages.
+
+Stages declare their input files, output files and code files.
+A stage is skipped when the fingerprint of its inputs and code matches the last successful run
+and its outputs still exist. Stages whose dependencies are done run concurrently in a process pool.
+
+Stage DAG (the raw -> cleaned step is manual, see data/manual_cleaning.md):
+
+    pandit export --extract--> extracted-entities-raw.csv
+    extracted-entities-cleaned.csv --entities--> entities.json (+ entity-indexes.json, component-index.json)
+    entities.json --validate--> validation-report.json
+    entities.json --graph_snapshot--> full-graph.json --+--full_graph--> complete_graph.gexf
+                                                        +--component_analysis--> analysis_results/ (components, centrality),
+                                                              node-analytics.json, community-graph.json
+    complete_graph.gexf, node-analytics.json, community-graph.json --compress--> .gz/.br siblings of large data files
+    seti-master.csv --etext_links--> etext-link-data.json (+ etext-summary.json)
+
+Examples:
+    python -m utils.pipeline                  # bring everything up to date
+    python -m utils.pipeline etext_links      # one stage (plus anything upstream that is stale)
+    python -m utils.pipeline --force --dry-run
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from utils.utils import get_pandit_data_version, get_seti_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(current_file_dir)
+CACHE_PATH = "data/.pipeline-cache.json"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+SETI_DATA_VERSION = get_seti_data_version()
+
+COMMON_CODE = ["utils/utils.py", "data_models.py"]
+
+STAGES = {
+    "extract": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-pandit-entities-export.csv"],
+        "outputs": [f"data/{PANDIT_DATA_VERSION}-extracted-entities-raw.csv"],
+        "code": ["utils/extract.py"],
+        "run": "utils.extract:extract_entities",
+    },
+    "entities": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-extracted-entities-cleaned.csv"],
+        "outputs": [
+            f"data/{PANDIT_DATA_VERSION}-entities.json",
+            f"data/{PANDIT_DATA_VERSION}-entity-indexes.json",
+            f"data/{PANDIT_DATA_VERSION}-component-index.json",
+        ],
+        "code": ["utils/transform.py", "utils/components.py"],
+        "run": "utils.transform:create_entities",
+    },
+    "etext_links": {
+        "inputs": [f"data/{SETI_DATA_VERSION}-seti-master.csv"],
+        "outputs": [f"data/{SETI_DATA_VERSION}-etext-link-data.json", f"data/{SETI_DATA_VERSION}-etext-summary.json"],
+        "code": ["utils/transform.py"],
+        "run": "utils.transform:create_etext_links",
+    },
+    "validate": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-entities.json"],
+        "outputs": [f"data/{PANDIT_DATA_VERSION}-validation-report.json"],
+        "code": ["utils/validate.py"],
+        "run": "utils.validate:validate_entities",
+    },
+    "graph_snapshot": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-entities.json"],
+        "outputs": [f"data/{PANDIT_DATA_VERSION}-full-graph.json"],
+        "code": ["grapher.py", "utils/construct_full_graph.py", "utils/load.py"],
+        "run": "utils.construct_full_graph:create_full_graph_snapshot",
+    },
+    "full_graph": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-full-graph.json"],
+        "outputs": ["data/complete_graph.gexf"],
+        "code": ["grapher.py", "utils/graph_export.py", "utils/construct_full_graph.py", "utils/load.py", "config.json"],
+        "run": "utils.construct_full_graph:construct_full_graph",
+    },
+    "component_analysis": {
+        "inputs": [f"data/{PANDIT_DATA_VERSION}-entities.json", f"data/{PANDIT_DATA_VERSION}-full-graph.json"],
+        "outputs": [
+            "data/analysis_results/component_info/component_summary.txt",
+            f"data/analysis_results/centrality/{PANDIT_DATA_VERSION}-centrality-approximate.json",
+            "data/analysis_results/network_metrics.json",
+            f"data/{PANDIT_DATA_VERSION}-node-analytics.json",
+            f"data/{PANDIT_DATA_VERSION}-community-graph.json",
+        ],
+        "code": ["utils/analyze.py", "utils/commentary_graph.py", "utils/construct_full_graph.py", "grapher.py", "utils/load.py"],
+        "run": "utils.analyze:run_analysis",
+    },
+    "compress": {
+        "inputs": [
+            "data/complete_graph.gexf",
+            f"data/{PANDIT_DATA_VERSION}-node-analytics.json",
+            f"data/{PANDIT_DATA_VERSION}-community-graph.json",
+        ],
+        "outputs": [
+            "data/complete_graph.gexf.gz",
+            f"data/{PANDIT_DATA_VERSION}-node-analytics.json.gz",
+            f"data/{PANDIT_DATA_VERSION}-community-graph.json.gz",
+        ],
+        "code": ["utils/compress.py"],
+        "run": "utils.compress:compress_data_artifacts",
+    },
+}
+
+
+def stage_dependencies(name: str) -> List[str]:
+    """Stages producing any of this stage's inputs."""
+    inputs = set(STAGES[name]["inputs"])
+    return [other for other, stage in STAGES.items() if other != name and inputs & set(stage["outputs"])]
+
+
+def select_stages(targets: Optional[List[str]]) -> List[str]:
+    """The requested stages plus everything upstream of them, in declaration order."""
+    if not targets:
+        return list(STAGES)
+    unknown = [t for t in targets if t not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {unknown}. Valid options: {list(STAGES)}")
+    selected = set()
+    to_visit = list(targets)
+    while to_visit:
+        name = to_visit.pop()
+        if name not in selected:
+            selected.add(name)
+            to_visit.extend(stage_dependencies(name))
+    return [name for name in STAGES if name in selected]
+
+
+def load_cache() -> Dict:
+    path = os.path.join(repo_root, CACHE_PATH)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf8') as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_cache(cache: Dict):
+    with open(os.path.join(repo_root, CACHE_PATH), 'w', encoding='utf8') as f:
+        json.dump(cache, f, indent=4, ensure_ascii=False)
+
+
+def file_digest(relative_path: str, cache: Dict) -> str:
+    """
+    SHA-256 of a file, reusing the cached digest while size and mtime are unchanged.
+    """
+    path = os.path.join(repo_root, relative_path)
+    stat = os.stat(path)
+    cached = cache["files"].get(relative_path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    cache["files"][relative_path] = [stat.st_mtime_ns, stat.st_size, h.hexdigest()]
+    return h.hexdigest()
+
+
+def stage_fingerprint(name: str, cache: Dict) -> str:
+    stage = STAGES[name]
+    h = hashlib.sha256(name.encode("utf8"))
+    for relative_path in stage["inputs"] + stage["code"] + COMMON_CODE:
+        h.update(relative_path.encode("utf8"))
+        h.update(file_digest(relative_path, cache).encode("utf8"))
+    return h.hexdigest()
+
+
+def outputs_exist(name: str) -> bool:
+    return all(os.path.exists(os.path.join(repo_root, p)) for p in STAGES[name]["outputs"])
+
+
+def inputs_exist(name: str) -> bool:
+    return all(os.path.exists(os.path.join(repo_root, p)) for p in STAGES[name]["inputs"])
+
+
+def execute_stage(name: str) -> float:
+    """Run one stage's function (in a worker process) and return its wall time."""
+    module_name, function_name = STAGES[name]["run"].split(":")
+    start = time.perf_counter()
+    getattr(importlib.import_module(module_name), function_name)()
+    return time.perf_counter() - start
+
+
+def run_pipeline(targets: Optional[List[str]] = None, force: bool = False,
+                 processes: Optional[int] = None, dry_run: bool = False) -> Dict[str, str]:
+    """
+    Bring the selected stages up to date.
+
+    Returns:
+        dict: stage name -> outcome ("ran in ...", "up to date", "failed: ...", etc.)
+    """
+    os.chdir(repo_root)  # stages use repo-relative paths (config.json, data/analysis_results, ...)
+    selected = select_stages(targets)
+    cache = load_cache()
+    outcomes = {}
+    pending = list(selected)
+    changed = set()  # stages that ran (or would run) in this invocation
+    running = {}
+
+    def dependencies_settled(name):
+        return all(dep not in selected or dep in outcomes for dep in stage_dependencies(name))
+
+    with ProcessPoolExecutor(max_workers=processes, max_tasks_per_child=1) as pool:
+        while pending or running:
+            for name in [n for n in pending if dependencies_settled(n)]:
+                pending.remove(name)
+                failed_deps = [d for d in stage_dependencies(name) if outcomes.get(d, "").startswith(("failed", "skipped: upstream"))]
+                if failed_deps:
+                    outcomes[name] = f"skipped: upstream {failed_deps} failed"
+                    continue
+                if not inputs_exist(name):
+                    if outputs_exist(name):
+                        outcomes[name] = "up to date (inputs unavailable, keeping existing outputs)"
+                    else:
+                        outcomes[name] = f"failed: missing inputs {STAGES[name]['inputs']}"
+                    continue
+                if dry_run and any(d in changed for d in stage_dependencies(name)):
+                    changed.add(name)
+                    outcomes[name] = "would run (upstream changed)"
+                    continue
+                fingerprint = stage_fingerprint(name, cache)
+                if not force and outputs_exist(name) and cache["stages"].get(name) == fingerprint:
+                    outcomes[name] = "up to date"
+                    continue
+                changed.add(name)
+                if dry_run:
+                    outcomes[name] = "would run"
+                    continue
+                running[pool.submit(execute_stage, name)] = (name, fingerprint)
+                print(f"started {name}")
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    outcomes[name] = f"ran in {future.result():.2f} s"
+                    cache["stages"][name] = fingerprint
+                    for output in STAGES[name]["outputs"]:
+                        file_digest(output, cache)
+                except Exception as e:
+                    outcomes[name] = f"failed: {e!r}"
+                print(f"{name}: {outcomes[name]}")
+
+    if not dry_run:
+        save_cache(cache)
+    return outcomes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ETL/analysis stages, skipping those whose inputs are unchanged.")
+    parser.add_argument("stages", nargs="*", help=f"Stages to bring up to date (default: all of {list(STAGES)})")
+    parser.add_argument("--force", action="store_true", help="Rerun selected stages even if up to date")
+    parser.add_argument("--processes", type=int, help="Size of the process pool (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would run")
+    args = parser.parse_args()
+
+    outcomes = run_pipeline(args.stages, args.force, args.processes, args.dry_run)
+    print()
+    for name, outcome in outcomes.items():
+        print(f"{name:<20} {outcome}")
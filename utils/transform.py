@@ -1,15 +1,17 @@
-from collections import defaultdict
 import csv
 import json
 import os
 from collections import Counter
-import re
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 import pandas as pd
 
 from data_models import Work, Author
-from utils.utils import time_execution, get_pandit_data_version, get_seti_data_version
+from utils.components import ComponentIndex, save_component_index
+from utils.utils import (
+    build_entity_indexes, dump_json_items, summarize_etext_links,
+    time_execution, get_pandit_data_version, get_seti_data_version,
+)
 
 current_file_dir = os.path.dirname(os.path.abspath(__file__))
 relative_data_dir = "../data"
@@ -46,114 +48,162 @@ def create_entities():
     input_filename = f"{PANDIT_DATA_VERSION}-extracted-entities-cleaned.csv"
     input_csv_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
 
+    with open(input_csv_path, 'r') as csvfile:
+        entities_by_id = build_entities(csv.DictReader(csvfile))
+
+    # Save to JSON for human-readability
+    output_filename = f"{PANDIT_DATA_VERSION}-entities.json"
+    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
+    with open(output_json_path, 'w') as jsonfile:
+        dump_json_items(((eid, e.to_dict()) for eid, e in entities_by_id.items()), jsonfile)
+
+    create_entity_indexes(entities_by_id)
+
+    return entities_by_id
+
+
+@time_execution
+def create_entity_indexes(entities_by_id: Dict[str, Work | Author], component_index: Optional[ComponentIndex] = None):
+    """
+    Save the server's boot-time derived data (type index, sorted dropdown options, adjacency, component IDs)
+    next to the entities JSON, so that server workers only need to load it.
+    Also saves the union-find component index that the next incremental delta starts from.
+
+    Args:
+        component_index: Component index already updated for these entities (by utils.delta); built from scratch if None
+    """
+    indexes = build_entity_indexes(entities_by_id, PANDIT_DATA_VERSION, component_index)
+    output_filename = f"{PANDIT_DATA_VERSION}-entity-indexes.json"
+    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
+    with open(output_json_path, 'w') as jsonfile:
+        json.dump(indexes, jsonfile, ensure_ascii=False)
+
+    if component_index is None:
+        component_index = ComponentIndex.from_adjacency(indexes["adjacency"])
+    save_component_index(component_index, PANDIT_DATA_VERSION)
+
+
+def build_entities(rows: Iterable[Dict[str, str]]) -> Dict[str, Work | Author]:
+    """
+    Build Work and Author objects from cleaned CSV rows in one streaming pass,
+    then aggregate author disciplines and backfill work dates from authors in one linear pass.
+
+    Author-work and base-text-commentary relations are deduplicated with sets of ID pairs
+    while the lists on the entities keep their insertion order.
+
+    Args:
+        rows: Iterable of dicts as produced by csv.DictReader on the cleaned CSV
+
+    Returns:
+        dict: Entities by ID, in order of first mention, without authors that have no works
+    """
     entities_by_id = {}
+    author_work_pairs = set()
+    base_text_commentary_pairs = set()
 
     def split_field(field):
         return [item.strip() for item in field.split(",") if item.strip()]
 
-    with open(input_csv_path, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
+    for row in rows:
+        # Get common fields
+        content_type = row.get("Content type", "").strip().lower()
+        entity_id = row["ID"].strip()
+        name = row["Name"].strip()
+        aka = row.get("Aka", "").strip()
+        highest_year_str = row.get("Highest Year", None).strip()
+        lowest_year_str = row.get("Lowest Year", None).strip()
+        highest_year, lowest_year = (int(highest_year_str), int(lowest_year_str)) if highest_year_str else (None, None)
+
+        if content_type == "work":
+            discipline = row.get("Discipline", "").strip()
+
+            # Update or create
+            if entity_id in entities_by_id:
+                W = entities_by_id[entity_id]
+            else:
+                W = Work(entity_id)
+                entities_by_id[entity_id] = W
+
+            W.name = name
+            W.aka = aka
+            W.discipline = discipline
+            W.highest_year: Optional[int] = highest_year
+            W.lowest_year: Optional[int] = lowest_year
 
-        for row in reader:
-            # Get common fields
-            content_type = row.get("Content type", "").strip().lower()
-            entity_id = row["ID"].strip()
-            name = row["Name"].strip()
-            aka = row.get("Aka", "").strip()
-            highest_year_str = row.get("Highest Year", None).strip()
-            lowest_year_str = row.get("Lowest Year", None).strip()
-            highest_year, lowest_year = (int(highest_year_str), int(lowest_year_str)) if highest_year_str else (None, None)
+            # Process author information from work row.
+            author_ids = split_field(row.get("Authors (IDs)", ""))
+            author_names = split_field(row.get("Authors (names)", ""))
 
-            if content_type == "work":
-                discipline = row.get("Discipline", "").strip()
+            for aid, aname in zip(author_ids, author_names):
 
                 # Update or create
-                if entity_id in entities_by_id:
-                    W = entities_by_id[entity_id]
+                if aid in entities_by_id:
+                    A = entities_by_id[aid]
                 else:
-                    W = Work(entity_id)
-                    entities_by_id[entity_id] = W
-
-                W.name = name
-                W.aka = aka
-                W.discipline = discipline
-                W.highest_year: Optional[int] = highest_year
-                W.lowest_year: Optional[int] = lowest_year
-
-                # Process author information from work row.
-                author_ids = split_field(row.get("Authors (IDs)", ""))
-                author_names = split_field(row.get("Authors (names)", ""))
-
-                for aid, aname in zip(author_ids, author_names):
-
-                    # Update or create
-                    if aid in entities_by_id:
-                        A = entities_by_id[aid]
-                    else:
-                        A = Author(aid)
-                        entities_by_id[aid] = A
-
-                    # Associate work with author and vice versa
-                    A.name = aname
-                    if W.id not in A.work_ids:
-                        A.work_ids.append(W.id)
-                    if A.id not in W.author_ids:
-                        W.author_ids.append(A.id)
-
-                # Process base-text and commentary relations
-                base_text_ids = split_field(row.get("Base texts (IDs)", ""))
-                base_text_names = split_field(row.get("Base texts (names)", ""))
-                for base_text_id, base_text_name in zip(base_text_ids, base_text_names):
-
-                    # Update or create
-                    if base_text_id in entities_by_id:
-                        BT = entities_by_id[base_text_id]
-                    else:
-                        BT = Work(base_text_id)
-                        entities_by_id[base_text_id] = BT
-
-                    # Associate base text with commentary and vice versa
-                    BT.name = base_text_name
-                    if W.id not in BT.commentary_ids:
-                        BT.commentary_ids.append(W.id)
-                    if BT.id not in W.base_text_ids:
-                        W.base_text_ids.append(BT.id)
-
-            elif content_type == "person":
-                social_identifiers = row.get("Social identifiers", None).strip()
+                    A = Author(aid)
+                    entities_by_id[aid] = A
+
+                # Associate work with author and vice versa
+                A.name = aname
+                if (A.id, W.id) not in author_work_pairs:
+                    author_work_pairs.add((A.id, W.id))
+                    A.work_ids.append(W.id)
+                    W.author_ids.append(A.id)
+
+            # Process base-text and commentary relations
+            base_text_ids = split_field(row.get("Base texts (IDs)", ""))
+            base_text_names = split_field(row.get("Base texts (names)", ""))
+            for base_text_id, base_text_name in zip(base_text_ids, base_text_names):
 
                 # Update or create
-                if entity_id in entities_by_id:
-                    A = entities_by_id[entity_id]
+                if base_text_id in entities_by_id:
+                    BT = entities_by_id[base_text_id]
                 else:
-                    A = Author(entity_id)
-                    entities_by_id[entity_id] = A
-
-                A.name = name
-                A.aka = aka
-                A.social_identifiers = social_identifiers
-                A.highest_year: Optional[int] = highest_year
-                A.lowest_year: Optional[int] = lowest_year
-            # If content type is unrecognized, skip the row.
-
-    # Combined post-processing pass
-    for eid, entity in list(entities_by_id.items()):
+                    BT = Work(base_text_id)
+                    entities_by_id[base_text_id] = BT
+
+                # Associate base text with commentary and vice versa
+                BT.name = base_text_name
+                if (BT.id, W.id) not in base_text_commentary_pairs:
+                    base_text_commentary_pairs.add((BT.id, W.id))
+                    BT.commentary_ids.append(W.id)
+                    W.base_text_ids.append(BT.id)
+
+        elif content_type == "person":
+            social_identifiers = row.get("Social identifiers", None).strip()
+
+            # Update or create
+            if entity_id in entities_by_id:
+                A = entities_by_id[entity_id]
+            else:
+                A = Author(entity_id)
+                entities_by_id[entity_id] = A
+
+            A.name = name
+            A.aka = aka
+            A.social_identifiers = social_identifiers
+            A.highest_year: Optional[int] = highest_year
+            A.lowest_year: Optional[int] = lowest_year
+        # If content type is unrecognized, skip the row.
+
+    # Combined post-processing pass (relations are complete now, so each entity is finalized in one visit)
+    finalized_entities_by_id = {}
+    for eid, entity in entities_by_id.items():
         if entity.type == "author":
             # Remove authors with no associated works.
             if not entity.work_ids:
-                del entities_by_id[eid]
-            else:
-                # Aggregate disciplines from each associated work.
-                discipline_counter = Counter()
-                for wid in entity.work_ids:
-                    work = entities_by_id.get(wid)
-                    if work and getattr(work, "discipline", ""):
-                        discipline_counter[work.discipline] += 1
-                if discipline_counter:
-                    # Order by descending frequency and then alphabetically.
-                    sorted_disciplines = sorted(discipline_counter.items(), key=lambda x: (-x[1], x[0]))
-                    # Build string like "Nyāya (3), Yoga (1)"
-                    entity.disciplines = ", ".join([f"{disc} ({count})" for disc, count in sorted_disciplines])
+                continue
+            # Aggregate disciplines from each associated work.
+            discipline_counter = Counter()
+            for wid in entity.work_ids:
+                work = entities_by_id.get(wid)
+                if work and getattr(work, "discipline", ""):
+                    discipline_counter[work.discipline] += 1
+            if discipline_counter:
+                # Order by descending frequency and then alphabetically.
+                sorted_disciplines = sorted(discipline_counter.items(), key=lambda x: (-x[1], x[0]))
+                # Build string like "Nyāya (3), Yoga (1)"
+                entity.disciplines = ", ".join([f"{disc} ({count})" for disc, count in sorted_disciplines])
         elif entity.type == "work":
             # If the work's own year information is missing, try to supplement it from its authors.
             if entity.highest_year is None:
@@ -163,14 +213,28 @@ def create_entities():
                         entity.author_highest_year = author.highest_year
                         entity.author_lowest_year = author.lowest_year
                         break  # Use the first available author date
+        finalized_entities_by_id[eid] = entity
 
-    # Save to JSON for human-readability
-    output_filename = f"{PANDIT_DATA_VERSION}-entities.json"
-    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
-    with open(output_json_path, 'w') as jsonfile:
-        json.dump({eid: e.to_dict() for eid, e in entities_by_id.items()}, jsonfile, indent=4, ensure_ascii=False)
+    return finalized_entities_by_id
 
-    return entities_by_id
+
+ETEXT_LINK_TYPES = {
+    'main': 'Link 1 (main)',
+    'underlying': 'Link 2 (underlying)',
+    'extract': 'Link 3 (extract)',
+}
+
+COLLECTION_SUBTYPE_LABELS = {
+    'DCS': ('web HTML', 'GitHub (1) CoNLL-U', 'GitHub (2) TXT'),
+    'GRETIL': ('web HTML'),
+    'Muktabodha KSTS': ('web HTML'),
+    'SARIT': ('web HTML', 'GitHub XML'),
+    'Sanskrit Library and TITUS': ('Skt Lib web HTML', 'TITUS web HTML'),
+    'Vātāyana and Pramāṇa NLP': ('Vātāyana web HTML', 'Pramāṇa NLP GitHub'),
+    'UTA Dharmaśāstra': ('web HTML', 'Google Doc'),
+    'DiPAL DCV': ('web HTML work page', 'web HTML text'),
+    'HANSEL': ('GitHub TXT', 'GitHub XML', 'web HTML'),
+}
 
 
 @time_execution
@@ -183,92 +247,116 @@ def create_etext_links():
     input_csv_path = os.path.join(current_file_dir, relative_data_dir, input_filename)
     df = pd.read_csv(input_csv_path)
 
-    link_types = {
-        'main': 'Link 1 (main)',
-        'underlying': 'Link 2 (underlying)',
-        'extract': 'Link 3 (extract)',
-    }
-
-    work_id_mapping = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
-
-    collection_subtype_labels = {
-        'DCS': ('web HTML', 'GitHub (1) CoNLL-U', 'GitHub (2) TXT'),
-        'GRETIL': ('web HTML'),
-        'Muktabodha KSTS': ('web HTML'),
-        'SARIT': ('web HTML', 'GitHub XML'),
-        'Sanskrit Library and TITUS': ('Skt Lib web HTML', 'TITUS web HTML'),
-        'Vātāyana and Pramāṇa NLP': ('Vātāyana web HTML', 'Pramāṇa NLP GitHub'),
-        'UTA Dharmaśāstra': ('web HTML', 'Google Doc'),
-        'DiPAL DCV': ('web HTML work page', 'web HTML text'),
-        'HANSEL': ('GitHub TXT', 'GitHub XML', 'web HTML'),
-    }
-    collection_keys = list(collection_subtype_labels.keys())
+    final_result = build_etext_links(df)
 
-    collection_total_link_counts = defaultdict(int, dict.fromkeys(collection_keys, 0))
-    collection_missing_work_id_counts = defaultdict(int, dict.fromkeys(collection_keys, 0))
+    # Save to JSON for human-readability
+    output_filename = f"{SETI_DATA_VERSION}-etext-link-data.json"
+    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
+    with open(output_json_path, 'w') as jsonfile:
+        json.dump(final_result, jsonfile, indent=4, ensure_ascii=False)
 
-    for row in df.to_dict(orient="records"):
-        collection_name = row['Collection']
+    create_etext_summary(final_result)
 
-        if pd.isna(row['Work ID']) or row['Work ID'] == "":
-            continue
 
-        if any(pd.notna(row[k]) for k in ('Link 1 (main)',
-                                          'Link 2 (underlying)',
-                                          'Link 3 (extract)')):
-            collection_total_link_counts[collection_name] += 1
-            if row['Work ID'] == "...":
-                collection_missing_work_id_counts[collection_name] += 1
-
-        work_ids = [wid.strip() for wid in re.split(r'[,\r\n]+', str(row['Work ID']))]
+@time_execution
+def create_etext_summary(link_data: Dict):
+    """
+    Save the per-collection e-text summary shown on the SETI page next to the e-text link JSON.
+    """
+    summary = summarize_etext_links(link_data["work_id_to_link_mapping"], link_data)
+    output_filename = f"{SETI_DATA_VERSION}-etext-summary.json"
+    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
+    with open(output_json_path, 'w') as jsonfile:
+        json.dump({"seti_data_version": SETI_DATA_VERSION, "summary": summary}, jsonfile, indent=4, ensure_ascii=False)
 
-        mapped_labels = collection_subtype_labels.get(collection_name, list(link_types.keys()))
 
-        for link_type, col_name in link_types.items():
-            if col_name in row and pd.notna(row[col_name]) and row[col_name].strip():
-                link = row[col_name].strip()
-                subtype = mapped_labels[
-                    list(link_types.keys()).index(link_type)] if collection_name in collection_subtype_labels else link_type
+def build_etext_links(df: pd.DataFrame) -> Dict:
+    """
+    Build the work-id -> link mapping and per-collection link counts from SETI rows.
 
-                for work_id in work_ids:
-                    work_id_mapping[work_id][collection_name][subtype].add(link)
+    Works column-wise: the link columns are melted into one (row, link type, link) frame,
+    multi-ID "Work ID" cells are split and exploded, and links are deduplicated and sorted per
+    (work ID, collection, subtype) group. Groups keep the order in which they first occur in the CSV.
 
-    for work_id, collections in work_id_mapping.items():
-        for collection_name, subtypes in list(collections.items()):  # Convert to list to allow modification
-            # Convert all sets to sorted lists
-            for subtype, links in subtypes.items():
-                work_id_mapping[work_id][collection_name][subtype] = sorted(links)
+    Args:
+        df: SETI master data as read by pd.read_csv (any subset of rows)
 
-            # If only one subtype exists, move directly under collection_name
+    Returns:
+        dict: JSON-serializable dict with "work_id_to_link_mapping",
+            "collection_total_link_counts" and "collection_missing_work_id_counts"
+    """
+    link_type_names = list(ETEXT_LINK_TYPES.keys())
+    collection_keys = list(COLLECTION_SUBTYPE_LABELS.keys())
+
+    df = df[df['Work ID'].notna() & (df['Work ID'] != "")].reset_index(drop=True)
+
+    # Count rows with any link per collection (first-seen order after the known collections)
+    has_any_link = df[list(ETEXT_LINK_TYPES.values())].notna().any(axis=1)
+    counted = df[has_any_link]
+    total_counts = counted.groupby('Collection', sort=False, dropna=False).size()
+    missing_counts = counted[counted['Work ID'] == "..."].groupby('Collection', sort=False, dropna=False).size()
+    collection_total_link_counts = {**dict.fromkeys(collection_keys, 0), **total_counts.to_dict()}
+    collection_missing_work_id_counts = {**dict.fromkeys(collection_keys, 0), **missing_counts.to_dict()}
+
+    # Melt link columns into (row, link type index, collection, work ID cell, link)
+    melted = []
+    for link_type_index, col_name in enumerate(ETEXT_LINK_TYPES.values()):
+        if col_name not in df.columns:
+            continue
+        # an all-empty column is read as float64, so cast before using .str
+        links = df[col_name].fillna("").astype(str).str.strip()
+        present = links != ""
+        melted.append(pd.DataFrame({
+            'row': df.index[present],
+            'link_type_index': link_type_index,
+            'Collection': df.loc[present, 'Collection'],
+            'Work ID': df.loc[present, 'Work ID'],
+            'link': links[present],
+        }))
+    if not melted:
+        links_df = pd.DataFrame(columns=['row', 'link_type_index', 'Collection', 'Work ID', 'link'])
+    else:
+        links_df = pd.concat(melted).sort_values(['row', 'link_type_index'], kind='stable')
+
+    # Split multi-ID cells, one work ID per row
+    links_df['work_id'] = links_df['Work ID'].astype(str).str.split(r'[,\r\n]+', regex=True)
+    links_df = links_df.explode('work_id')
+    links_df['work_id'] = links_df['work_id'].str.strip()
+
+    # Subtype label per (collection, link type); looked up once per distinct pair
+    def subtype_label(collection_name, link_type_index):
+        if collection_name in COLLECTION_SUBTYPE_LABELS:
+            return COLLECTION_SUBTYPE_LABELS[collection_name][link_type_index]
+        return link_type_names[link_type_index]
+
+    pairs = links_df[['Collection', 'link_type_index']].drop_duplicates()
+    pairs['subtype'] = [subtype_label(c, i) for c, i in zip(pairs['Collection'], pairs['link_type_index'])]
+    links_df = links_df.merge(pairs, on=['Collection', 'link_type_index'], how='left')
+
+    # Deduplicate, then sort links within each group while keeping groups in first-seen order
+    group_cols = ['work_id', 'Collection', 'subtype']
+    links_df = links_df.drop_duplicates(group_cols + ['link'])
+    links_df['group'] = links_df.groupby(group_cols, sort=False, dropna=False).ngroup()
+    links_df = links_df.sort_values(['group', 'link'], kind='stable')
+
+    work_id_mapping = {}
+    group_keys = links_df[group_cols].drop_duplicates().itertuples(index=False, name=None)
+    group_links = links_df.groupby('group', sort=True)['link'].agg(list)
+    for (work_id, collection_name, subtype), links in zip(group_keys, group_links):
+        work_id_mapping.setdefault(work_id, {}).setdefault(collection_name, {})[subtype] = links
+
+    # If only one subtype exists, move its links directly under the collection name
+    for collections in work_id_mapping.values():
+        for collection_name, subtypes in collections.items():
             if len(subtypes) == 1:
-                work_id_mapping[work_id][collection_name] = next(iter(subtypes.values()))  # Extract the only list
-
-    # Convert defaultdict structure to a regular dictionary for JSON serialization
-    def convert_to_serializable(d):
-        result = {}
-        for work_id, collections in d.items():
-            result[work_id] = {}
-            for collection_name, links in collections.items():
-                if isinstance(links, list):  # Direct mapping (single link type, no subtypes)
-                    result[work_id][collection_name] = links
-                elif isinstance(links, dict):  # Collection has subtypes
-                    result[work_id][collection_name] = {k: v for k, v in links.items()}
-                else:
-                    result[work_id][collection_name] = links  # Fallback
-        return result
+                collections[collection_name] = next(iter(subtypes.values()))
 
-    final_result = {
-        "work_id_to_link_mapping": convert_to_serializable(work_id_mapping),
+    return {
+        "work_id_to_link_mapping": work_id_mapping,
         "collection_total_link_counts": collection_total_link_counts,
         "collection_missing_work_id_counts": collection_missing_work_id_counts,
     }
 
-    # Save to JSON for human-readability
-    output_filename = f"{SETI_DATA_VERSION}-etext-link-data.json"
-    output_json_path = os.path.join(current_file_dir, relative_data_dir, output_filename)
-    with open(output_json_path, 'w') as jsonfile:
-        json.dump(convert_to_serializable(final_result), jsonfile, indent=4, ensure_ascii=False)
-
 
 if __name__ == "__main__":
     create_entities()
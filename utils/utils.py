@@ -1,10 +1,14 @@
 from collections import defaultdict
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 import json
+import re
 
 SUPPRESS_TIME_DECORATOR = True  # Set this to True to suppress the decorator, False to enable it
 
+# one "Name (count)" entry of an author's disciplines summary (see utils.transform)
+AUTHOR_DISCIPLINE_PATTERN = re.compile(r"(?:^|, )(.+?) \((\d+)\)")
+
 
 def load_config_dict_from_json_file():
     settings_file_path = 'config.json'
@@ -81,6 +85,160 @@ def summarize_etext_links(etext_links, additional_collection_count_data):
     return sorted_summary
 
 
+def get_year_range(entity):
+    """
+    (lowest year, highest year, whether taken from the author) of an entity, or None if undated.
+    Works without their own dates fall back to their authors' dates.
+    """
+    if entity.type == 'work' and not entity.lowest_year and entity.author_lowest_year:
+        return entity.author_lowest_year, entity.author_highest_year, True
+    if not entity.lowest_year:
+        return None
+    return entity.lowest_year, entity.highest_year, False
+
+
+def get_date_info(entity):
+    year_range = get_year_range(entity)
+    if year_range is None:
+        return ""
+    lowest_year, highest_year, from_author = year_range
+    caveat_str = " (author)" if from_author else ""
+    date_str = f"{lowest_year}" if lowest_year == highest_year else f"{lowest_year}–{highest_year}"
+    return date_str + caveat_str
+
+
+def entity_disciplines(entity):
+    """
+    Disciplines of a work (its discipline, split into parts if combined with " + "), or of an author
+    (the disciplines of their works, from the "Name (count), ..." summary).
+    """
+    if entity.type == 'work':
+        return split_discipline(entity.discipline)
+    return parse_author_disciplines(entity.disciplines)
+
+
+@lru_cache(maxsize=None)
+def split_discipline(discipline):
+    if not discipline:
+        return []
+    return [discipline] + [part for part in discipline.split(" + ") if part != discipline]
+
+
+@lru_cache(maxsize=None)
+def parse_author_disciplines(disciplines):
+    if not disciplines:
+        return []
+    names = [name for name, _ in AUTHOR_DISCIPLINE_PATTERN.findall(disciplines)]
+    return names + [part for name in names for part in split_discipline(name)[1:]]
+
+
+def build_entity_dropdown_options(entities_by_id):
+    """
+    Build sorted {"id", "label"} dropdown options for 'all', 'works' and 'authors'.
+    """
+    entity_dropdown_options = defaultdict(list)
+    for entity in entities_by_id.values():
+        entity_label = f"{entity.name} ({entity.id})"
+        date_info = get_date_info(entity)
+        if date_info:
+            entity_label += f" [{date_info}]"
+        if entity.aka:
+            entity_label += f" [{entity.aka}]"
+        option = {"id": entity.id, "label": entity_label}
+        entity_dropdown_options['all'].append(option)
+        entity_dropdown_options[entity.type+'s'].append(option)
+
+    for key in ['works', 'authors', 'all']:
+        entity_dropdown_options[key] = sorted(entity_dropdown_options[key], key=lambda x: custom_sort_key(x['label']))
+
+    return dict(entity_dropdown_options)
+
+
+def get_neighbor_ids(entity):
+    """IDs of all entities directly related to an entity (authorship and commentary, both directions)."""
+    if entity.type == 'work':
+        return entity.author_ids + entity.base_text_ids + entity.commentary_ids
+    return list(entity.work_ids)
+
+
+def build_entity_indexes(entities_by_id, pandit_data_version, component_index=None):
+    """
+    Derive everything the server needs at boot from the entities, once per data version.
+
+    Args:
+        component_index: Optional utils.components.ComponentIndex already up to date with the entities
+            (e.g. after an incremental delta); components are otherwise found with a DFS
+
+    Returns:
+        dict: with keys
+            - "pandit_data_version"
+            - "type_index": {"works": [...], "authors": [...]}
+            - "dropdown_options": {"all"/"works"/"authors": sorted [{"id", "label"}]}
+            - "adjacency": {id: [neighbor ids]} (undirected)
+            - "degrees": {id: number of neighbors}
+            - "component_ids": {id: connected component number}, numbered in order of first entity
+            - "component_sizes": [size of component 0, 1, ...]
+            - "disciplines": {discipline: {"works": [...], "authors": [...]}} (see build_discipline_index)
+    """
+    adjacency = {eid: get_neighbor_ids(entity) for eid, entity in entities_by_id.items()}
+
+    if component_index is not None:
+        component_ids, component_sizes = component_index.component_numbering(entities_by_id)
+    else:
+        component_ids, component_sizes = find_components(entities_by_id, adjacency)
+
+    return {
+        "pandit_data_version": pandit_data_version,
+        "type_index": {
+            "works": [eid for eid, e in entities_by_id.items() if e.type == 'work'],
+            "authors": [eid for eid, e in entities_by_id.items() if e.type == 'author'],
+        },
+        "dropdown_options": build_entity_dropdown_options(entities_by_id),
+        "adjacency": adjacency,
+        "degrees": {eid: len(neighbor_ids) for eid, neighbor_ids in adjacency.items()},
+        "component_ids": component_ids,
+        "component_sizes": component_sizes,
+        "disciplines": build_discipline_index(entities_by_id),
+    }
+
+
+def build_discipline_index(entities_by_id):
+    """
+    Work and author IDs under each discipline, for faceted browsing: a work counts under its discipline and,
+    if combined with " + ", each part; an author under every discipline of their works (see entity_disciplines).
+
+    Returns:
+        dict: {discipline: {"works": [...], "authors": [...]}}, disciplines by descending number of entities
+    """
+    index = defaultdict(lambda: {"works": [], "authors": []})
+    for eid, entity in entities_by_id.items():
+        for discipline in dict.fromkeys(entity_disciplines(entity)):  # a part can also be a discipline of its own
+            index[discipline][entity.type + 's'].append(eid)
+    return dict(sorted(index.items(), key=lambda item: (-len(item[1]["works"]) - len(item[1]["authors"]), item[0])))
+
+
+def find_components(entities_by_id, adjacency):
+    """Connected component number of every entity (numbered in order of first entity) and component sizes."""
+    component_ids = {}
+    component_sizes = []
+    for start_id in entities_by_id:
+        if start_id in component_ids:
+            continue
+        component_id = len(component_sizes)
+        component_ids[start_id] = component_id
+        stack = [start_id]
+        size = 0
+        while stack:
+            node_id = stack.pop()
+            size += 1
+            for neighbor_id in adjacency.get(node_id, []):
+                if neighbor_id not in component_ids:
+                    component_ids[neighbor_id] = component_id
+                    stack.append(neighbor_id)
+        component_sizes.append(size)
+    return component_ids, component_sizes
+
+
 sanskrit_alphabet = [
     'a', 'ā', 'i', 'ī', 'u', 'ū', 'ṛ', 'ṝ', 'ḷ', 'ḹ', 'e', 'ai', 'o', 'au',
     'k', 'kh', 'g', 'gh', 'ṅ',
@@ -100,4 +258,19 @@ custom_order = {char: idx for idx, char in enumerate(sanskrit_alphabet)}
 def custom_sort_key(word):
     word = word.lower()  # Normalize case to lowercase
     return [custom_order.get(word[i:i+2], custom_order.get(word[i], len(sanskrit_alphabet)))
-            for i in range(len(word))]
\ No newline at end of file
+            for i in range(len(word))]
+
+
+def dump_json_items(items, fp, indent=4):
+    """
+    Write (key, value) pairs as one JSON object, one item at a time,
+    byte-identical to json.dump(dict(items), fp, indent=indent, ensure_ascii=False).
+    """
+    separator = "\n" + " " * indent
+    empty = True
+    for key, value in items:
+        fp.write("{" + separator if empty else "," + separator)
+        fp.write(json.dumps(key, ensure_ascii=False) + ": ")
+        fp.write(json.dumps(value, indent=indent, ensure_ascii=False).replace("\n", separator))
+        empty = False
+    fp.write("{}" if empty else "\n}")
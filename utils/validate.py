@@ -0,0 +1,172 @@
+# referential-integrity checks for the entities JSON (run as an ETL stage, and optionally when loading)
+
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import pandas as pd
+
+from utils.utils import time_execution, get_pandit_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+
+ENTITY_TYPES = ["work", "author"]
+
+# relation field: (type of the entity holding it, type of the entities it points to, field holding the reverse link)
+RELATION_FIELDS = {
+    "author_ids": ("work", "author", "work_ids"),
+    "base_text_ids": ("work", "work", "commentary_ids"),
+    "commentary_ids": ("work", "work", "base_text_ids"),
+    "work_ids": ("author", "work", "author_ids"),
+}
+
+YEAR_RANGE_FIELDS = [("lowest_year", "highest_year"), ("author_lowest_year", "author_highest_year")]
+
+
+class IntegrityError(ValueError):
+    """Raised when the entities dataset has referential-integrity violations."""
+
+    def __init__(self, violations: Dict[str, List[Dict]]):
+        self.violations = violations
+        counts = ", ".join(f"{check}: {len(records)}" for check, records in violations.items() if records)
+        super().__init__(f"Entities dataset has integrity violations ({counts})")
+
+
+def find_integrity_violations(entity_dicts: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+    """
+    Check the entities dataset in one vectorized pass: IDs and types, relation endpoints and their types,
+    symmetry of author<->work and base-text<->commentary links, and year ranges.
+
+    Args:
+        entity_dicts: Entity dicts by ID, as stored in the entities JSON
+
+    Returns:
+        dict: check name -> list of violation records (empty lists if the dataset is consistent)
+    """
+    violations = {}
+    df = pd.DataFrame.from_dict(entity_dicts, orient="index")
+    if df.empty:
+        return violations
+    df.index.name = "key"
+    df = df.reset_index()
+
+    violations["id_mismatch"] = df.loc[df["id"] != df["key"], ["key", "id"]] \
+        .rename(columns={"key": "entity_id"}).to_dict("records")
+    violations["unknown_type"] = df.loc[~df["type"].isin(ENTITY_TYPES), ["key", "type"]] \
+        .rename(columns={"key": "entity_id"}).to_dict("records")
+
+    # One row per (source, field, target) link
+    link_frames = []
+    for field in RELATION_FIELDS:
+        if field not in df:
+            continue
+        links = df.loc[df[field].notna(), ["key", "type", field]].explode(field).dropna(subset=[field])
+        link_frames.append(links.rename(columns={"key": "source", "type": "source_type", field: "target"}).assign(field=field))
+    links = pd.concat(link_frames, ignore_index=True) if link_frames else \
+        pd.DataFrame(columns=["source", "source_type", "target", "field"])
+    links["target"] = links["target"].astype(str)
+    links["expected_source_type"] = links["field"].map({f: spec[0] for f, spec in RELATION_FIELDS.items()})
+    links["expected_target_type"] = links["field"].map({f: spec[1] for f, spec in RELATION_FIELDS.items()})
+    links["inverse_field"] = links["field"].map({f: spec[2] for f, spec in RELATION_FIELDS.items()})
+    links = links.merge(df[["key", "type"]].rename(columns={"key": "target", "type": "target_type"}), on="target", how="left")
+
+    record_columns = ["source", "field", "target"]
+    violations["misplaced_relation"] = links.loc[
+        links["source_type"] != links["expected_source_type"], record_columns + ["source_type"]
+    ].to_dict("records")
+    dangling = links["target_type"].isna()
+    violations["dangling_reference"] = links.loc[dangling, record_columns].to_dict("records")
+    violations["wrong_target_type"] = links.loc[
+        ~dangling & (links["target_type"] != links["expected_target_type"]), record_columns + ["target_type"]
+    ].to_dict("records")
+    violations["self_reference"] = links.loc[links["source"] == links["target"], record_columns].to_dict("records")
+    violations["duplicate_reference"] = links.loc[
+        links.duplicated(subset=record_columns), record_columns
+    ].drop_duplicates().to_dict("records")
+
+    # Every resolvable link must be mirrored by its reverse link on the target
+    expected_reverse = links.loc[~dangling, ["target", "inverse_field", "source", "field"]].rename(
+        columns={"target": "reverse_source", "inverse_field": "reverse_field", "source": "reverse_target"})
+    existing = links[["source", "field", "target"]].drop_duplicates().rename(
+        columns={"source": "reverse_source", "field": "reverse_field", "target": "reverse_target"})
+    mirrored = expected_reverse.merge(existing, how="left", indicator=True,
+                                      on=["reverse_source", "reverse_field", "reverse_target"])
+    violations["asymmetric_link"] = mirrored.loc[mirrored["_merge"] == "left_only"].rename(
+        columns={"reverse_target": "source", "reverse_source": "target",
+                 "reverse_field": "missing_reverse_field"}
+    )[["source", "field", "target", "missing_reverse_field"]].drop_duplicates().to_dict("records")
+
+    # Years must be integers, with lowest <= highest
+    year_records = []
+    for low_field, high_field in YEAR_RANGE_FIELDS:
+        if low_field not in df or high_field not in df:
+            continue
+        for field in (low_field, high_field):
+            present = df[field].notna()
+            numeric = pd.to_numeric(df[field], errors="coerce")
+            not_int = present & (numeric.isna() | (numeric != numeric.round()))
+            year_records += [{"entity_id": key, "field": field, "value": value, "problem": "not an integer"}
+                             for key, value in df.loc[not_int, ["key", field]].itertuples(index=False)]
+        low = pd.to_numeric(df[low_field], errors="coerce")
+        high = pd.to_numeric(df[high_field], errors="coerce")
+        inverted = low > high
+        year_records += [{"entity_id": key, "field": f"{low_field}/{high_field}", "value": [int(lo), int(hi)],
+                          "problem": "lowest year after highest year"}
+                         for key, lo, hi in zip(df.loc[inverted, "key"], low[inverted], high[inverted])]
+    violations["invalid_year_range"] = year_records
+
+    return violations
+
+
+def raise_on_integrity_violations(entity_dicts: Dict[str, Dict]):
+    """
+    Raise IntegrityError if the dataset has any violations.
+    """
+    violations = find_integrity_violations(entity_dicts)
+    if any(violations.values()):
+        raise IntegrityError(violations)
+
+
+@time_execution
+def validate_entities(strict: bool = True) -> Dict:
+    """
+    Validate the current entities JSON and write a structured report to data/<pandit version>-validation-report.json.
+
+    Args:
+        strict: Raise IntegrityError (after writing the report) if any violations are found
+
+    Returns:
+        dict: The report
+    """
+    input_filename = f"{PANDIT_DATA_VERSION}-entities.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, input_filename), 'r') as jsonfile:
+        entity_dicts = json.load(jsonfile)
+
+    violations = find_integrity_violations(entity_dicts)
+    report = {
+        "pandit_data_version": PANDIT_DATA_VERSION,
+        "num_entities": len(entity_dicts),
+        "num_violations": {check: len(records) for check, records in violations.items()},
+        "violations": violations,
+    }
+
+    output_filename = f"{PANDIT_DATA_VERSION}-validation-report.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(report, jsonfile, indent=4, ensure_ascii=False)
+    print(f"Validation report saved as {output_filename}")
+
+    if strict and any(violations.values()):
+        raise IntegrityError(violations)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check referential integrity of the entities JSON.")
+    parser.add_argument("--no-strict", action="store_true", help="Only write the report, don't fail on violations")
+    args = parser.parse_args()
+    report = validate_entities(strict=not args.no_strict)
+    print(json.dumps(report["num_violations"], indent=4))
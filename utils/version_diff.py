@@ -0,0 +1,231 @@
+# offline diff between two data versions' entities and e-text links, over hashed, sorted ID arrays
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.delta import find_data_file
+from utils.transform import build_entities, build_etext_links
+from utils.utils import time_execution, get_pandit_data_version, get_seti_data_version
+
+current_file_dir = os.path.dirname(os.path.abspath(__file__))
+relative_data_dir = "../data"
+
+PANDIT_DATA_VERSION = get_pandit_data_version()
+SETI_DATA_VERSION = get_seti_data_version()
+
+NAME_FIELDS = ["name"]  # a change of aka alone is reported as a changed field, not a rename
+# relation lists (authors and commentaries mirror these, see utils.validate) and the edge kind they stand for
+RELATION_FIELDS = {"author_ids": "authorship", "base_text_ids": "commentary"}
+MIRRORED_RELATION_FIELDS = ["work_ids", "commentary_ids"]
+
+
+def digest64(value) -> int:
+    """Stable 64-bit hash of a JSON-serializable value."""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def sorted_id_array(ids) -> np.ndarray:
+    return np.array(sorted(ids), dtype=str)
+
+
+def hash_array(values: Iterator, count: int) -> np.ndarray:
+    return np.fromiter((digest64(value) for value in values), dtype=np.uint64, count=count)
+
+
+def attribute_fields(entity: Dict) -> Dict:
+    skipped = NAME_FIELDS + list(RELATION_FIELDS) + MIRRORED_RELATION_FIELDS
+    return {field: value for field, value in entity.items() if field not in skipped}
+
+
+def relation_keys(entities: Dict[str, Dict]) -> np.ndarray:
+    """Sorted "source\\ttarget\\tkind" keys of all author -> work and base text -> commentary edges."""
+    keys = set()
+    for eid, entity in entities.items():
+        for field, kind in RELATION_FIELDS.items():
+            for other_id in entity.get(field, []):
+                keys.add(f"{other_id}\t{eid}\t{kind}")
+    return sorted_id_array(keys)
+
+
+def link_keys(link_mapping: Dict[str, Dict]) -> Dict[str, np.ndarray]:
+    """Sorted "work ID\\tsubtype\\tlink" keys per collection (subtype empty for collections without subtypes)."""
+    keys = {}
+    for work_id, collections in link_mapping.items():
+        for collection, links in collections.items():
+            by_subtype = links.items() if isinstance(links, dict) else [("", links)]
+            keys.setdefault(collection, set()).update(
+                f"{work_id}\t{subtype}\t{link}" for subtype, subtype_links in by_subtype for link in subtype_links
+            )
+    return {collection: sorted_id_array(collection_keys) for collection, collection_keys in keys.items()}
+
+
+def split_keys(keys: np.ndarray) -> List[List[str]]:
+    return [key.split("\t") for key in keys.tolist()]
+
+
+def diff_sorted(prev: np.ndarray, new: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(added, removed) elements of two sorted arrays of unique values."""
+    return np.setdiff1d(new, prev, assume_unique=True), np.setdiff1d(prev, new, assume_unique=True)
+
+
+@time_execution
+def compute_entity_diff(prev_entities: Dict[str, Dict], new_entities: Dict[str, Dict]) -> Dict:
+    """
+    Added, removed, renamed and otherwise changed entities, and added / removed relations, between two versions'
+    entities (as in the entities JSON). IDs, per-entity name and attribute hashes, and relation keys are compared
+    as sorted arrays, so only the entities that differ are looked at individually.
+
+    Returns:
+        dict: with keys
+            - "entities": {"added"/"removed": [{"id", "type", "name"}], "renamed": [{"id", "type", "from", "to"}],
+              "changed": [{"id", "type", "name", "fields": [...]}]} (changed: aka, dates, discipline, etc.)
+            - "relations": {"added"/"removed": [[source ID, target ID, "authorship" or "commentary"]]}
+            - "counts": number of items in each of the above lists
+    """
+    prev_ids, new_ids = sorted_id_array(prev_entities), sorted_id_array(new_entities)
+    added_ids, removed_ids = diff_sorted(prev_ids, new_ids)
+    common_ids, prev_rows, new_rows = np.intersect1d(prev_ids, new_ids, assume_unique=True, return_indices=True)
+
+    def hashes(entities, ids, fields):
+        return hash_array((fields(entities[eid]) for eid in ids.tolist()), len(ids))
+
+    def names(entity):
+        return [entity.get(field) for field in NAME_FIELDS]
+
+    renamed_mask = hashes(prev_entities, common_ids, names) != hashes(new_entities, common_ids, names)
+    changed_mask = hashes(prev_entities, common_ids, attribute_fields) \
+        != hashes(new_entities, common_ids, attribute_fields)
+
+    def summary(entity):
+        return {"id": entity["id"], "type": entity["type"], "name": entity["name"]}
+
+    changed = []
+    for eid in common_ids[changed_mask].tolist():
+        prev_fields, new_fields = attribute_fields(prev_entities[eid]), attribute_fields(new_entities[eid])
+        changed.append({
+            **summary(new_entities[eid]),
+            "fields": sorted(field for field in prev_fields.keys() | new_fields.keys()
+                             if prev_fields.get(field) != new_fields.get(field)),
+        })
+    added_relations, removed_relations = diff_sorted(relation_keys(prev_entities), relation_keys(new_entities))
+
+    diff = {
+        "entities": {
+            "added": [summary(new_entities[eid]) for eid in added_ids.tolist()],
+            "removed": [summary(prev_entities[eid]) for eid in removed_ids.tolist()],
+            "renamed": [
+                {"id": eid, "type": new_entities[eid]["type"],
+                 "from": prev_entities[eid]["name"], "to": new_entities[eid]["name"]}
+                for eid in common_ids[renamed_mask].tolist()
+            ],
+            "changed": changed,
+        },
+        "relations": {"added": split_keys(added_relations), "removed": split_keys(removed_relations)},
+    }
+    diff["counts"] = {
+        f"{section}_{kind}": len(items) for section, kinds in diff.items() for kind, items in kinds.items()
+    }
+    return diff
+
+
+@time_execution
+def compute_link_diff(prev_link_data: Dict, new_link_data: Dict) -> Dict:
+    """
+    Added and removed e-text links per collection between two versions' e-text link data, as sorted
+    (work ID, subtype, link) key arrays, plus the works that gained or lost all links in a collection.
+
+    Returns:
+        dict: {collection: {"links": {"added"/"removed": [[work ID, subtype, link]]},
+               "works": {"added"/"removed": [work IDs]}, "total_link_counts": {"from", "to"}}},
+            for the collections with changes
+    """
+    prev_keys = link_keys(prev_link_data["work_id_to_link_mapping"])
+    new_keys = link_keys(new_link_data["work_id_to_link_mapping"])
+    empty = sorted_id_array([])
+    collections = {}
+    for collection in sorted(prev_keys.keys() | new_keys.keys()):
+        prev, new = prev_keys.get(collection, empty), new_keys.get(collection, empty)
+        added, removed = diff_sorted(prev, new)
+        prev_works = np.unique(np.char.partition(prev, "\t")[:, 0]) if len(prev) else empty
+        new_works = np.unique(np.char.partition(new, "\t")[:, 0]) if len(new) else empty
+        added_works, removed_works = diff_sorted(prev_works, new_works)
+        prev_count = prev_link_data["collection_total_link_counts"].get(collection)
+        new_count = new_link_data["collection_total_link_counts"].get(collection)
+        if len(added) or len(removed) or prev_count != new_count:
+            collections[collection] = {
+                "links": {"added": split_keys(added), "removed": split_keys(removed)},
+                "works": {"added": added_works.tolist(), "removed": removed_works.tolist()},
+                "total_link_counts": {"from": prev_count, "to": new_count},
+            }
+    return collections
+
+
+def load_entity_snapshot(version: str) -> Dict[str, Dict]:
+    """
+    A version's entities (as in the entities JSON), from data/ or data/archive/; built from its cleaned CSV
+    if only that was kept.
+    """
+    try:
+        with open(find_data_file(f"{version}-entities.json"), 'r') as jsonfile:
+            return json.load(jsonfile)
+    except FileNotFoundError:
+        with open(find_data_file(f"{version}-extracted-entities-cleaned.csv"), 'r') as csvfile:
+            return {eid: entity.to_dict() for eid, entity in build_entities(csv.DictReader(csvfile)).items()}
+
+
+def load_link_snapshot(version: str) -> Dict:
+    """
+    A version's e-text link data, from data/ or data/archive/; built from its SETI CSV if only that was kept.
+    """
+    try:
+        with open(find_data_file(f"{version}-etext-link-data.json"), 'r') as jsonfile:
+            return json.load(jsonfile)
+    except FileNotFoundError:
+        return build_etext_links(pd.read_csv(find_data_file(f"{version}-seti-master.csv")))
+
+
+def create_version_diff(previous_pandit_version: Optional[str] = None, previous_seti_version: Optional[str] = None) -> Dict:
+    """
+    Diff the current version's entities and/or e-text links against previous versions and save it to
+    data/<pandit version>-version-diff.json, for the diff API.
+    """
+    diff = {"pandit_data_version": PANDIT_DATA_VERSION, "seti_data_version": SETI_DATA_VERSION}
+    if previous_pandit_version:
+        diff["pandit"] = {
+            "from": previous_pandit_version,
+            "to": PANDIT_DATA_VERSION,
+            **compute_entity_diff(load_entity_snapshot(previous_pandit_version), load_entity_snapshot(PANDIT_DATA_VERSION)),
+        }
+    if previous_seti_version:
+        diff["seti"] = {
+            "from": previous_seti_version,
+            "to": SETI_DATA_VERSION,
+            "collections": compute_link_diff(load_link_snapshot(previous_seti_version), load_link_snapshot(SETI_DATA_VERSION)),
+        }
+
+    output_filename = f"{PANDIT_DATA_VERSION}-version-diff.json"
+    with open(os.path.join(current_file_dir, relative_data_dir, output_filename), 'w') as jsonfile:
+        json.dump(diff, jsonfile, ensure_ascii=False)
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff the current data version against previous ones (for the diff API).")
+    parser.add_argument("--previous-pandit-version", help="e.g. 2025-06-26 (needs its entities JSON or cleaned CSV)")
+    parser.add_argument("--previous-seti-version", help="e.g. 2025-06-27 (needs its e-text link JSON or SETI CSV)")
+    args = parser.parse_args()
+    if not (args.previous_pandit_version or args.previous_seti_version):
+        parser.error("give --previous-pandit-version and/or --previous-seti-version")
+    diff = create_version_diff(args.previous_pandit_version, args.previous_seti_version)
+    if "pandit" in diff:
+        print(f"pandit {diff['pandit']['from']} -> {diff['pandit']['to']}: {diff['pandit']['counts']}")
+    for collection, changes in diff.get("seti", {}).get("collections", {}).items():
+        print(f"seti {collection}: +{len(changes['links']['added'])} / -{len(changes['links']['removed'])} links")